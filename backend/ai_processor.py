@@ -1,230 +1,297 @@
-import google.generativeai as genai
 import os
 import re
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple, Callable
 import json
+import time
 from dotenv import load_dotenv
+from executors import Deadline
+import http_client
+import llm_hedging
+import gemini_client
+from key_pool import groq_pool, KeyPoolExhausted
+from llm_scheduler import quota_scheduler, QuotaExceeded
+import single_flight
+import response_cache
+from intent_rules import intent_rules
+from transaction_parser import parse_transactions
+from intent_classifier import intent_classifier
+from provider_health import provider_health, RateLimited, CircuitOpen
 
 # Load environment variables from the correct path
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
-class AIProcessor:
-    def __init__(self):
-        # Initialize multiple Gemini API keys
-        self.gemini_keys = [
-            os.getenv("GEMINI_API_KEY_1"),
-            os.getenv("GEMINI_API_KEY_2"),
-            os.getenv("GEMINI_API_KEY_3")
-        ]
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
 
-        # Filter out None and placeholder keys
-        self.gemini_keys = [key for key in self.gemini_keys if key and "your-" not in key]
+PROVIDER_LABELS = {"groq": "Groq AI", "anthropic": "Anthropic Claude", "gemini": "Gemini AI"}
 
-        self.current_gemini_index = 0
-        self.model = None
-        self.api_available = False
+class AIProcessor:
+    def __init__(self):
+        # Gemini and Groq keys live in shared key pools (key_pool.py) and are used
+        # concurrently, each with its own rate limit and circuit breaker
+        self.api_available = gemini_client.is_available()
 
         # Initialize alternative AI providers
         self.anthropic_key = os.getenv("ANTHROPIC_API_KEY")
-        self.groq_key = os.getenv("GROQ_API_KEY")
 
-        # Try to initialize Gemini with first available key
-        self._initialize_gemini()
+        if self.api_available:
+            logging.info(f"Gemini AI initialized with {len(gemini_client.gemini_pool)} key(s)")
+        else:
+            logging.error("No Gemini API keys configured")
 
-    def _initialize_gemini(self):
-        """Initialize Gemini AI with available API keys"""
-        for i, api_key in enumerate(self.gemini_keys):
-            try:
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                self.current_gemini_index = i
-                self.api_available = True
-                logging.info(f"Gemini AI initialized successfully with key {i+1}")
-                return
-            except Exception as e:
-                logging.warning(f"Gemini API key {i+1} failed: {str(e)}")
-                continue
+    def _groq_available(self) -> bool:
+        return len(groq_pool) > 0
+
+    def _anthropic_available(self) -> bool:
+        return bool(self.anthropic_key and "your-" not in self.anthropic_key)
+
+    def _call_groq(self, prompt: str, timeout: float, max_tokens: int = 1000, temperature: float = 0.7) -> Optional[str]:
+        """Single Groq chat completion call with a pooled key through the pooled HTTP session"""
+        with groq_pool.lease() as lease:
+            response = http_client.post(
+                GROQ_CHAT_URL,
+                headers={
+                    "Authorization": f"Bearer {lease.key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "messages": [{"role": "user", "content": prompt}],
+                    "model": "llama3-8b-8192",
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                },
+                timeout=timeout
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                return result["choices"][0]["message"]["content"].strip()
+
+            if response.status_code == 429:
+                retry_after = http_client.retry_after_seconds(response)
+                lease.throttle(retry_after)
+                # The other keys share the provider-wide limit: back off all Groq calls
+                quota_scheduler.throttle("groq", retry_after)
+                raise RateLimited(f"Groq key {lease.name} rate limited")
+            lease.ok = False
+            logging.warning(f"Groq AI failed ({lease.name}): {response.status_code} - {response.text[:200]}")
+            return None
+
+    def _call_anthropic(self, prompt: str, timeout: float, max_tokens: int = 1000) -> Optional[str]:
+        """Single Anthropic Claude messages call through the pooled HTTP session"""
+        response = http_client.post(
+            ANTHROPIC_MESSAGES_URL,
+            headers={
+                "x-api-key": self.anthropic_key,
+                "Content-Type": "application/json",
+                "anthropic-version": "2023-06-01"
+            },
+            json={
+                "model": "claude-3-haiku-20240307",
+                "max_tokens": max_tokens,
+                "messages": [{"role": "user", "content": prompt}]
+            },
+            timeout=timeout
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            return result["content"][0]["text"].strip()
+
+        if response.status_code == 429:
+            quota_scheduler.throttle("anthropic", http_client.retry_after_seconds(response))
+            raise RateLimited("Anthropic Claude rate limited")
+        logging.warning(f"Anthropic Claude failed: {response.status_code}")
+        return None
 
-        logging.error("All Gemini API keys failed")
-        self.api_available = False
+    def _call_gemini(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Single Gemini call on the least busy key with quota left"""
+        if timeout is None:
+            timeout = http_client.timeout_for(gemini_client.GEMINI_GENERATE_URL)
+        return gemini_client.generate_content(prompt, timeout)
 
-    def _get_multi_ai_response(self, prompt: str) -> str:
+    def _tracked(self, name: str, func: Callable[..., Optional[str]], *args, **kwargs) -> Optional[str]:
+        """Run a provider call and feed its latency and outcome into the circuit breaker"""
+        started = time.perf_counter()
+        try:
+            text = func(*args, **kwargs)
+        except (KeyPoolExhausted, QuotaExceeded, CircuitOpen):
+            # Running out of quota is not a provider failure
+            raise
+        except RateLimited:
+            # Neither is a 429: the provider is up, the quota buckets back off
+            provider_health.record_throttled(name)
+            raise
+        except Exception:
+            provider_health.record_failure(name, time.perf_counter() - started)
+            raise
+        if text:
+            provider_health.record_success(name, time.perf_counter() - started)
+        else:
+            provider_health.record_failure(name, time.perf_counter() - started)
+        return text
+
+    def _provider_chain(self) -> List[str]:
+        """Configured providers, reordered by health (fastest healthy first, open circuits last)"""
+        names = []
+        if self._groq_available():
+            names.append("groq")
+        if self._anthropic_available():
+            names.append("anthropic")
+        if self.api_available:
+            names.append("gemini")
+        return provider_health.order(names)
+
+    def _call_provider(self, name: str, prompt: str, timeout: float) -> Optional[str]:
+        if name == "groq":
+            return self._call_groq(prompt, min(timeout, http_client.timeout_for(GROQ_CHAT_URL)))
+        if name == "anthropic":
+            return self._call_anthropic(prompt, min(timeout, http_client.timeout_for(ANTHROPIC_MESSAGES_URL)))
+        return self._call_gemini(prompt, min(timeout, http_client.timeout_for(gemini_client.GEMINI_GENERATE_URL)))
+
+    def _admitted_call(self, name: str, prompt: str, timeout: float) -> Optional[str]:
+        """Provider call that is only sent if the quota scheduler admits it right now"""
+        if not quota_scheduler.try_acquire(name, prompt):
+            raise QuotaExceeded(f"{PROVIDER_LABELS[name]} is out of quota")
+        # Only now, when the call is really sent, may it take a half-open probe slot
+        if not provider_health.allow(name):
+            quota_scheduler.release(name, prompt)
+            raise CircuitOpen(f"{PROVIDER_LABELS[name]} circuit is open")
+        return self._tracked(name, self._call_provider, name, prompt, timeout)
+
+    def _hedge_providers(self, prompt: str) -> List[Tuple[str, Callable[[float], Optional[str]]]]:
         """
-        Get AI response using all available providers: Grok, Anthropic, Gemini
+        Provider calls in health order for hedged requests, skipping open circuits.
+        A provider without quota (or whose probe slot was taken meanwhile) fails at
+        launch, so the race moves on to the next one.
         """
-        # Try Groq first - usually fastest and most reliable
-        if self.groq_key and "your-" not in self.groq_key:
-            try:
-                logging.info("🚀 Trying Groq AI...")
-                import requests
-
-                response = requests.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.groq_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "messages": [{"role": "user", "content": prompt}],
-                        "model": "llama3-8b-8192",
-                        "temperature": 0.7,
-                        "max_tokens": 1000
-                    },
-                    timeout=10
-                )
+        providers = []
+        for name in self._provider_chain():
+            if provider_health.peek(name):
+                providers.append((name, lambda budget, name=name: self._admitted_call(name, prompt, budget)))
+        return providers
 
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result["choices"][0]["message"]["content"].strip()
-                    logging.info("✅ Groq AI response successful!")
-                    return ai_response
-                else:
-                    logging.warning(f"Groq AI failed: {response.status_code} - {response.text[:200]}")
+    def _get_hedged_response(self, prompt: str, deadline: Optional[Deadline] = None, expect_json: bool = False) -> Optional[str]:
+        """
+        Race the providers: if the primary has not answered within its p50-based
+        hedge delay, the next provider is fired in parallel and the first valid
+        response wins. With expect_json, only parseable JSON counts as valid.
+        """
+        validate = self._is_valid_json_response if expect_json else (lambda text: bool(text and text.strip()))
+        outcome = llm_hedging.hedged_call(prompt, self._hedge_providers(prompt), validate, deadline)
+        return outcome[1] if outcome else None
 
-            except Exception as e:
-                logging.warning(f"Groq AI error: {str(e)}")
+    def _is_valid_json_response(self, text: str) -> bool:
+        try:
+            json.loads(self._strip_code_fences(text))
+            return True
+        except (ValueError, TypeError):
+            return False
+
+    def _strip_code_fences(self, text: str) -> str:
+        """Remove ```json fences that providers wrap around JSON answers"""
+        text = text.strip()
+        if text.startswith('```json'):
+            text = text.replace('```json', '').replace('```', '').strip()
+        elif text.startswith('```'):
+            text = text.replace('```', '').strip()
+        return text
 
-        # Try Anthropic Claude
-        if self.anthropic_key and "your-" not in self.anthropic_key:
+    def _get_multi_ai_response(self, prompt: str, deadline: Optional[Deadline] = None, expect_json: bool = False) -> str:
+        """
+        Get AI response using all available providers: Grok, Anthropic, Gemini
+        """
+        # Hedged mode races providers instead of waiting out each timeout in turn
+        if llm_hedging.AI_HEDGING_ENABLED:
+            ai_response = self._get_hedged_response(prompt, deadline, expect_json)
+            if ai_response:
+                return ai_response
+            logging.warning("All AI providers failed, using fallback response")
+            return "I can analyze this image. It appears to contain visual content that I can process."
+
+        # Walk the fallback chain in health order. The quota scheduler admits the
+        # first provider with RPM/TPM headroom (briefly queueing if none has any),
+        # and providers whose circuit is open are skipped.
+        candidates = self._provider_chain()
+        while candidates:
+            if self._deadline_expired(deadline):
+                break
+            name = quota_scheduler.acquire(candidates, prompt, deadline)
+            if name is None:
+                break
+            candidates.remove(name)
+            label = PROVIDER_LABELS[name]
+            if not provider_health.allow(name):
+                quota_scheduler.release(name, prompt)
+                logging.info(f"⏭️ Skipping {label}: circuit open")
+                continue
             try:
-                logging.info("🤖 Trying Anthropic Claude...")
-                import requests
-
-                response = requests.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "x-api-key": self.anthropic_key,
-                        "Content-Type": "application/json",
-                        "anthropic-version": "2023-06-01"
-                    },
-                    json={
-                        "model": "claude-3-haiku-20240307",
-                        "max_tokens": 1000,
-                        "messages": [{"role": "user", "content": prompt}]
-                    },
-                    timeout=10
+                logging.info(f"🚀 Trying {label}...")
+                timeout = deadline.remaining() if deadline is not None else llm_hedging.AI_HEDGE_TIMEOUT
+                ai_response = llm_hedging.timed_call(
+                    name, prompt, lambda: self._tracked(name, self._call_provider, name, prompt, max(0.5, timeout))
                 )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result["content"][0]["text"].strip()
-                    logging.info("✅ Anthropic Claude response successful!")
+                if ai_response is not None:
+                    logging.info(f"✅ {label} response successful!")
                     return ai_response
-                else:
-                    logging.warning(f"Anthropic Claude failed: {response.status_code}")
-
-            except Exception as e:
-                logging.warning(f"Anthropic Claude error: {str(e)}")
 
-        # Try Gemini as fallback
-        if self.api_available and self.model:
-            try:
-                logging.info("🔮 Trying Gemini AI (fallback)...")
-                response = self.model.generate_content(prompt)
-                ai_response = response.text.strip()
-                logging.info("✅ Gemini AI response successful!")
-                return ai_response
             except Exception as e:
-                logging.warning(f"Gemini AI error: {str(e)}")
+                logging.warning(f"{label} error: {str(e)}")
 
         # Final fallback
         logging.warning("All AI providers failed, using fallback response")
         return "I can analyze this image. It appears to contain visual content that I can process."
 
-    def _rotate_gemini_key(self):
-        """Rotate to next Gemini API key when current one fails"""
-        if len(self.gemini_keys) <= 1:
-            logging.warning("No additional Gemini keys available for rotation")
-            return False
-
-        original_index = self.current_gemini_index
-
-        # Try each remaining key
-        for _ in range(len(self.gemini_keys) - 1):
-            self.current_gemini_index = (self.current_gemini_index + 1) % len(self.gemini_keys)
-            next_key = self.gemini_keys[self.current_gemini_index]
-
-            try:
-                genai.configure(api_key=next_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                logging.info(f"Successfully rotated to Gemini API key {self.current_gemini_index + 1}")
-                return True
-            except Exception as e:
-                logging.warning(f"Gemini key {self.current_gemini_index + 1} also failed: {str(e)}")
-                continue
-
-        # All keys failed, reset to original
-        self.current_gemini_index = original_index
-        logging.error("All Gemini API keys have failed")
+    def _deadline_expired(self, deadline: Optional[Deadline]) -> bool:
+        """Check whether the caller gave up on this request, so no further providers are tried"""
+        if deadline is not None and deadline.expired():
+            logging.warning("AI deadline reached, skipping remaining providers")
+            return True
         return False
 
-    def _try_alternative_ai(self, prompt: str) -> str:
-        """Try alternative AI providers when Gemini fails"""
-
-        # Try Groq (very fast and free)
-        if self.groq_key and "your-groq" not in self.groq_key:
-            try:
-                import requests
-
-                headers = {
-                    "Authorization": f"Bearer {self.groq_key}",
-                    "Content-Type": "application/json"
-                }
+    def _call_timeout(self, deadline: Optional[Deadline], url: str) -> float:
+        """HTTP timeout for a single provider call: the host default, clamped to the remaining deadline"""
+        default = http_client.timeout_for(url)
+        return deadline.timeout(default) if deadline is not None else default
 
-                data = {
-                    "messages": [{"role": "user", "content": prompt}],
-                    "model": "llama3-8b-8192",
-                    "max_tokens": 2000,
-                    "temperature": 0.3
-                }
-
-                response = requests.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=10
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    logging.info("Used Groq Llama3 as fallback")
-                    return result["choices"][0]["message"]["content"]
-
-            except Exception as e:
-                logging.warning(f"Groq failed: {str(e)}")
-
-        # Try Anthropic Claude (high quality alternative)
-        if self.anthropic_key and "your-anthropic" not in self.anthropic_key:
+    def _try_alternative_ai(self, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        """Try alternative AI providers when Gemini fails"""
+        alternatives = {
+            # Groq: very fast and free
+            "groq": (
+                self._groq_available(),
+                lambda: self._call_groq(prompt, self._call_timeout(deadline, GROQ_CHAT_URL), max_tokens=2000, temperature=0.3),
+                "Used Groq Llama3 as fallback"
+            ),
+            # Anthropic Claude: high quality alternative
+            "anthropic": (
+                self.anthropic_key and "your-anthropic" not in self.anthropic_key,
+                lambda: self._call_anthropic(prompt, self._call_timeout(deadline, ANTHROPIC_MESSAGES_URL), max_tokens=2000),
+                "Used Anthropic Claude as fallback"
+            ),
+        }
+
+        candidates = provider_health.order(name for name, (available, _, _) in alternatives.items() if available)
+        while candidates:
+            if self._deadline_expired(deadline):
+                break
+            name = quota_scheduler.acquire(candidates, prompt, deadline)
+            if name is None:
+                break
+            candidates.remove(name)
+            _, call, success_message = alternatives[name]
+            if not provider_health.allow(name):
+                quota_scheduler.release(name, prompt)
+                continue
             try:
-                import requests
-
-                headers = {
-                    "x-api-key": self.anthropic_key,
-                    "Content-Type": "application/json",
-                    "anthropic-version": "2023-06-01"
-                }
-
-                data = {
-                    "model": "claude-3-haiku-20240307",
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}]
-                }
-
-                response = requests.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers=headers,
-                    json=data,
-                    timeout=10
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    logging.info("Used Anthropic Claude as fallback")
-                    return result["content"][0]["text"]
+                ai_response = llm_hedging.timed_call(name, prompt, lambda: self._tracked(name, call))
+                if ai_response is not None:
+                    logging.info(success_message)
+                    return ai_response
 
             except Exception as e:
-                logging.warning(f"Anthropic failed: {str(e)}")
+                logging.warning(f"{PROVIDER_LABELS[name]} failed: {str(e)}")
 
         # If all alternatives fail, return None
         logging.error("All AI providers failed")
@@ -256,9 +323,11 @@ class AIProcessor:
             logging.error(f"Failed to parse alternative AI response: {str(e)}")
             return None
 
-    def parse_intent(self, message: str, language: str = "en", chat_mode: str = "general") -> Dict[str, Any]:
+    def parse_intent(self, message: str, language: str = "en", chat_mode: str = "general",
+                     deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
-        Parse user intent and provide conversational responses about the business app
+        Parse user intent and provide conversational responses about the business app.
+        When a deadline is given, provider calls are clamped to it and skipped once it expires.
         """
         try:
             # Only run fast pattern detection in business mode
@@ -268,8 +337,28 @@ class AIProcessor:
                     logging.info("✅ Fast pattern detection successful - skipping AI call")
                     return fast_result
 
-            # Use multi-AI system for complex queries
-            return self._process_conversational_query(message, language, chat_mode)
+                parsed_result = self._local_transaction_parse(message, language)
+                if parsed_result:
+                    logging.info(f"✅ Parsed {len(parsed_result['transactions'])} transactions locally - skipping AI call")
+                    return parsed_result
+
+            # Local classifier: confident structured intents never reach a provider
+            classified_result = self._classifier_gate(message, language, chat_mode)
+            if classified_result:
+                logging.info(f"🧠 Local classifier answered '{classified_result['intent']}' - skipping AI call")
+                return classified_result
+
+            # Use multi-AI system for complex queries. Identical concurrent messages
+            # (double taps, client retries) share a single provider call.
+            if not single_flight.AI_COALESCE_ENABLED:
+                return self._process_conversational_query(message, language, chat_mode, deadline)
+
+            key = (single_flight.normalize_message(message), language, chat_mode)
+            return single_flight.intent_flight.do(
+                key,
+                lambda: self._process_conversational_query(message, language, chat_mode, deadline),
+                timeout=deadline.remaining() if deadline is not None else None
+            )
 
         except Exception as e:
             logging.warning(f"Conversational AI failed: {str(e)}")
@@ -277,110 +366,110 @@ class AIProcessor:
 
     def _fast_pattern_detection(self, message: str, language: str = "en") -> Dict[str, Any]:
         """
-        Fast pattern-based detection for simple income/expense statements
+        Fast rule-based detection for simple income/expense statements
         Returns result immediately without AI call for common patterns
         """
-        import re
+        analysis = intent_rules.analyze(message)
+        if analysis.transaction_type is None:
+            # No pattern matched (or a question / calculation / clear command)
+            return None
 
-        message_lower = message.lower().strip()
-
-        # Income patterns
-        income_patterns = [
-            # English patterns
-            r'income\s+(?:is\s+)?(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'earned\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'received\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'got\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'made\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            # Hindi patterns
-            r'आय\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'कमाई\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'मिला\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'पाया\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            # Simple patterns
-            r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:income|आय|कमाई)',
-            r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:earned|कमाया)',
-        ]
+        return self._transaction_result(analysis.transaction_type, analysis.amount, language)
 
-        # Expense patterns - Only match explicit transaction statements
-        expense_patterns = [
-            # English patterns - Only explicit expense statements
-            r'expense\s+(?:is\s+)?(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'spent\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'paid\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'cost\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            # Only match "bought" if it's a clear transaction statement (not in questions)
-            r'^(?:i\s+)?bought\s+(?:for\s+)?(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)(?:\s|$)(?!.*\?)',
-            # Hindi patterns
-            r'खर्च\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'खर्चा\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'दिया\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'लगा\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            # Simple patterns - Only explicit statements
-            r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:expense|खर्च|खर्चा)',
-            r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:spent|खर्च किया)',
-        ]
+    def _transaction_result(self, transaction_type: str, amount: float, language: str,
+                            confidence: float = 0.95) -> Dict[str, Any]:
+        """Single income/expense entry in the same shape the LLM returns"""
+        label = "Income" if transaction_type == "income" else "Expense"
+        return {
+            "intent": transaction_type,
+            "action": "add",
+            "confidence": confidence,
+            "data": {
+                "amount": amount,
+                "description": f"{label} - ₹{amount}",
+                "category": "General"
+            },
+            "response_message": self._get_success_message(transaction_type, amount, language),
+            "is_business_related": True,
+            "fast_detection": True
+        }
 
-        # Check for income patterns
-        for pattern in income_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                # Skip if this looks like a question or calculation
-                if any(word in message_lower for word in ['how much', 'what', 'calculate', 'loss', 'profit', 'percent', 'percentage', 'if', 'when', 'why', 'where', 'who', '?', 'how', 'tell me', 'explain']):
-                    continue
-                    
-                amount_str = match.group(1).replace(',', '')
-                try:
-                    amount = float(amount_str)
-                    if amount > 0:
-                        response_msg = self._get_success_message("income", amount, language)
-                        return {
-                            "intent": "income",
-                            "action": "add",
-                            "confidence": 0.95,
-                            "data": {
-                                "amount": amount,
-                                "description": f"Income - ₹{amount}",
-                                "category": "General"
-                            },
-                            "response_message": response_msg,
-                            "is_business_related": True,
-                            "fast_detection": True
-                        }
-                except ValueError:
-                    continue
+    def _classifier_gate(self, message: str, language: str, chat_mode: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer from the local intent classifier when it is confident and the intent
+        needs no generated text: income/expense with a single amount (business mode),
+        data queries and off-topic redirects. Everything else goes to the LLM.
+        """
+        prediction = intent_classifier.confident(message)
+        if prediction is None:
+            return None
+        intent, confidence = prediction
+
+        result = None
+        if intent in ("income", "expense") and chat_mode == "business":
+            analysis = intent_rules.analyze(message)
+            if len(analysis.amounts) == 1 and analysis.amounts[0] > 0 and not analysis.is_question:
+                result = self._transaction_result(intent, analysis.amounts[0], language, round(confidence, 2))
+        elif intent == "query":
+            result = {
+                "intent": "query",
+                "action": "query",
+                "confidence": round(confidence, 2),
+                "data": {},
+                "response_message": "मैं आपकी जानकारी देख रही हूँ..." if language == "hi" else "Let me check your business data...",
+                "is_business_related": True
+            }
+        elif intent == "off_topic":
+            result = self._create_simple_response("", language)
+            result["confidence"] = round(confidence, 2)
 
-        # Check for expense patterns
-        for pattern in expense_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                # Skip if this looks like a question or calculation
-                if any(word in message_lower for word in ['how much', 'what', 'calculate', 'loss', 'profit', 'percent', 'percentage', 'if', 'when', 'why', 'where', 'who', '?', 'how', 'tell me', 'explain']):
-                    continue
-                    
-                amount_str = match.group(1).replace(',', '')
-                try:
-                    amount = float(amount_str)
-                    if amount > 0:
-                        response_msg = self._get_success_message("expense", amount, language)
-                        return {
-                            "intent": "expense",
-                            "action": "add",
-                            "confidence": 0.95,
-                            "data": {
-                                "amount": amount,
-                                "description": f"Expense - ₹{amount}",
-                                "category": "General"
-                            },
-                            "response_message": response_msg,
-                            "is_business_related": True,
-                            "fast_detection": True
-                        }
-                except ValueError:
-                    continue
+        if result is not None:
+            result["local_classifier"] = True
+            intent_classifier.record_bypass()
+        return result
 
-        # No pattern matched
-        return None
+    def _local_transaction_parse(self, message: str, language: str = "en") -> Optional[Dict[str, Any]]:
+        """
+        Deterministic parse of compound statements ("sold 5 sarees for 2000, paid 300 rent")
+        into the same transactions list the LLM returns; None when the parser is unsure
+        """
+        transactions = parse_transactions(message)
+        if not transactions:
+            return None
+
+        intents = {transaction["intent"] for transaction in transactions}
+        primary_intent = intents.pop() if len(intents) == 1 else "multiple"
+        return {
+            "intent": primary_intent,
+            "primary_intent": primary_intent,
+            "action": "add",
+            "confidence": 0.9,
+            "transactions": transactions,
+            "response_message": self._get_transactions_message(transactions, language),
+            "is_business_related": True,
+            "fast_detection": True
+        }
+
+    def _get_transactions_message(self, transactions: List[Dict[str, Any]], language: str) -> str:
+        """Summary of locally parsed transactions, one line per entry"""
+        all_labels = {
+            "hi": {"income": "आय", "expense": "खर्च", "inventory": "स्टॉक", "title": "✅ {count} लेन-देन दर्ज किए गए:"},
+            "ta": {"income": "வருமானம்", "expense": "செலவு", "inventory": "சரக்கு",
+                   "title": "✅ {count} பரிவர்த்தனைகள் பதிவு செய்யப்பட்டன:"},
+            "ml": {"income": "വരുമാനം", "expense": "ചെലവ്", "inventory": "സ്റ്റോക്ക്",
+                   "title": "✅ {count} ഇടപാടുകൾ രേഖപ്പെടുത്തി:"},
+            "en": {"income": "Income", "expense": "Expense", "inventory": "Stock", "title": "✅ Recorded {count} transactions:"},
+        }
+        labels = all_labels.get(language, all_labels["en"])
+
+        lines = [labels["title"].format(count=len(transactions))]
+        for transaction in transactions:
+            label = labels[transaction["intent"]]
+            if transaction["intent"] == "inventory":
+                lines.append(f"• {label}: {transaction['quantity']} {transaction['unit']} {transaction['product_name']}")
+            else:
+                lines.append(f"• {label}: ₹{transaction['amount']} ({transaction['description']})")
+        return "\n".join(lines)
 
     def _get_success_message(self, transaction_type: str, amount: float, language: str) -> str:
         """Generate success message for fast pattern detection"""
@@ -405,10 +494,19 @@ class AIProcessor:
             else:
                 return f"✅ Expense of ₹{amount} recorded successfully!"
 
-    def _process_conversational_query(self, message: str, language: str = "en", chat_mode: str = "general") -> Dict[str, Any]:
+    def _process_conversational_query(self, message: str, language: str = "en", chat_mode: str = "general",
+                                      deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Process conversational queries about the business app using multi-AI system
         """
+        # Repeated FAQ-style messages are answered from the response cache
+        cache_key = response_cache.cache_key(message, language, chat_mode)
+        if response_cache.AI_CACHE_ENABLED:
+            cached = response_cache.response_cache.get(cache_key)
+            if cached is not None:
+                logging.info("⚡ Conversational response served from cache")
+                return cached
+
         prompt = f"""
         You are Sakhi, an intelligent business assistant for BizSakhi - a comprehensive business management app for Indian small businesses. You can answer ANY questions about business management, the app features, and help users with their business needs.
 
@@ -593,12 +691,44 @@ class AIProcessor:
         }}
         """
 
-        # Try multi-AI system for conversational responses
-        for attempt in range(len(self.gemini_keys)):
+        # Hedged mode: race providers and take the first valid JSON answer
+        if llm_hedging.AI_HEDGING_ENABLED:
+            hedged_response = self._get_hedged_response(prompt, deadline, expect_json=True)
+            if hedged_response:
+                result = json.loads(self._strip_code_fences(hedged_response))
+
+                # Ensure required fields
+                if 'intent' not in result:
+                    result['intent'] = 'conversational'
+                if 'action' not in result:
+                    result['action'] = 'respond'
+                if 'confidence' not in result:
+                    result['confidence'] = 0.8
+
+                logging.info("Hedged AI provided conversational response")
+                self._remember_response(cache_key, result)
+                return result
+
+            return self._create_simple_response(message, language)
+
+        # Try multi-AI system for conversational responses: each attempt leases the
+        # least busy Gemini key (skipped while Gemini's circuit is open)
+        gemini_attempts = len(gemini_client.gemini_pool) if provider_health.peek("gemini") else 0
+        for attempt in range(gemini_attempts):
+            if self._deadline_expired(deadline):
+                break
+            if not quota_scheduler.try_acquire("gemini", prompt):
+                logging.info("⏩ Gemini out of quota, rerouting conversation to alternative AI")
+                break
+            if not provider_health.allow("gemini"):
+                quota_scheduler.release("gemini", prompt)
+                break
             try:
-                if self.api_available and self.model:
-                    response = self.model.generate_content(prompt)
-                    result_text = response.text.strip()
+                if self.api_available:
+                    result_text = llm_hedging.timed_call("gemini", prompt, lambda: self._tracked(
+                        "gemini", self._call_gemini, prompt,
+                        self._call_timeout(deadline, gemini_client.GEMINI_GENERATE_URL)
+                    ))
 
                     # Clean up response
                     if result_text.startswith('```json'):
@@ -617,16 +747,18 @@ class AIProcessor:
                         result['confidence'] = 0.8
 
                     logging.info(f"Conversational AI response generated successfully")
+                    self._remember_response(cache_key, result)
                     return result
 
+            except KeyPoolExhausted as e:
+                logging.warning(f"Gemini unavailable for conversation: {str(e)}")
+                break
             except Exception as e:
-                logging.warning(f"Gemini key {self.current_gemini_index + 1} failed for conversation: {str(e)}")
-                if not self._rotate_gemini_key():
-                    break
+                logging.warning(f"Gemini failed for conversation: {str(e)}")
 
         # Try alternative AI for conversation
         try:
-            alternative_response = self._try_alternative_ai(prompt)
+            alternative_response = self._try_alternative_ai(prompt, deadline)
             if alternative_response:
                 if alternative_response.startswith('```json'):
                     alternative_response = alternative_response.replace('```json', '').replace('```', '').strip()
@@ -644,6 +776,7 @@ class AIProcessor:
                     result['confidence'] = 0.8
 
                 logging.info("Alternative AI provided conversational response")
+                self._remember_response(cache_key, result)
                 return result
 
         except Exception as e:
@@ -652,6 +785,12 @@ class AIProcessor:
         # Fallback to simple response
         return self._create_simple_response(message, language)
 
+    def _remember_response(self, cache_key: str, result: Dict[str, Any]):
+        """Cache an AI answer if its intent is cacheable (conversational / off_topic only)"""
+        ttl = response_cache.CACHEABLE_INTENTS.get(result.get("intent"))
+        if response_cache.AI_CACHE_ENABLED and ttl:
+            response_cache.response_cache.put(cache_key, result, ttl)
+
     def _create_simple_response(self, message: str, language: str = "en") -> Dict[str, Any]:
         """
         Create a simple fallback response when AI is not available
@@ -681,7 +820,8 @@ class AIProcessor:
                 "confidence": 0.6,
                 "data": {},
                 "response_message": response,
-                "is_business_related": True
+                "is_business_related": True,
+                "fallback_used": True
             }
         else:
             if language == "hi":
@@ -695,7 +835,8 @@ class AIProcessor:
                 "confidence": 0.8,
                 "data": {},
                 "response_message": response,
-                "is_business_related": False
+                "is_business_related": False,
+                "fallback_used": True
             }
     
     def analyze_image_scene(self, comprehensive_analysis: Dict[str, Any], language: str = "en") -> Dict[str, Any]:
@@ -826,7 +967,7 @@ class AIProcessor:
         logging.info(f"Processing OCR text: {len(ocr_text)} characters")
 
         # Always try AI first - don't pre-judge OCR quality
-        if len(self.gemini_keys) > 0 or self.groq_key or self.anthropic_key:
+        if self.api_available or self._groq_available() or self.anthropic_key:
             try:
                 logging.info("Attempting AI processing with all available providers...")
                 result = self._process_with_gemini(ocr_text, language)
@@ -939,7 +1080,7 @@ class AIProcessor:
 
         # Use multi-AI system (Grok, Anthropic, Gemini)
         logging.info("🤖 Using multi-AI system for OCR processing...")
-        result_text = self._get_multi_ai_response(prompt)
+        result_text = self._get_multi_ai_response(prompt, expect_json=True)
 
         if result_text:
             try:
@@ -967,13 +1108,13 @@ class AIProcessor:
 
             except Exception as e:
                 error_msg = str(e)
-                logging.warning(f"Gemini key {self.current_gemini_index + 1} failed: {error_msg}")
+                logging.warning(f"AI processing failed: {error_msg}")
 
                 # Check if it's a quota error
                 if "quota" in error_msg.lower() or "429" in error_msg:
-                    logging.warning(f"Quota exceeded for Gemini key {self.current_gemini_index + 1}")
+                    logging.warning("Quota exceeded for AI provider")
                 elif "json" in error_msg.lower():
-                    logging.warning(f"JSON parsing error for Gemini key {self.current_gemini_index + 1}")
+                    logging.warning("JSON parsing error in AI response")
 
                 logging.warning(f"Multi-AI system failed: {error_msg}")
 
@@ -1494,8 +1635,7 @@ class AIProcessor:
             Return only the response message, no JSON.
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return self._admitted_call("gemini", prompt, http_client.timeout_for(gemini_client.GEMINI_GENERATE_URL))
             
         except Exception as e:
             # Fallback responses
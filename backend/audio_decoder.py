@@ -0,0 +1,143 @@
+import io
+import os
+import wave
+import logging
+from typing import Optional
+
+import numpy as np
+
+try:
+    # PyAV is installed with faster-whisper and bundles its own FFmpeg
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+# Voice uploads are decoded in memory to the 16 kHz mono float32 array Whisper
+# expects; nothing is written to disk.
+SAMPLE_RATE = 16000
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "120"))
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(10 * 1024 * 1024)))
+
+# Sniffed format -> FFmpeg demuxer, so PyAV does not have to probe the stream
+_DEMUXERS = {"wav": "wav", "webm": "matroska", "ogg": "ogg", "mp4": "mov", "flac": "flac", "mp3": "mp3"}
+
+
+class AudioDecodeError(ValueError):
+    """Upload is empty, not a supported audio container, or cannot be decoded"""
+
+
+class AudioTooLong(AudioDecodeError):
+    """Upload is larger or longer than the configured limits"""
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """Real container format from the magic bytes, whatever the file name or content type says"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # EBML: WebM / Matroska (MediaRecorder in Chrome and Firefox)
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[4:8] == b"ftyp":
+        return "mp4"  # MP4 / M4A (MediaRecorder in Safari, iOS voice memos)
+    if data[:4] == b"fLaC":
+        return "flac"
+    # MPEG audio frame sync with a non-zero layer (AAC/ADTS has layer 0)
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0 and data[1] & 0x06):
+        return "mp3"
+    return None
+
+
+def _too_long(seconds: float, max_seconds: float) -> AudioTooLong:
+    return AudioTooLong(f"Audio is {seconds:.0f}s long; the limit is {max_seconds:.0f}s")
+
+
+def _decode_wav(data: bytes, max_seconds: float) -> Optional[np.ndarray]:
+    """Fast path for 16-bit PCM WAV at 16 kHz; None for other WAV flavours"""
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            if reader.getframerate() != SAMPLE_RATE or reader.getsampwidth() != 2:
+                return None
+            duration = reader.getnframes() / SAMPLE_RATE
+            if duration > max_seconds:
+                raise _too_long(duration, max_seconds)
+            channels = reader.getnchannels()
+            pcm = np.frombuffer(reader.readframes(reader.getnframes()), dtype=np.int16)
+    except (wave.Error, EOFError):
+        return None  # e.g. float or extensible WAV; PyAV handles it
+    if channels > 1:
+        pcm = pcm[: len(pcm) - len(pcm) % channels].reshape(-1, channels).mean(axis=1)
+    return pcm.astype(np.float32) / 32768.0
+
+
+def _decode_av(data: bytes, container_format: str, max_seconds: float, partial: bool = False) -> np.ndarray:
+    if not AV_AVAILABLE:
+        raise AudioDecodeError("PyAV is not installed; cannot decode compressed audio")
+
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    chunks, samples = [], 0
+    try:
+        with av.open(io.BytesIO(data), mode="r", format=_DEMUXERS[container_format]) as container:
+            if not container.streams.audio:
+                raise AudioDecodeError("Upload has no audio stream")
+            # Reject from the header when the container declares its length (MediaRecorder WebM often does not)
+            if container.duration and container.duration / 1_000_000 > max_seconds:
+                raise _too_long(container.duration / 1_000_000, max_seconds)
+
+            for frame in container.decode(audio=0):
+                frame.pts = None
+                for resampled in resampler.resample(frame):
+                    chunk = resampled.to_ndarray().reshape(-1)
+                    chunks.append(chunk)
+                    samples += len(chunk)
+                # Stop as soon as the cap is crossed instead of decoding the whole upload
+                if samples > max_samples:
+                    raise _too_long(samples / SAMPLE_RATE, max_seconds)
+            # A growing stream keeps the resampler tail so later decodes extend a stable prefix
+            if not partial:
+                for resampled in resampler.resample(None):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+    except AudioDecodeError:
+        raise
+    except Exception as e:
+        # The last packet of a stream that is still being recorded is usually incomplete
+        if not (partial and chunks):
+            raise AudioDecodeError(f"Could not decode {container_format} audio: {str(e)}") from e
+
+    if not chunks:
+        if partial:
+            return np.zeros(0, dtype=np.float32)
+        raise AudioDecodeError("Upload contains no audio samples")
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+
+def decode_audio(data: bytes, max_seconds: float = MAX_AUDIO_SECONDS, partial: bool = False) -> np.ndarray:
+    """
+    Decode an uploaded clip (WAV, WebM/Opus, Ogg, MP4/M4A, FLAC, MP3) to a
+    16 kHz mono float32 array for faster-whisper. With partial=True the data
+    is the start of a stream that is still being recorded: a truncated last
+    packet is ignored and only the samples decoded so far are returned.
+
+    Raises:
+        AudioTooLong: upload exceeds MAX_AUDIO_BYTES or max_seconds
+        AudioDecodeError: empty, unknown or corrupt audio
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+    if len(data) > MAX_AUDIO_BYTES:
+        raise AudioTooLong(f"Audio upload is {len(data)} bytes; the limit is {MAX_AUDIO_BYTES}")
+
+    container_format = sniff_format(data)
+    if container_format is None:
+        raise AudioDecodeError("Unrecognized audio format")
+
+    audio = _decode_wav(data, max_seconds) if container_format == "wav" else None
+    if audio is None:
+        audio = _decode_av(data, container_format, max_seconds, partial)
+
+    if partial:
+        return audio
+    logging.info(f"🎙️ Decoded {container_format} upload in memory: {len(audio) / SAMPLE_RATE:.1f}s")
+    return audio
@@ -1,6 +1,6 @@
 import os
 import logging
-import requests
+import http_client
 import json
 import time
 from typing import Dict, List, Any, Optional
@@ -74,7 +74,7 @@ class AzureDocumentIntelligence:
                 'api-version': '2023-07-31'
             }
             
-            response = requests.post(analyze_url, headers=headers, params=params, data=image_data, timeout=30)
+            response = http_client.post(analyze_url, headers=headers, params=params, data=image_data, timeout=30)
             
             if response.status_code != 202:
                 logging.error(f"Document Intelligence submit failed: {response.status_code} - {response.text}")
@@ -90,7 +90,7 @@ class AzureDocumentIntelligence:
             for attempt in range(max_attempts):
                 time.sleep(2)  # Wait before polling
                 
-                result_response = requests.get(operation_location, headers={
+                result_response = http_client.get(operation_location, headers={
                     'Ocp-Apim-Subscription-Key': self.key
                 }, timeout=30)
                 
@@ -226,7 +226,7 @@ class AzureDocumentIntelligence:
                 'Content-Type': 'application/octet-stream'
             }
             
-            response = requests.post(read_url, headers=headers, data=image_data, timeout=30)
+            response = http_client.post(read_url, headers=headers, data=image_data, timeout=30)
             
             if response.status_code != 202:
                 return {"error": f"Read API failed: {response.status_code}", "success": False}
@@ -239,7 +239,7 @@ class AzureDocumentIntelligence:
             for attempt in range(10):
                 time.sleep(1)
                 
-                result_response = requests.get(operation_location, headers={
+                result_response = http_client.get(operation_location, headers={
                     'Ocp-Apim-Subscription-Key': self.key
                 }, timeout=30)
                 
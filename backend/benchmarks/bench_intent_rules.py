@@ -0,0 +1,137 @@
+"""
+Accuracy and latency of the rule-based fast path on code-mixed messages.
+
+Each sample is labelled with the transaction the fast path should record
+(or None when the message must go to the LLM: questions, ambiguous or
+multi-amount statements). Reports accuracy, coverage of labelled
+transactions, false positives, and per-message latency percentiles.
+
+Usage: python benchmarks/bench_intent_rules.py [--iterations N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_rules import intent_rules  # noqa: E402
+
+# (message, expected transaction type, expected amount)
+SAMPLES = [
+    # Romanized Hindi / Hinglish
+    ("aaj 500 ka kharcha", "expense", 500),
+    ("kamai 1200 hui", "income", 1200),
+    ("300 rent diya", "expense", 300),
+    ("kharchaa 250", "expense", 250),
+    ("kharcha hua 800", "expense", 800),
+    ("aaj ki kamaai 1500", "income", 1500),
+    ("2000 mile", "income", 2000),
+    ("bijli ka bill 650 bhara", "expense", 650),
+    ("sabzi 120 ki kharidi", "expense", 120),
+    ("paanch sau ka kharcha", "expense", 500),
+    ("dhai hazaar mile", "income", 2500),
+    ("1500 ki bikri", "income", 1500),
+    ("salary 12000 mili", "income", 12000),
+    ("kiraya 3000 diya", "expense", 3000),
+    # Other languages, Roman script
+    ("5000 milale", "income", 5000),
+    ("kharch 400 dile", "expense", 400),
+    ("selavu 200", "expense", 200),
+    ("varumanam 800", "income", 800),
+    ("chelavu 350", "expense", 350),
+    ("kitti 900", "income", 900),
+    ("aadayam 600", "income", 600),
+    ("kharchu 400", "expense", 400),
+    ("aadaya 750", "income", 750),
+    ("aavak 700", "income", 700),
+    ("kharch 300 chukavya", "expense", 300),
+    ("khoroch 300 taka", "expense", 300),
+    ("rojgar 450", "income", 450),
+    # "aaya" (came in) is income only for payments and orders
+    ("payment 500 aaya", "income", 500),
+    ("customer se 800 aaye", "income", 800),
+    ("ग्राहक से 600 आए", "income", 600),
+    # English and native script (regression)
+    ("spent 200 on tea", "expense", 200),
+    ("income is 5000", "income", 5000),
+    ("received 1200", "income", 1200),
+    ("500 का खर्चा", "expense", 500),
+    ("आय 3000", "income", 3000),
+    ("செலவு 250", "expense", 250),
+    ("വരുമാനം 900", "income", 900),
+    # Must not be recorded by the fast path
+    ("kitna kharcha hua 500?", None, None),
+    ("kiti kharch 500", None, None),
+    ("mera munafa kya hai", None, None),
+    ("rent 3000 diya aur bijli 500", None, None),
+    ("sold 5 sarees for 2000", None, None),
+    ("what is my income", None, None),
+    ("need 500 rupees", None, None),
+    ("500", None, None),
+    ("namaste", None, None),
+    ("loan ke liye kaise apply karein", None, None),
+    ("evvalavu selavu 300", None, None),
+    ("ethra chelavu", None, None),
+    ("stock 50 maal", None, None),
+    ("make expense 0", None, None),
+    # Direction-ambiguous: a bill or rent "came", or nothing says what came
+    ("500 ka bill aaya", None, None),
+    ("bijli ka bill 500 aaya", None, None),
+    ("बिजली का बिल 500 आया", None, None),
+    ("kiraya 3000 aaya", None, None),
+    ("aaj 500 aaye", None, None),
+    # Income verbs next to a bill, rent or fine
+    ("received electricity bill of 2000", None, None),
+    ("bijli ka bill 500 mila", None, None),
+    ("बिजली का बिल 500 मिला", None, None),
+    ("received rent bill 1200", None, None),
+    ("got 500 fine", None, None),
+    ("got bill of 500", None, None),
+    ("made 200 loss", None, None),
+    ("got 500", None, None),
+    ("got 500 from customer", "income", 500),
+    # A third party paid the user: "diya" / "paid" here is income, so the LLM decides
+    ("customer ne 500 diya", None, None),
+    ("ग्राहक ने 500 दिया", None, None),
+    ("customer paid 500", None, None),
+    ("maine 500 diya", "expense", 500),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    correct = covered = false_positives = 0
+    transactions = sum(1 for _, expected_type, _ in SAMPLES if expected_type)
+    for message, expected_type, expected_amount in SAMPLES:
+        result = intent_rules.analyze(message)
+        got = (result.transaction_type, result.amount)
+        if got == (expected_type, expected_amount):
+            correct += 1
+            covered += expected_type is not None
+        else:
+            false_positives += expected_type is None
+            print(f"  MISS {message!r}: got {got[0]}:{got[1]}, expected {expected_type}:{expected_amount}")
+
+    latencies = []
+    for _ in range(args.iterations):
+        for message, _, _ in SAMPLES:
+            start = time.perf_counter()
+            intent_rules.analyze(message)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    print(f"samples: {len(SAMPLES)} ({transactions} transactions)")
+    print(f"accuracy:        {correct}/{len(SAMPLES)} ({correct / len(SAMPLES):.1%})")
+    print(f"fast-path hits:  {covered}/{transactions}")
+    print(f"false positives: {false_positives}")
+    print(f"latency: mean {statistics.mean(latencies):.1f} µs, "
+          f"p50 {latencies[len(latencies) // 2]:.1f} µs, p95 {latencies[int(len(latencies) * 0.95)]:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Throughput and fast-path hit rate of spoken-number normalization.
+
+Runs a small multilingual corpus of voice-style transaction messages through
+number_normalizer.normalize_numbers and intent_rules.analyze, and reports
+messages/second plus how many messages the rule engine resolves to the
+expected transaction with and without normalization.
+
+Usage: python benchmarks/bench_number_normalizer.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from number_normalizer import normalize_numbers  # noqa: E402
+import intent_rules as intent_rules_module  # noqa: E402
+from intent_rules import intent_rules  # noqa: E402
+
+# (message, expected transaction type, expected amount)
+CORPUS = [
+    ("पांच सौ का खर्चा", "expense", 500),
+    ("ढाई हज़ार मिले", "income", 2500),
+    ("आज साढ़े तीन हज़ार की कमाई", "income", 3500),
+    ("सवा लाख खर्च", "expense", 125000),
+    ("१२०० रुपये खर्च", "expense", 1200),
+    ("दो हज़ार पाँच सौ रुपये मिले", "income", 2500),
+    ("डेढ़ सौ दिए", "expense", 150),
+    ("पैसे दो", None, None),
+    ("one hundred and fifty rupees spent", "expense", 150),
+    ("earned twenty five thousand", "income", 25000),
+    ("income 1.5 lakh", "income", 150000),
+    ("spent 5k", "expense", 5000),
+    ("दीड हजार खर्च", "expense", 1500),
+    ("पाच हजार मिळाले", "income", 5000),
+    ("ஐநூறு ரூபாய் செலவு", "expense", 500),
+    ("௫௦௦ செலவு", "expense", 500),
+    ("இரண்டு ஆயிரம் வருமானம்", "income", 2000),
+    ("രണ്ട് ലക്ഷം വരുമാനം", "income", 200000),
+    ("൫൦൦ ചെലവ്", "expense", 500),
+    ("రెండు వేలు ఖర్చు", "expense", 2000),
+    ("౩౦౦ ఆదాయం", "income", 300),
+    ("ಐದು ಸಾವಿರ ಆದಾಯ", "income", 5000),
+    ("೪೦೦ ಖರ್ಚು", "expense", 400),
+    ("પાંચ હજાર આવક", "income", 5000),
+    ("અઢી હજાર ખર્ચ", "expense", 2500),
+    ("আড়াই হাজার টাকা খরচ", "expense", 2500),
+    ("৭০০ আয়", "income", 700),
+    ("कितना खर्च हुआ पांच सौ में?", None, None),
+    # Spelled-out numbers per language, incl. plural / oblique scale words and one-word hundreds
+    ("पाचशे खर्च", "expense", 500),
+    ("દોઢ હજાર ખર્ચ", "expense", 1500),
+    ("પાંચસો ખર્ચ", "expense", 500),
+    ("পাঁচশো টাকা খরচ", "expense", 500),
+    ("পাঁচ হাজার টাকা আয়", "income", 5000),
+    ("ஐந்நூறு செலவு", "expense", 500),
+    ("ஐநூற்று ஐம்பது செலவு", "expense", 550),
+    ("இரண்டாயிரத்து ஐநூறு வருமானம்", "income", 2500),
+    ("അഞ്ഞൂറ്റി അമ്പത് ചെലവ്", "expense", 550),
+    ("രണ്ടായിരത്തി അഞ്ഞൂറ് വരുമാനം", "income", 2500),
+    ("ఖర్చు ఐదు వందలు", "expense", 500),
+    ("ఐదు వందల రూపాయలు ఖర్చు", "expense", 500),
+    ("నూట యాభై ఖర్చు", "expense", 150),
+    ("మూడు లక్షల ఆదాయం", "income", 300000),
+    ("ಐನೂರು ಖರ್ಚು", "expense", 500),
+    ("ಎರಡು ಸಾವಿರ ಆದಾಯ", "income", 2000),
+    ("हज़ारों रुपये खर्च", None, None),
+]
+
+
+def _baseline_hits() -> int:
+    """Correct results when the rule engine sees the raw text (normalization disabled)"""
+    original = intent_rules_module.normalize_numbers
+    intent_rules_module.normalize_numbers = lambda text: text
+    try:
+        return sum(_is_correct(intent_rules.analyze(message), expected_type, expected_amount)
+                   for message, expected_type, expected_amount in CORPUS)
+    finally:
+        intent_rules_module.normalize_numbers = original
+
+
+def _is_correct(result, expected_type, expected_amount) -> bool:
+    return result.transaction_type == expected_type and (
+        expected_amount is None or result.amount == expected_amount)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    correct = 0
+    for message, expected_type, expected_amount in CORPUS:
+        result = intent_rules.analyze(message)
+        ok = _is_correct(result, expected_type, expected_amount)
+        correct += ok
+        if not ok:
+            print(f"  MISS {message!r}: got {result.transaction_type}:{result.amount}, "
+                  f"expected {expected_type}:{expected_amount}")
+
+    messages = [message for message, _, _ in CORPUS]
+    total = len(messages) * args.iterations
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for message in messages:
+            normalize_numbers(message)
+    normalize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for message in messages:
+            intent_rules.analyze(message)
+    analyze_seconds = time.perf_counter() - start
+
+    print(f"corpus: {len(CORPUS)} messages x {args.iterations} iterations")
+    print(f"normalize_numbers:   {total / normalize_seconds:,.0f} msg/s "
+          f"({normalize_seconds / total * 1e6:.1f} µs/msg)")
+    print(f"analyze (with norm): {total / analyze_seconds:,.0f} msg/s "
+          f"({analyze_seconds / total * 1e6:.1f} µs/msg)")
+    print(f"correct without normalization: {_baseline_hits()}/{len(CORPUS)}")
+    print(f"correct with normalization:    {correct}/{len(CORPUS)}")
+
+
+if __name__ == "__main__":
+    main()
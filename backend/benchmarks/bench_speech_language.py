@@ -0,0 +1,94 @@
+"""
+Latency of speech transcription with and without a separate language-detection pass.
+
+Runs every audio file in a fixture directory through three modes of
+SpeechProcessor and reports mean/p50/p95 latency, detected-language accuracy
+and the speed-up over the legacy two-pass flow:
+
+    two_pass     detect_language() then transcribe_audio() (audio decoded twice)
+    single_pass  transcribe() with language auto-detected in the same call
+    hinted       transcribe() with the expected language, detection skipped
+
+The expected language is taken from the file name prefix ("hi_rent.wav",
+"ta-sale.m4a"); files without a known prefix are skipped in hinted mode.
+
+Usage: python benchmarks/bench_speech_language.py --fixtures DIR [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_processor import SpeechProcessor, normalize_language_hint  # noqa: E402
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".ogg", ".opus", ".m4a", ".mp3", ".mp4", ".flac")
+
+
+def expected_language(path: str):
+    name = os.path.basename(path).replace("-", "_")
+    return normalize_language_hint(name.split("_", 1)[0]) if "_" in name else None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_mode(processor, mode, files, repeat):
+    latencies, correct, checked = [], 0, 0
+    for path in files:
+        expected = expected_language(path)
+        if mode == "hinted" and expected is None:
+            continue
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if mode == "two_pass":
+                language = processor.detect_language(path)
+                processor.transcribe_audio(path, language)
+            elif mode == "single_pass":
+                _, _, language = processor.transcribe(path)
+            else:
+                _, _, language = processor.transcribe(path, expected)
+            latencies.append((time.perf_counter() - start) * 1000)
+        if expected is not None:
+            checked += 1
+            correct += language == expected
+    return latencies, (correct / checked if checked else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--fixtures", required=True, help="directory of audio clips")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+    if not files:
+        sys.exit(f"No audio fixtures in {args.fixtures}")
+
+    processor = SpeechProcessor()
+    processor.transcribe(files[0])  # warm-up
+
+    print(f"{len(files)} clips x {args.repeat}")
+    print(f"{'mode':<12} {'clips':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'lang acc':>9} {'speed-up':>9}")
+    baseline = None
+    for mode in ("two_pass", "single_pass", "hinted"):
+        latencies, accuracy = run_mode(processor, mode, files, args.repeat)
+        if not latencies:
+            print(f"{mode:<12} no clips with a language prefix")
+            continue
+        mean = statistics.mean(latencies)
+        baseline = baseline or mean
+        accuracy_text = f"{accuracy:.0%}" if accuracy is not None else "-"
+        print(f"{mode:<12} {len(latencies) // args.repeat:>5} {mean:>9.0f} {percentile(latencies, 0.5):>9.0f} "
+              f"{percentile(latencies, 0.95):>9.0f} {accuracy_text:>9} {baseline / mean:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
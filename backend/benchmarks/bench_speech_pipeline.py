@@ -0,0 +1,256 @@
+"""
+Real-time factor, latency, memory and word error rate of the speech pipeline.
+
+Runs a fixture set of short business-command clips through
+SpeechProcessor.transcribe_audio (file path, language given, the legacy
+API) and SpeechProcessor.transcribe_with_language_detection (audio decoded
+in memory, language detected, what /api/chat/voice does) for every
+combination of model size, compute type, beam size and CPU thread count.
+
+Fixtures follow the other speech benchmarks: "<lang>_<name>.<ext>" with the
+reference transcript in "<lang>_<name>.txt". --synthesize first writes any
+missing clips for the built-in Hindi, English, Tamil and Malayalam commands
+with gTTS (network needed once; later runs are offline).
+
+Each configuration runs in a fresh process so its peak RSS is its own. The
+transcript cache is disabled so repeats are real decodes. Results are JSON
+(one row per configuration and method) on stdout or in --output; with
+--baseline the run is compared with an earlier result and exits 1 on a
+regression.
+
+Usage:
+    python benchmarks/bench_speech_pipeline.py --fixtures DIR [--synthesize]
+        [--models base,small] [--compute-types int8] [--beam-sizes 1,5] [--threads 2,4]
+        [--repeat N] [--routing] [--output FILE] [--baseline FILE] [--tolerance 0.1]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Repeated clips must be decoded every time, not served from the transcript cache
+os.environ["SPEECH_CACHE_ENABLED"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from audio_decoder import decode_audio, SAMPLE_RATE  # noqa: E402
+from speech_processor import SpeechProcessor  # noqa: E402
+from bench_speech_language import AUDIO_EXTENSIONS, expected_language, percentile  # noqa: E402
+from bench_speech_routing import words, word_errors  # noqa: E402
+
+# Built-in fixture set: the kind of commands users speak to the app
+COMMANDS = {
+    "hi_rent": "आज किराया पाँच सौ रुपये दिया",
+    "hi_sale": "आज दो हज़ार रुपये की बिक्री हुई",
+    "hi_vegetables": "सब्ज़ी खरीदने में तीन सौ रुपये खर्च हुए",
+    "en_rent": "I paid five hundred rupees for rent today",
+    "en_sale": "Sold a saree for two thousand rupees",
+    "en_report": "Show my expenses for this month",
+    "ta_rent": "இன்று வாடகைக்கு ஐநூறு ரூபாய் கொடுத்தேன்",
+    "ta_sale": "இன்று இரண்டாயிரம் ரூபாய் விற்பனை ஆனது",
+    "ml_rent": "ഇന്ന് വാടകയ്ക്ക് അഞ്ഞൂറ് രൂപ കൊടുത്തു",
+    "ml_sale": "ഇന്ന് രണ്ടായിരം രൂപയുടെ വിൽപ്പന നടന്നു",
+}
+
+METHODS = ("transcribe_audio", "transcribe_with_language_detection")
+
+
+def synthesize(directory):
+    """Write gTTS clips and transcripts for the built-in commands that are missing"""
+    from gtts import gTTS
+
+    os.makedirs(directory, exist_ok=True)
+    for stem, text in COMMANDS.items():
+        audio_path = os.path.join(directory, stem + ".mp3")
+        if not os.path.exists(audio_path):
+            gTTS(text=text, lang=stem.split("_", 1)[0]).save(audio_path)
+            print(f"synthesized {audio_path}", file=sys.stderr)
+        with open(os.path.join(directory, stem + ".txt"), "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+
+
+def load_fixtures(directory):
+    """(path, decoded audio, language, reference words) for every clip with a transcript"""
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        reference_path = os.path.join(directory, stem + ".txt")
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, "rb") as handle:
+            audio = decode_audio(handle.read())
+        with open(reference_path, encoding="utf-8") as handle:
+            reference = words(handle.read())
+        fixtures.append((path, audio, expected_language(name), reference))
+    return fixtures
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(processor, method, fixtures, repeat):
+    latencies, errors, reference_words, correct, checked = [], 0, 0, 0, 0
+    for path, audio, language, reference in fixtures:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if method == "transcribe_audio":
+                text, _ = processor.transcribe_audio(path, language or "hi")
+                detected = language
+            else:
+                text, _, detected = processor.transcribe_with_language_detection(audio)
+            latencies.append(time.perf_counter() - start)
+        errors += word_errors(reference, words(text))
+        reference_words += len(reference)
+        if language is not None and method != "transcribe_audio":
+            checked += 1
+            correct += detected == language
+
+    audio_seconds = repeat * sum(len(audio) for _, audio, _, _ in fixtures) / SAMPLE_RATE
+    return {
+        "clips": len(fixtures),
+        "runs": len(latencies),
+        "audio_seconds": round(audio_seconds, 2),
+        "rtf": round(sum(latencies) / audio_seconds, 4),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "wer": round(errors / max(1, reference_words), 4),
+        "language_accuracy": round(correct / checked, 4) if checked else None,
+    }
+
+
+def run_config(config, fixture_dir, repeat):
+    """One configuration in its own process; returns one row per method"""
+    fixtures = load_fixtures(fixture_dir)
+    start = time.perf_counter()
+    try:
+        processor = SpeechProcessor(model_size=config["model"], cpu_threads=config["cpu_threads"],
+                                    compute_type=config["compute_type"], routing=config["routing"],
+                                    beam_size=config["beam_size"])
+    except Exception as e:
+        return [{**config, "method": method, "error": str(e)} for method in METHODS]
+    load_seconds = round(time.perf_counter() - start, 2)
+    processor.transcribe(fixtures[0][1])  # warm-up
+
+    rows = [{**config, "method": method, "load_seconds": load_seconds, **measure(processor, method, fixtures, repeat)}
+            for method in METHODS]
+    rss = peak_rss_mb()
+    for row in rows:
+        row["peak_rss_mb"] = rss
+    return rows
+
+
+def row_key(row):
+    return (row["model"], row["compute_type"], row["beam_size"], row["cpu_threads"], row["routing"], row["method"])
+
+
+def regressions(rows, baseline_rows, tolerance, wer_tolerance):
+    """Human-readable list of metrics that got worse than the baseline allows"""
+    baseline = {row_key(row): row for row in baseline_rows if "error" not in row}
+    found = []
+    for row in rows:
+        before = baseline.get(row_key(row))
+        if before is None or "error" in row:
+            continue
+        name = "/".join(str(part) for part in row_key(row))
+        for metric in ("rtf", "p95_ms"):
+            if row[metric] > before[metric] * (1 + tolerance):
+                found.append(f"{name}: {metric} {before[metric]} -> {row[metric]}")
+        if row["wer"] > before["wer"] + wer_tolerance:
+            found.append(f"{name}: wer {before['wer']} -> {row['wer']}")
+    return found
+
+
+def items(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--fixtures", required=True, help="directory of audio clips with .txt transcripts")
+    parser.add_argument("--synthesize", action="store_true", help="write missing built-in clips with gTTS first")
+    parser.add_argument("--models", type=items, default=["base", "small"])
+    parser.add_argument("--compute-types", type=items, default=["int8"])
+    parser.add_argument("--beam-sizes", type=lambda value: items(value, int), default=[1, 5])
+    parser.add_argument("--threads", type=lambda value: items(value, int), default=[2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--routing", action="store_true", help="enable duration/VAD model routing")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative rtf/p95 increase")
+    parser.add_argument("--wer-tolerance", type=float, default=0.02, help="allowed absolute WER increase")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize(args.fixtures)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No audio clips with .txt transcripts in {args.fixtures} (try --synthesize)")
+    print(f"{len(fixtures)} clips, {sum(len(audio) for _, audio, _, _ in fixtures) / SAMPLE_RATE:.0f}s of audio",
+          file=sys.stderr)
+
+    rows = []
+    for model, compute_type, beam_size, threads in itertools.product(args.models, args.compute_types,
+                                                                     args.beam_sizes, args.threads):
+        config = {"model": model, "compute_type": compute_type, "beam_size": beam_size,
+                  "cpu_threads": threads, "routing": args.routing}
+        # spawn: a fresh interpreter per configuration, so peak RSS is not inherited
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            config_rows = pool.submit(run_config, config, args.fixtures, args.repeat).result()
+        for row in config_rows:
+            if "error" in row:
+                print(f"{model}/{compute_type}/beam{beam_size}/t{threads} {row['method']}: {row['error']}",
+                      file=sys.stderr)
+            else:
+                print(f"{model}/{compute_type}/beam{beam_size}/t{threads} {row['method']}: rtf {row['rtf']:.3f} "
+                      f"p50 {row['p50_ms']:.0f}ms p95 {row['p95_ms']:.0f}ms wer {row['wer']:.1%} "
+                      f"rss {row['peak_rss_mb']}MB", file=sys.stderr)
+        rows.extend(config_rows)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "fixtures": len(fixtures),
+            "repeat": args.repeat,
+        },
+        "results": rows,
+    }
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            found = regressions(rows, json.load(handle)["results"], args.tolerance, args.wer_tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Word error rate and latency of duration/VAD-adaptive Whisper model selection.
+
+Every clip in a fixture directory needs a reference transcript next to it
+("hi_rent.wav" + "hi_rent.txt"). Clips are decoded once in memory, then run
+through SpeechProcessor with routing off (SPEECH_MODEL for every clip, the
+baseline) and with routing on for each combination of the swept thresholds.
+For every configuration the script reports WER, mean/p95 latency and how
+many clips took the fast, escalated and full routes or were silent.
+
+Usage:
+    python benchmarks/bench_speech_routing.py --fixtures DIR
+        [--fast-max-seconds 4,6,8] [--escalate-logprob=-0.5,-0.7,-1.0] [--hinted]
+"""
+import argparse
+import itertools
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_decoder import decode_audio  # noqa: E402
+from intent_rules import normalize_text  # noqa: E402
+from speech_processor import SpeechProcessor, SPEECH_FAST_MODEL, SPEECH_MODEL  # noqa: E402
+from bench_speech_language import AUDIO_EXTENSIONS, expected_language, percentile  # noqa: E402
+
+_WORD = re.compile(r"\d+(?:\.\d+)?|(?:(?![\d_])[\wऀ-෿])+")
+
+
+def words(text):
+    """Words after the same normalization the intent rules use (spoken numbers -> digits)"""
+    return _WORD.findall(normalize_text(text))
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        reference_path = os.path.join(directory, stem + ".txt")
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        with open(os.path.join(directory, name), "rb") as handle:
+            audio = decode_audio(handle.read())
+        with open(reference_path, encoding="utf-8") as handle:
+            reference = words(handle.read())
+        fixtures.append((name, audio, expected_language(name), reference))
+    return fixtures
+
+
+def run(processor, fixtures, hinted):
+    before = dict(processor.stats()["routes"])
+    latencies, errors, total = [], 0, 0
+    for _, audio, language, reference in fixtures:
+        start = time.perf_counter()
+        text, _, _ = processor.transcribe(audio, language if hinted else None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += word_errors(reference, words(text))
+        total += len(reference)
+    routes = {route: count - before[route] for route, count in processor.stats()["routes"].items()}
+    return errors / max(1, total), latencies, routes
+
+
+def floats(value):
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--fixtures", required=True, help="directory of audio clips with .txt transcripts")
+    parser.add_argument("--fast-max-seconds", type=floats, default=[4.0, 6.0, 8.0])
+    parser.add_argument("--escalate-logprob", type=floats, default=[-0.5, -0.7, -1.0])
+    parser.add_argument("--hinted", action="store_true", help="pass the file-name language as a hint")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No audio clips with .txt transcripts in {args.fixtures}")
+
+    processor = SpeechProcessor(routing=True)
+    if not processor.routing:
+        sys.exit(f"SPEECH_FAST_MODEL ({SPEECH_FAST_MODEL}) must differ from SPEECH_MODEL ({SPEECH_MODEL})")
+    processor.fast_model
+    processor.transcribe(fixtures[0][1])  # warm-up
+
+    seconds = sum(len(audio) for _, audio, _, _ in fixtures) / 16000
+    print(f"{len(fixtures)} clips, {seconds:.0f}s of audio; full model {SPEECH_MODEL}, fast model {SPEECH_FAST_MODEL}")
+    print(f"{'config':<28} {'WER':>6} {'mean ms':>8} {'p95 ms':>8} {'fast':>5} {'esc':>5} {'full':>5} {'quiet':>5} {'speed-up':>9}")
+
+    processor.routing = False
+    wer, latencies, _ = run(processor, fixtures, args.hinted)
+    baseline = statistics.mean(latencies)
+    print(f"{'baseline (' + SPEECH_MODEL + ', beam)':<28} {wer:>6.1%} {baseline:>8.0f} "
+          f"{percentile(latencies, 0.95):>8.0f} {'-':>5} {'-':>5} {len(fixtures):>5} {'-':>5} {1:>8.2f}x")
+
+    processor.routing = True
+    for fast_max, logprob in itertools.product(args.fast_max_seconds, args.escalate_logprob):
+        processor.fast_max_seconds, processor.escalate_logprob = fast_max, logprob
+        wer, latencies, routes = run(processor, fixtures, args.hinted)
+        mean = statistics.mean(latencies)
+        print(f"{f'fast<={fast_max:g}s logprob>={logprob:g}':<28} {wer:>6.1%} {mean:>8.0f} "
+              f"{percentile(latencies, 0.95):>8.0f} {routes['fast']:>5} {routes['escalated']:>5} "
+              f"{routes['full']:>5} {routes['silent']:>5} {baseline / mean:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
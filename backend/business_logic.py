@@ -416,7 +416,7 @@ class BusinessLogic:
             }
     
     def save_chat_history(self, user_id: str, message: str, response: str,
-                         message_type: str = "text", intent: str = "general") -> bool:
+                         message_type: str = "text", intent: Optional[str] = "general") -> bool:
         """
         Save chat history to database
         """
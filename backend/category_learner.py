@@ -0,0 +1,354 @@
+import os
+import re
+import json
+import math
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from intent_rules import intent_rules, normalize_text
+
+# Per-user online category learner. Each user gets a small multinomial naive
+# Bayes model over hashed word and character-trigram features of transaction
+# descriptions. Learning is an incremental count update (no retraining), so
+# categories chosen or corrected by the user are used for the very next entry.
+CATEGORY_LEARNER_ENABLED = os.getenv("CATEGORY_LEARNER_ENABLED", "true").lower() == "true"
+CATEGORY_MODEL_DIR = os.getenv(
+    "CATEGORY_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "categories")
+)
+# Suggest a category only above this posterior and after this many labelled entries
+CATEGORY_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MIN_CONFIDENCE", "0.6"))
+CATEGORY_MIN_EXAMPLES = int(os.getenv("CATEGORY_MIN_EXAMPLES", "3"))
+# Users kept in memory; idle users are written to disk and dropped
+CATEGORY_MAX_USERS = int(os.getenv("CATEGORY_MAX_USERS", "1000"))
+CATEGORY_IDLE_SECONDS = float(os.getenv("CATEGORY_IDLE_SECONDS", "1800"))
+# Model files of users inactive for longer than this are deleted
+CATEGORY_MODEL_TTL_DAYS = float(os.getenv("CATEGORY_MODEL_TTL_DAYS", "90"))
+# Changed models still in memory are written to disk (and expired files deleted) at least this often
+CATEGORY_SAVE_SECONDS = float(os.getenv("CATEGORY_SAVE_SECONDS", "60"))
+
+# An explicit correction counts as this many observations
+CORRECTION_WEIGHT = 3
+# Categories that carry no information and are never learned
+GENERIC_CATEGORIES = {"", "general", "other", "misc"}
+
+_FEATURE_BUCKETS = 1 << 16
+_SMOOTHING = 0.5
+_SWEEP_EVERY = 200
+# Words as intent_rules tokenizes them: letters plus Indic vowel signs and viramas
+_WORD = re.compile(r"(?:(?![\d_])[\w\u0900-\u0DFF])+")
+# Seconds before a user's history is fetched again after the loader failed
+_BOOTSTRAP_RETRY_SECONDS = 60.0
+
+
+def features(text: str) -> List[int]:
+    """Hashed word and boundary-marked character trigram features"""
+    buckets = []
+    for word in _WORD.findall(normalize_text(text)):
+        if intent_rules.word_categories(word) or intent_rules.is_filler(word):
+            continue
+        buckets.append(zlib.crc32(f"w:{word}".encode("utf-8")) & (_FEATURE_BUCKETS - 1))
+        marked = f"#{word}#"
+        for i in range(len(marked) - 2):
+            buckets.append(zlib.crc32(marked[i:i + 3].encode("utf-8")) & (_FEATURE_BUCKETS - 1))
+    return buckets
+
+
+class _KindModel:
+    """Naive Bayes counts for one label space (expense categories, income categories or item kinds)"""
+
+    def __init__(self, data: Optional[Dict] = None):
+        data = data or {}
+        # category -> [number of examples, total feature count, {bucket: count}]
+        self.categories: Dict[str, list] = {
+            name: [entry["n"], entry["total"], {int(bucket): count for bucket, count in entry["features"].items()}]
+            for name, entry in data.items()
+        }
+        self.vocabulary = set()
+        for _, _, counts in self.categories.values():
+            self.vocabulary.update(counts)
+
+    def learn(self, buckets: List[int], category: str, weight: int):
+        entry = self.categories.setdefault(category, [0, 0, {}])
+        entry[0] += weight
+        counts = entry[2]
+        for bucket in buckets:
+            counts[bucket] = counts.get(bucket, 0) + weight
+            entry[1] += weight
+        self.vocabulary.update(buckets)
+
+    def predict(self, buckets: List[int]) -> Optional[Tuple[str, float]]:
+        # Features never seen in any category say nothing about the category
+        buckets = [bucket for bucket in buckets if bucket in self.vocabulary]
+        examples = sum(entry[0] for entry in self.categories.values())
+        if not self.categories or not buckets or examples == 0:
+            return None
+        vocabulary = len(self.vocabulary) + 1
+        scores = {}
+        for name, (n, total, counts) in self.categories.items():
+            denominator = math.log(total + _SMOOTHING * vocabulary)
+            score = math.log(n / examples)
+            for bucket in buckets:
+                score += math.log(counts.get(bucket, 0) + _SMOOTHING) - denominator
+            scores[name] = score
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        posterior = 1.0 / sum(math.exp(score - top) for score in scores.values())
+        return best, posterior
+
+    @property
+    def examples(self) -> int:
+        return sum(entry[0] for entry in self.categories.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            name: {"n": n, "total": total, "features": {str(bucket): count for bucket, count in counts.items()}}
+            for name, (n, total, counts) in self.categories.items()
+        }
+
+
+class _UserModel:
+    def __init__(self, kinds: Optional[Dict] = None, bootstrapped: bool = False):
+        self.kinds: Dict[str, _KindModel] = {kind: _KindModel(data) for kind, data in (kinds or {}).items()}
+        self.bootstrapped = bootstrapped
+        self.last_used = time.time()
+        self.dirty = False
+        self.retry_at = 0.0
+
+    def kind(self, kind: str) -> _KindModel:
+        if kind not in self.kinds:
+            self.kinds[kind] = _KindModel()
+        return self.kinds[kind]
+
+
+class CategoryLearner:
+    """
+    Per-user category models with an in-memory LRU, JSON persistence per user
+    and eviction of idle users (memory) and inactive users (disk).
+    """
+
+    def __init__(self, model_dir: str = CATEGORY_MODEL_DIR, max_users: int = CATEGORY_MAX_USERS,
+                 idle_seconds: float = CATEGORY_IDLE_SECONDS, ttl_days: float = CATEGORY_MODEL_TTL_DAYS,
+                 save_seconds: float = CATEGORY_SAVE_SECONDS):
+        self.model_dir = model_dir
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self.ttl_seconds = ttl_days * 86400
+        self.save_seconds = save_seconds
+        self._lock = threading.RLock()
+        self._users: "OrderedDict[str, _UserModel]" = OrderedDict()
+        # Snapshots of changed models waiting to be written outside the lock
+        self._pending: Dict[str, Dict] = {}
+        self._write_lock = threading.Lock()
+        self._operations = 0
+        self._last_sweep = time.time()
+        self._last_prune = 0.0
+        self._stats = {"suggestions": 0, "suggested": 0, "learned": 0, "loaded": 0, "evicted": 0, "expired": 0}
+
+    def _path(self, user_id: str) -> str:
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.model_dir, f"{digest}.json")
+
+    def _user(self, user_id: str) -> _UserModel:
+        """Loaded model for a user (from memory, disk, or empty); caller holds the lock"""
+        # Sweep first so the user being returned is never the one swept out
+        self._operations += 1
+        if self._operations % _SWEEP_EVERY == 0 or time.time() - self._last_sweep >= self.save_seconds:
+            self._sweep()
+
+        model = self._users.get(user_id)
+        if model is None:
+            # A snapshot not written yet is newer than the file on disk
+            stored = self._pending.get(user_id)
+            if stored is not None:
+                model = _UserModel(stored["kinds"], bootstrapped=stored["bootstrapped"])
+            else:
+                model = self._read(user_id) or _UserModel()
+            self._users[user_id] = model
+            while len(self._users) > self.max_users:
+                evicted_id, evicted = self._users.popitem(last=False)
+                self._queue(evicted_id, evicted)
+                self._stats["evicted"] += 1
+        self._users.move_to_end(user_id)
+        model.last_used = time.time()
+        return model
+
+    def _read(self, user_id: str) -> Optional[_UserModel]:
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as handle:
+                stored = json.load(handle)
+            # The file's mtime tracks activity for disk expiry
+            os.utime(path)
+            self._stats["loaded"] += 1
+            return _UserModel(stored.get("kinds"), bootstrapped=stored.get("bootstrapped", False))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Could not load category model for {user_id}: {str(e)}")
+            return None
+
+    def _queue(self, user_id: str, model: _UserModel):
+        """Snapshot a changed model for the next write; caller holds the lock"""
+        if not model.dirty:
+            return
+        self._pending[user_id] = {
+            "bootstrapped": model.bootstrapped,
+            "kinds": {kind: kind_model.to_dict() for kind, kind_model in model.kinds.items()}
+        }
+        model.dirty = False
+
+    def _write(self, user_id: str, stored: Dict) -> bool:
+        try:
+            os.makedirs(self.model_dir, exist_ok=True)
+            path = self._path(user_id)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(stored, handle, separators=(",", ":"), ensure_ascii=False)
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            logging.warning(f"Could not save category model for {user_id}: {str(e)}")
+            return False
+
+    def _sweep(self):
+        """Drop idle users and queue the changes of everyone still in memory; caller holds the lock"""
+        now = time.time()
+        self._last_sweep = now
+        for user_id in [uid for uid, model in self._users.items() if now - model.last_used > self.idle_seconds]:
+            self._queue(user_id, self._users.pop(user_id))
+            self._stats["evicted"] += 1
+        # A crash loses at most save_seconds of learning, not everything since the last eviction
+        for user_id, model in self._users.items():
+            self._queue(user_id, model)
+
+    def _save_pending(self, wait: bool = False):
+        """
+        Write queued snapshots to disk without holding the learner lock, then delete
+        expired model files; one thread writes at a time and the others move on
+        """
+        if not wait and not self._pending and time.time() - self._last_prune < self.save_seconds:
+            return
+        if not self._write_lock.acquire(blocking=wait):
+            return
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    user_id, stored = next(iter(self._pending.items()))
+                if not self._write(user_id, stored):
+                    break
+                with self._lock:
+                    # Drop it unless a newer snapshot was queued meanwhile
+                    if self._pending.get(user_id) is stored:
+                        del self._pending[user_id]
+            if wait or time.time() - self._last_prune >= self.save_seconds:
+                self._prune()
+        finally:
+            self._write_lock.release()
+
+    def _prune(self):
+        """Delete model files of users inactive for longer than the TTL"""
+        self._last_prune = time.time()
+        if not os.path.isdir(self.model_dir):
+            return
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.model_dir):
+            path = os.path.join(self.model_dir, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    with self._lock:
+                        self._stats["expired"] += 1
+            except OSError:
+                continue
+
+    def ensure_history(self, user_id: str, loader: Callable[[], Optional[Dict[str, List[Tuple[str, str]]]]]):
+        """
+        Train a user's model once from their stored history: loader() -> {kind: [(text, category)]},
+        or None if the history could not be read, in which case it is tried again later
+        """
+        if not CATEGORY_LEARNER_ENABLED:
+            return
+        with self._lock:
+            model = self._user(user_id)
+            done = model.bootstrapped or time.time() < model.retry_at
+        self._save_pending()
+        if done:
+            return
+        try:
+            history = loader()
+        except Exception as e:
+            logging.warning(f"Could not load category history for {user_id}: {str(e)}")
+            history = None
+        with self._lock:
+            model = self._user(user_id)
+            if model.bootstrapped:
+                return
+            if history is None:
+                model.retry_at = time.time() + _BOOTSTRAP_RETRY_SECONDS
+                return
+            for kind, rows in history.items():
+                for text, category in rows:
+                    if (category or "").strip().lower() not in GENERIC_CATEGORIES:
+                        model.kind(kind).learn(features(text or ""), category.strip(), 1)
+            model.bootstrapped = True
+            model.dirty = True
+        logging.info(f"🏷️ Category model for {user_id} trained on {sum(len(rows) for rows in history.values())} past entries")
+
+    def learn(self, user_id: str, kind: str, text: str, category: str, weight: int = 1):
+        """Add one labelled description (weight > 1 for explicit corrections)"""
+        if not CATEGORY_LEARNER_ENABLED or (category or "").strip().lower() in GENERIC_CATEGORIES:
+            return
+        buckets = features(text or "")
+        if not buckets:
+            return
+        with self._lock:
+            model = self._user(user_id)
+            model.kind(kind).learn(buckets, category.strip(), weight)
+            model.dirty = True
+            self._stats["learned"] += 1
+        self._save_pending()
+
+    def predict(self, user_id: str, kind: str, text: str) -> Optional[Tuple[str, float]]:
+        """Most likely category and its posterior for this user, or None without enough history"""
+        if not CATEGORY_LEARNER_ENABLED:
+            return None
+        buckets = features(text or "")
+        with self._lock:
+            kind_model = self._user(user_id).kinds.get(kind)
+            prediction = None
+            if kind_model is not None and kind_model.examples >= CATEGORY_MIN_EXAMPLES:
+                prediction = kind_model.predict(buckets)
+        self._save_pending()
+        return prediction
+
+    def suggest(self, user_id: str, kind: str, text: str) -> Optional[str]:
+        """Category to store for a new entry, only when the model is confident"""
+        prediction = self.predict(user_id, kind, text)
+        with self._lock:
+            self._stats["suggestions"] += 1
+            if prediction is None or prediction[1] < CATEGORY_MIN_CONFIDENCE:
+                return None
+            self._stats["suggested"] += 1
+        return prediction[0]
+
+    def flush(self):
+        """Write every changed model to disk and delete models of long-inactive users"""
+        with self._lock:
+            for user_id, model in self._users.items():
+                self._queue(user_id, model)
+        self._save_pending(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "users_in_memory": len(self._users), "pending_writes": len(self._pending)}
+
+
+category_learner = CategoryLearner()
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Union
+
+
+class Overloaded(Exception):
+    """Raised when a bounded pool already holds its maximum number of in-flight jobs"""
+
+
+class Deadline:
+    """
+    Cooperative deadline / cancellation token passed into provider calls.
+    Workers check it between provider attempts and size their HTTP timeouts
+    from it, so a timed-out request stops spending quota instead of running on.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout_seconds = timeout
+        self.expires_at = time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.cancelled or self.remaining() <= 0
+
+    def timeout(self, default: float, minimum: float = 0.5) -> float:
+        """Clamp a per-call timeout to what is left of the deadline"""
+        return max(minimum, min(default, self.remaining()))
+
+
+class BoundedExecutor:
+    """
+    Named thread pool with a queue-depth limit and in-flight tracking.
+    submit() raises Overloaded instead of queueing without bound, so the
+    server sheds load rather than piling up work it cannot finish in time.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bizsakhi-{name}")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "cancelled": 0, "timed_out": 0}
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise Overloaded(f"{self.name} pool is full ({self._in_flight} in flight)")
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled():
+                self._stats["cancelled"] += 1
+            else:
+                self._stats["completed"] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self._stats["timed_out"] += 1
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.max_workers),
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                **self._stats
+            }
+
+    def shutdown(self, wait: bool = False, cancel_futures: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# Sized thread pools for the blocking stages of a request. Each stage gets its
+# own pool so a burst of slow receipts or voice notes cannot starve the
+# database calls that every other chat message needs.
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_WORKERS", "16")),
+    thread_name_prefix="bizsakhi-db"
+)
+AI_EXECUTOR = BoundedExecutor(
+    "ai",
+    max_workers=int(os.getenv("AI_WORKERS", "8")),
+    max_queue=int(os.getenv("AI_QUEUE_DEPTH", "32"))
+)
+# With the speech worker processes (speech_service.py) these threads only wait
+# for results, so there should be at least SPEECH_PROCESSES + SPEECH_QUEUE_DEPTH
+SPEECH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SPEECH_WORKERS", "16")),
+    thread_name_prefix="bizsakhi-speech"
+)
+IO_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IO_WORKERS", "8")),
+    thread_name_prefix="bizsakhi-io"
+)
+
+EXECUTORS: Dict[str, Union[ThreadPoolExecutor, BoundedExecutor]] = {
+    "db": DB_EXECUTOR,
+    "ai": AI_EXECUTOR,
+    "speech": SPEECH_EXECUTOR,
+    "io": IO_EXECUTOR,
+}
+
+
+async def run_blocking(executor: Union[ThreadPoolExecutor, BoundedExecutor], func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the given executor without stalling the event loop"""
+    if isinstance(executor, BoundedExecutor):
+        return await asyncio.wrap_future(executor.submit(func, *args, **kwargs))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_with_deadline(executor: BoundedExecutor, func: Callable[..., Any], timeout: float, *args, **kwargs) -> Any:
+    """
+    Run func on a bounded pool with a Deadline passed as the `deadline` keyword.
+    On timeout the deadline is cancelled (so the worker stops trying further
+    providers) and a still-queued job is dropped before it starts.
+    Raises Overloaded when the pool is full and asyncio.TimeoutError on timeout.
+    """
+    deadline = Deadline(timeout)
+    future = executor.submit(func, *args, deadline=deadline, **kwargs)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        deadline.cancel()
+        future.cancel()
+        executor.record_timeout()
+        raise
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a Supabase / database call on the database pool"""
+    return await run_blocking(DB_EXECUTOR, func, *args, **kwargs)
+
+
+async def run_ai(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run an LLM provider call on the AI pool"""
+    return await run_blocking(AI_EXECUTOR, func, *args, **kwargs)
+
+
+async def run_ai_with_deadline(func: Callable[..., Any], timeout: float, *args, **kwargs) -> Any:
+    """Run an LLM call on the AI pool under a cancellable deadline"""
+    return await run_with_deadline(AI_EXECUTOR, func, timeout, *args, **kwargs)
+
+
+async def run_speech(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run Whisper transcription on the speech pool"""
+    return await run_blocking(SPEECH_EXECUTOR, func, *args, **kwargs)
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run outbound I/O (receipt OCR polling, TTS synthesis) on the I/O pool"""
+    return await run_blocking(IO_EXECUTOR, func, *args, **kwargs)
+
+
+def shutdown_executors(wait: bool = False):
+    """Stop all stage pools, used on application shutdown"""
+    for name, executor in EXECUTORS.items():
+        executor.shutdown(wait=wait, cancel_futures=True)
+        logging.info(f"Executor '{name}' shut down")
@@ -0,0 +1,60 @@
+import os
+from typing import Optional
+
+import http_client
+from key_pool import gemini_pool
+from llm_scheduler import quota_scheduler
+from provider_health import RateLimited
+
+# Gemini is called over its REST API with the key sent per request, instead of
+# google.generativeai's process-wide genai.configure(), so concurrent requests
+# can use different keys without racing on global state.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_GENERATE_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+
+
+class GeminiError(Exception):
+    """Non-200 or unusable response from the Gemini API"""
+
+
+class GeminiRateLimited(GeminiError, RateLimited):
+    """Gemini answered 429 for the leased key"""
+
+
+def is_available() -> bool:
+    return len(gemini_pool) > 0
+
+
+def generate_content(prompt: str, timeout: Optional[float] = None) -> str:
+    """
+    Generate text for the prompt using the least busy Gemini key with quota left.
+    Raises KeyPoolExhausted if no key can be used right now, GeminiError on API errors
+    (GeminiRateLimited on a 429).
+    """
+    with gemini_pool.lease() as lease:
+        response = http_client.post(
+            GEMINI_GENERATE_URL,
+            headers={
+                "x-goog-api-key": lease.key,
+                "Content-Type": "application/json"
+            },
+            json={"contents": [{"parts": [{"text": prompt}]}]},
+            timeout=timeout
+        )
+
+        if response.status_code == 429:
+            retry_after = http_client.retry_after_seconds(response)
+            lease.throttle(retry_after)
+            # The other keys share the provider-wide limit: back off all Gemini calls
+            quota_scheduler.throttle("gemini", retry_after)
+            raise GeminiRateLimited(f"Gemini key {lease.name} rate limited: {response.text[:200]}")
+        if response.status_code != 200:
+            lease.ok = False
+            raise GeminiError(f"Gemini key {lease.name} failed: {response.status_code} - {response.text[:200]}")
+
+        try:
+            result = response.json()
+            return result["candidates"][0]["content"]["parts"][0]["text"].strip()
+        except (KeyError, IndexError, ValueError) as e:
+            lease.ok = False
+            raise GeminiError(f"Unexpected Gemini response: {str(e)}")
@@ -0,0 +1,117 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+
+# Shared outbound HTTP layer for all provider calls (Groq, Anthropic, Gemini,
+# Azure Document Intelligence / Computer Vision, OCR.space).
+#
+# Each host gets its own keep-alive session and connection pool, so repeated
+# LLM and OCR calls reuse TCP+TLS connections instead of paying a handshake
+# per request. Timeouts default per host and can be overridden per call.
+
+# Connection pool sizing (per host)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+
+# Default timeouts in seconds; keys starting with "." match any subdomain
+DEFAULT_HOST_TIMEOUTS = {
+    "api.groq.com": 10.0,
+    "api.anthropic.com": 10.0,
+    "generativelanguage.googleapis.com": 15.0,
+    ".cognitiveservices.azure.com": 30.0,
+    "api.ocr.space": 30.0,
+}
+
+
+def _parse_host_timeouts(value: str) -> Dict[str, float]:
+    """Parse HTTP_HOST_TIMEOUTS, e.g. "api.groq.com=8,api.anthropic.com=12" """
+    timeouts = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        host, seconds = entry.split("=", 1)
+        try:
+            timeouts[host.strip().lower()] = float(seconds)
+        except ValueError:
+            logging.warning(f"Ignoring invalid HTTP_HOST_TIMEOUTS entry: {entry}")
+    return timeouts
+
+
+HOST_TIMEOUTS = {**DEFAULT_HOST_TIMEOUTS, **_parse_host_timeouts(os.getenv("HTTP_HOST_TIMEOUTS", ""))}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def timeout_for(url: str) -> float:
+    """Default timeout for the host of the given URL"""
+    host = _host_of(url)
+    if host in HOST_TIMEOUTS:
+        return HOST_TIMEOUTS[host]
+    for pattern, seconds in HOST_TIMEOUTS.items():
+        if pattern.startswith(".") and host.endswith(pattern):
+            return seconds
+    return HTTP_DEFAULT_TIMEOUT
+
+
+def session_for(url: str) -> requests.Session:
+    """Keep-alive session with a dedicated connection pool for the URL's host"""
+    host = _host_of(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+            logging.info(f"Opened pooled HTTP session for {host} (pool size {HTTP_POOL_MAXSIZE})")
+    return session
+
+
+def request(method: str, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    """Send a request through the pooled session for the URL's host"""
+    if timeout is None:
+        timeout = timeout_for(url)
+    return session_for(url).request(method, url, timeout=timeout, **kwargs)
+
+
+def get(url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    return request("GET", url, timeout=timeout, **kwargs)
+
+
+def post(url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    return request("POST", url, timeout=timeout, **kwargs)
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Retry-After header of a 429/503 response, if given in seconds"""
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def close_all():
+    """Close every pooled session, used on application shutdown"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
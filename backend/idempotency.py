@@ -0,0 +1,72 @@
+import os
+import copy
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from response_cache import ResponseCache
+
+# Replay protection for requests that write business data. A mobile client
+# that retries a voice upload after a dropped connection gets the response of
+# the first attempt instead of a second set of income/expense rows.
+VOICE_IDEMPOTENCY_ENABLED = os.getenv("VOICE_IDEMPOTENCY_ENABLED", "true").lower() == "true"
+VOICE_IDEMPOTENCY_TTL = float(os.getenv("VOICE_IDEMPOTENCY_TTL", "600"))
+VOICE_IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("VOICE_IDEMPOTENCY_MAX_ENTRIES", "2000"))
+
+
+class IdempotentResponses:
+    """
+    Runs a handler at most once per key within the TTL. Repeats get a copy of
+    the stored response; a repeat that arrives while the first attempt is
+    still running waits for it. Only successful responses are stored, so a
+    failed attempt can be retried.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, enabled: bool = True):
+        self.name = name
+        self.ttl = ttl
+        self.enabled = enabled
+        self._done = ResponseCache(max_entries=max_entries, path="")
+        self._running: Dict[str, asyncio.Future] = {}
+        self._replayed = 0
+
+    async def run(self, key: str, handler: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        if not self.enabled:
+            return await handler()
+
+        while True:
+            stored = self._done.get(key)
+            if stored is not None:
+                return self._replay(stored)
+            running = self._running.get(key)
+            if running is None:
+                break
+            # Another attempt with this key is in flight; None means it failed and we run ourselves
+            result = await asyncio.shield(running)
+            if result is not None:
+                return self._replay(copy.deepcopy(result))
+
+        future = asyncio.get_running_loop().create_future()
+        self._running[key] = future
+        result = None
+        try:
+            result = await handler()
+            if result.get("success"):
+                self._done.put(key, result, self.ttl)
+            return result
+        finally:
+            self._running.pop(key, None)
+            future.set_result(result if result is not None and result.get("success") else None)
+
+    def _replay(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        self._replayed += 1
+        logging.info(f"🔁 Replaying stored {self.name} response for a repeated request")
+        result["idempotent_replay"] = True
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._done.stats(), "replayed": self._replayed, "in_flight": len(self._running)}
+
+
+voice_idempotency = IdempotentResponses("voice", VOICE_IDEMPOTENCY_TTL, VOICE_IDEMPOTENCY_MAX_ENTRIES,
+                                        VOICE_IDEMPOTENCY_ENABLED)
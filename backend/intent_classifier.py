@@ -0,0 +1,144 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from intent_rules import normalize_text
+
+try:
+    import joblib
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+# Small CPU model that predicts the intent of a chat message before any provider call.
+# Trained offline from logged chat_history by train_intent_classifier.py.
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+INTENT_CLASSIFIER_PATH = os.getenv(
+    "INTENT_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "intent_classifier.joblib")
+)
+# Predictions at or above this probability skip the LLM
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.85"))
+
+INTENT_LABELS = ("income", "expense", "inventory", "query", "conversational", "off_topic")
+
+# Logged chat_history intents -> classifier label (anything else is not used for training)
+LOGGED_INTENT_LABELS = {
+    "income": "income",
+    "expense": "expense",
+    "inventory": "inventory",
+    "item_clarification": "inventory",
+    "query": "query",
+    "conversational": "conversational",
+    "general": "conversational",
+    "off_topic": "off_topic",
+}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def prepare_text(message: str) -> str:
+    """Classifier input: rule-engine normalization with every amount collapsed to 0"""
+    return _NUMBER.sub("0", normalize_text(message))
+
+
+def build_pipeline() -> "Pipeline":
+    """Char n-gram TF-IDF + logistic regression; n-grams handle Indic inflections and Roman spellings"""
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True,
+                                  min_df=2, max_features=50000, dtype=np.float32)),
+        ("model", LogisticRegression(max_iter=1000, C=4.0, class_weight="balanced")),
+    ])
+
+
+class IntentClassifier:
+    """Loads the trained artifact once and serves (label, confidence) predictions"""
+
+    def __init__(self, path: str = INTENT_CLASSIFIER_PATH, threshold: float = INTENT_CLASSIFIER_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._pipeline = None
+        self._metadata: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stats = {"predictions": 0, "confident": 0, "bypassed": 0}
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not SKLEARN_AVAILABLE:
+                logging.info("Intent classifier disabled: scikit-learn/joblib not installed")
+                return
+            if not os.path.exists(self.path):
+                logging.info(f"Intent classifier disabled: no model at {self.path} (run train_intent_classifier.py)")
+                return
+            try:
+                start = time.perf_counter()
+                artifact = joblib.load(self.path)
+                self._pipeline = artifact["pipeline"]
+                self._metadata = {key: value for key, value in artifact.items() if key != "pipeline"}
+                logging.info(f"🧠 Intent classifier loaded in {(time.perf_counter() - start) * 1000:.1f}ms "
+                             f"({self._metadata.get('samples', '?')} training samples)")
+            except Exception as e:
+                logging.warning(f"Could not load intent classifier: {str(e)}")
+
+    @property
+    def available(self) -> bool:
+        self._load()
+        return self._pipeline is not None
+
+    def predict(self, message: str) -> Optional[Tuple[str, float]]:
+        """Most likely intent and its probability, or None when no model is loaded"""
+        if not INTENT_CLASSIFIER_ENABLED or not self.available:
+            return None
+        probabilities = self._pipeline.predict_proba([prepare_text(message)])[0]
+        best = int(probabilities.argmax())
+        label, confidence = str(self._pipeline.classes_[best]), float(probabilities[best])
+        with self._lock:
+            self._stats["predictions"] += 1
+            if confidence >= self.threshold:
+                self._stats["confident"] += 1
+        return label, confidence
+
+    def confident(self, message: str) -> Optional[Tuple[str, float]]:
+        """Prediction only if it clears the confidence threshold"""
+        prediction = self.predict(message)
+        if prediction is None or prediction[1] < self.threshold:
+            return None
+        return prediction
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": self._pipeline is not None,
+                "threshold": self.threshold,
+                **{key: value for key, value in self._metadata.items() if key in ("trained_at", "samples", "accuracy")}
+            }
+
+
+def train(messages: List[str], labels: List[str]) -> "Pipeline":
+    pipeline = build_pipeline()
+    pipeline.fit([prepare_text(message) for message in messages], labels)
+    return pipeline
+
+
+def save(pipeline: "Pipeline", path: str, **metadata):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump({"pipeline": pipeline, **metadata}, path, compress=3)
+
+
+intent_classifier = IntentClassifier()
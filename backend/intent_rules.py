@@ -0,0 +1,388 @@
+import re
+import unicodedata
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from number_normalizer import normalize_numbers
+
+# Rule-based intent detection shared by the text endpoint and AIProcessor.
+#
+# All keywords (income/expense/inventory words, clear commands and question
+# markers, for every supported language) are compiled at import time into one
+# keyword automaton. A message is tokenized once and classified in a single
+# pass instead of looping over per-language regex lists.
+
+# Categories
+INCOME = "income"
+EXPENSE = "expense"
+INVENTORY = "inventory"
+# "aaya" / "आया" (came in), "got", "made": income only when what came in is a payment, not a bill
+ARRIVAL = "arrival"
+QUESTION = "question"
+CLEAR_EXPENSES = "clear_expenses"
+CLEAR_INCOME = "clear_income"
+CLEAR_CHAT = "clear_chat"
+CLEAR_ALL = "clear_all"
+
+# Checked in this order when a message contains several clear phrases
+CLEAR_COMMANDS = (CLEAR_EXPENSES, CLEAR_INCOME, CLEAR_CHAT, CLEAR_ALL)
+
+# Transaction words. Indic entries also match inflected forms (खर्चा, செலவுக்கு).
+TRANSACTION_KEYWORDS = {
+    INCOME: [
+        "income", "earned", "earning", "received", "sold", "sale", "sales",
+        "आय", "कमाई", "कमाया", "मिला", "मिले", "पाया", "उत्पन्न", "मिळाले", "बेचा", "बेची", "बेचे", "बिक्री", "विकले",
+        "வருமானம்", "வரவு", "சம்பாதித்த", "விற்ற",
+        "വരുമാനം", "വരവ്", "കിട്ടി", "വിറ്റു",
+        "ఆదాయం", "సంపాదన", "వచ్చింది", "అమ్మా",
+        "ಆದಾಯ", "ಗಳಿಕೆ", "ಬಂತು", "ಮಾರಿದೆ",
+        "આવક", "કમાણી", "મળ્યા", "વેચ્યા",
+        "আয়", "রোজগার", "পেলাম", "বিক্রি",
+        # Romanized / code-mixed ("kamai 1200 hui", "5000 milale", "varumanam 800")
+        "kamai", "kamaya", "kamaye", "kamayi", "mila", "mile", "mili", "paya", "paye", "aamdani", "aay",
+        "becha", "beche", "bechi", "bikri",
+        "milale", "milala", "kamavle",
+        "varumanam", "varavu", "sambadhichen", "kidaichathu", "kitti",
+        "aadayam", "sampadana", "vachindi", "aadaya", "galike", "bantu",
+        "aavak", "kamani", "malya", "rojgar", "pelam", "vikle", "vittu", "vechya",
+    ],
+    EXPENSE: [
+        "expense", "expenses", "spent", "paid", "cost", "bought", "purchased",
+        "खर्च", "दिया", "दिए", "लगा", "भुगतान", "दिले", "खरीदा", "खरीदी", "खरीदे", "खरेदी",
+        "செலவு", "செலவழித்த", "கொடுத்த", "வாங்கின",
+        "ചെലവ്", "ചിലവ്", "കൊടുത്തു", "വാങ്ങി",
+        "ఖర్చు", "చెల్లించా", "కొన్నా",
+        "ಖರ್ಚು", "ವೆಚ್ಚ", "ಕೊಟ್ಟೆ", "ಖರೀದಿಸಿ",
+        "ખર્ચ", "ચૂકવ્યા", "ખરીદ્યા",
+        "খরচ", "ব্যয়", "দিলাম", "কিনলাম",
+        # Romanized / code-mixed ("aaj 500 ka kharcha", "300 rent diya", "selavu 200")
+        "kharcha", "kharch", "kharche", "kharchi", "diya", "diye", "dia", "bhara", "bhare", "chukaya",
+        "laga", "lage", "lagi", "kharida", "kharide", "kharidi", "bhugtan",
+        "dile", "dila", "bharle",
+        "selavu", "koduthen", "kodutha", "chelavu", "chilavu", "koduthu",
+        "kharchu", "karchu", "chellinchanu", "vechcha", "kotte",
+        "chukavya", "khoroch", "khorach", "dilam", "vangi", "vangineen", "konnanu", "kinlam",
+    ],
+    # Listed separately so "आया" is not read as the income stem "आय"; "got" / "made"
+    # say as little ("got bill of 500", "made 200 loss") and need a payment noun too
+    ARRIVAL: [
+        "आया", "आई", "आए", "आये",
+        "aaya", "aaye", "aayi",
+        "got", "made",
+    ],
+    INVENTORY: [
+        "inventory", "stock",
+        "स्टॉक", "माल", "इन्वेंटरी", "साठा",
+        "சரக்கு", "ஸ்டாக்",
+        "സ്റ്റോക്ക്", "ഇൻവെന്ററി",
+        "స్టాక్", "ಸ್ಟಾಕ್", "સ્ટોક", "স্টক",
+        "maal", "saatha", "sarakku",
+    ],
+}
+
+CLEAR_PHRASES = {
+    CLEAR_EXPENSES: [
+        "clear expense", "delete expense", "remove expense", "reset expense", "make expense 0", "expense to 0",
+        "clear expenses", "delete expenses", "remove expenses", "reset expenses",
+        "खर्च साफ", "खर्च हटा", "खर्च शून्य",
+        "செலவுகளை அழி", "ചെലവുകൾ മായ്ക്കുക",
+    ],
+    CLEAR_INCOME: [
+        "clear income", "delete income", "remove income", "reset income", "make income 0", "income to 0",
+        "आय साफ", "आय हटा", "आय शून्य",
+        "வருமானத்தை அழி", "വരുമാനം മായ്ക്കുക",
+    ],
+    CLEAR_CHAT: [
+        "clear chat", "delete chat", "remove chat", "reset chat", "clear history", "delete history",
+        "चैट साफ", "चैट हटा", "इतिहास साफ",
+    ],
+    CLEAR_ALL: [
+        "clear all", "delete all", "reset all", "clear everything", "reset everything",
+        "सब साफ", "सब हटा", "सब कुछ साफ",
+        "அனைத்தும் அழி", "എല്ലാം മായ്ക്കുക",
+    ],
+}
+
+# Questions and calculations are never recorded as transactions
+QUESTION_MARKERS = [
+    "how much", "what", "calculate", "loss", "profit", "percent", "percentage", "if", "when", "why",
+    "where", "who", "how", "tell me", "explain",
+    "क्या", "कितना", "कितनी", "कितने", "कैसे", "क्यों", "कब", "कहाँ", "कहां", "कौन", "बताओ", "बताइए",
+    "लाभ", "हानि", "मुनाफा", "नुकसान", "काय", "किती", "कसे", "कधी", "कुठे", "नफा", "तोटा",
+    "என்ன", "எவ்வளவு", "எப்படி", "ஏன்", "எப்போது", "எங்கே", "யார்", "லாபம்", "நஷ்டம்",
+    "എന്ത്", "എത്ര", "എങ്ങനെ", "എന്തുകൊണ്ട്", "എപ്പോൾ", "എവിടെ", "ലാഭം", "നഷ്ടം",
+    "ఏమిటి", "ఎంత", "ఎలా", "ఎందుకు", "ఎప్పుడు", "ఎక్కడ", "లాభం", "నష్టం",
+    "ಏನು", "ಎಷ್ಟು", "ಹೇಗೆ", "ಯಾಕೆ", "ಯಾವಾಗ", "ಎಲ್ಲಿ", "ಲಾಭ", "ನಷ್ಟ",
+    "શું", "કેટલું", "કેટલા", "કેવી રીતે", "કેમ", "ક્યારે", "ક્યાં", "નફો", "નુકસાન",
+    "কী", "কত", "কীভাবে", "কেন", "কখন", "কোথায়", "লাভ", "ক্ষতি",
+    # Romanized
+    "kya", "kitna", "kitni", "kitne", "kaise", "kyon", "kyun", "kyu", "kab", "kahan", "kaun", "batao",
+    "bataiye", "munafa", "nuksan", "nuksaan", "labh", "hani", "kay", "kiti", "kase", "kadhi", "nafa", "tota",
+    "enna", "evvalavu", "eppadi", "eppo", "enge", "laabam", "nashtam", "enthu", "ethra", "engane", "laabham",
+    "emiti", "enta", "enduku", "enu", "eshtu", "hege", "yake", "shu", "ketlu", "ketla", "kyare",
+    "koto", "kibhabe", "keno", "kokhon", "kothay",
+]
+
+# Words that may sit between a transaction word and its amount: "income is 500",
+# "500 rupees spent", "500 का खर्चा", "kharcha hua 500", "300 rent diya"
+FILLER_WORDS = {
+    "is", "of", "for", "was", "rs", "rupee", "rupees",
+    "का", "की", "के", "रुपये", "रुपए", "रुपया",
+    "ரூபாய்", "രൂപ", "రూపాయలు", "ರೂಪಾಯಿ", "રૂપિયા", "টাকা",
+    "ka", "ki", "ke", "hua", "hui", "hue", "hai", "tha", "thi", "rupaye", "rupay", "rupaiye", "rupiya",
+    "rubai", "roopa", "rupa", "rupayalu", "rupayi", "taka",
+}
+
+# What the money was for: "300 rent diya" is still an expense, but only an expense
+# verb reaches the amount across them ("received rent bill 1200" is not income)
+PURPOSE_WORDS = {
+    "rent", "bill", "salary", "electricity", "kiraya", "bijli", "petrol", "diesel", "sabzi", "saman",
+    "किराया", "बिल", "बिजली", "वेतन", "तनख्वाह", "पेट्रोल", "सामान",
+}
+
+# What came in with "aaya" / "got" decides its direction: a payment or order is income...
+INCOME_NOUNS = {
+    "payment", "order", "orders", "customer", "customers", "grahak", "client", "advance", "paisa", "paise",
+    "sale", "sales",
+    "पेमेंट", "ऑर्डर", "ग्राहक", "पैसा", "पैसे", "एडवांस",
+}
+# ...while a bill, fee or fine is money going out, whatever the verb ("bill 500 mila",
+# "got 500 fine"), so the message is left to the LLM
+BILL_WORDS = {
+    "bill", "bills", "rent", "kiraya", "bijli", "electricity", "emi", "fees", "fee", "challan",
+    "fine", "fines", "penalty", "jurmana",
+    "बिल", "किराया", "बिजली", "ईएमआई", "फीस", "चालान", "जुर्माना",
+}
+
+# One tokenizer pass: amounts, words (Latin letters or Indic script incl. vowel signs) and "?"
+_TOKEN = re.compile(
+    r"(?P<amount>\d+(?:,\d{2,3})*(?:\.\d+)?)"
+    r"|(?P<word>(?:(?![\d_])[\w\u0900-\u0DFF])+)"
+    r"|(?P<qmark>\?)"
+)
+
+
+# Romanized spellings vary in vowel length: kharchaa/kharcha, rupaye/rupaaye, kamaai/kamai
+_LONG_VOWELS = re.compile(r"a{2,}|e{2,}|i{2,}|o{2,}|u{2,}")
+_VOWEL_FOLD = {"aa": "a", "ee": "i", "ii": "i", "oo": "u", "uu": "u"}
+
+
+def _normalize(text: str) -> str:
+    """NFC + lower case so composed/decomposed Indic characters match the same keyword"""
+    return unicodedata.normalize("NFC", text or "").lower()
+
+
+def fold_spelling(text: str) -> str:
+    """Fold Roman-script long vowels so transliteration variants share one spelling"""
+    return _LONG_VOWELS.sub(lambda match: _VOWEL_FOLD[match.group()[:2]], text)
+
+_FILLERS = frozenset(fold_spelling(_normalize(word)) for word in FILLER_WORDS)
+_PURPOSES = frozenset(fold_spelling(_normalize(word)) for word in PURPOSE_WORDS)
+# "customer ne 500 diya": with a third-party agent, "diya" is money the user received.
+# The ergative "ne" and a paying counterparty both leave the direction to the LLM.
+AGENT_MARKERS = {"ne", "ने"}
+COUNTERPARTY_WORDS = {"customer", "customers", "client", "clients", "buyer", "grahak", "ग्राहक", "గ్రాహకుడు"}
+
+_AGENT_MARKERS = frozenset(fold_spelling(_normalize(word)) for word in AGENT_MARKERS)
+_COUNTERPARTIES = frozenset(fold_spelling(_normalize(word)) for word in COUNTERPARTY_WORDS)
+_INCOME_NOUNS = frozenset(fold_spelling(_normalize(word)) for word in INCOME_NOUNS)
+_BILL_WORDS = frozenset(fold_spelling(_normalize(word)) for word in BILL_WORDS)
+
+
+def normalize_text(message: str, fold: bool = True) -> str:
+    """Text as the rule engine sees it: NFC, lower case, canonical numbers, folded Roman vowels"""
+    # Spoken numbers and native digits ("ढाई हज़ार", "௫௦௦") become plain amounts first
+    text = normalize_numbers(_normalize(message))
+    return fold_spelling(text) if fold else text
+
+
+def _is_indic(word: str) -> bool:
+    return any("\u0900" <= ch <= "\u0DFF" for ch in word)
+
+
+class RuleResult:
+    """Outcome of a single pass over a message"""
+
+    def __init__(self, categories: FrozenSet[str], clear_command: Optional[str], amounts: List[float],
+                 transaction_type: Optional[str], amount: Optional[float]):
+        self.categories = categories
+        self.clear_command = clear_command
+        self.amounts = amounts
+        self.transaction_type = transaction_type
+        self.amount = amount
+
+    @property
+    def is_question(self) -> bool:
+        return QUESTION in self.categories
+
+    def __repr__(self) -> str:
+        return (f"RuleResult(categories={sorted(self.categories)}, clear_command={self.clear_command}, "
+                f"amounts={self.amounts}, transaction={self.transaction_type}:{self.amount})")
+
+
+class IntentRules:
+    """
+    Keyword automaton built once at startup: a word-level phrase index for
+    multi-word commands and markers, plus a character trie so inflected Indic
+    transaction words (खर्चा, செலவுக்கு) match their stem.
+    """
+
+    def __init__(self):
+        # first word -> [(phrase words, categories)], longest phrase first
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], FrozenSet[str]]]] = {}
+        # character trie over Indic transaction stems; "$" marks the end of a stem
+        self._stems: Dict[str, Any] = {}
+
+        for category, phrases in CLEAR_PHRASES.items():
+            for phrase in phrases:
+                self._add_phrase(phrase, category)
+        for category, words in TRANSACTION_KEYWORDS.items():
+            for word in words:
+                self._add_phrase(word, category)
+                if _is_indic(word):
+                    self._add_stem(_normalize(word), category)
+        for marker in QUESTION_MARKERS:
+            self._add_phrase(marker, QUESTION)
+
+        for entries in self._phrases.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+
+    def _add_phrase(self, phrase: str, category: str):
+        words = tuple(match.group() for match in _TOKEN.finditer(fold_spelling(_normalize(phrase))))
+        entries = self._phrases.setdefault(words[0], [])
+        for i, (existing, categories) in enumerate(entries):
+            if existing == words:
+                entries[i] = (existing, categories | {category})
+                return
+        entries.append((words, frozenset({category})))
+
+    def _add_stem(self, word: str, category: str):
+        node = self._stems
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node["$"] = node.get("$", frozenset()) | {category}
+
+    def _stem_lookup(self, word: str) -> Optional[FrozenSet[str]]:
+        """Categories of the longest transaction stem that prefixes the word"""
+        node, found = self._stems, None
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                break
+            found = node.get("$", found)
+        return found
+
+    def word_categories(self, word: str) -> FrozenSet[str]:
+        """Categories of a single normalized word (exact keyword or Indic stem)"""
+        word = fold_spelling(word)
+        for words, found in self._phrases.get(word, ()):
+            if len(words) == 1:
+                return found
+        if _is_indic(word):
+            return self._stem_lookup(word) or frozenset()
+        return frozenset()
+
+    def is_filler(self, word: str) -> bool:
+        return fold_spelling(word) in _FILLERS
+
+    def direction(self, types: FrozenSet[str], words: FrozenSet[str]) -> Optional[str]:
+        """
+        INCOME or EXPENSE from the money words found (income/expense/arrival) and
+        the other normalized words of the message; None when it is ambiguous
+        """
+        types = set(types) & {INCOME, EXPENSE, ARRIVAL}
+        if words & _AGENT_MARKERS:
+            return None
+        if ARRIVAL in types:
+            types.discard(ARRIVAL)
+            # "500 ka bill aaya" is a bill to pay; "payment 500 aaya" is money received
+            if words & _BILL_WORDS or not words & _INCOME_NOUNS:
+                return None
+            types.add(INCOME)
+        if INCOME in types and words & _BILL_WORDS:
+            return None
+        if len(types) != 1:
+            return None
+        transaction_type = types.pop()
+        # "customer paid 500", "ग्राहकाने 500 दिले": the other party paid, not the user
+        if transaction_type == EXPENSE and any(self._is_counterparty(word) for word in words):
+            return None
+        return transaction_type
+
+    def _is_counterparty(self, word: str) -> bool:
+        if word in _COUNTERPARTIES:
+            return True
+        # Indic inflections keep the stem: ग्राहकाने, ग्राहकों
+        return _is_indic(word) and any(word.startswith(stem) for stem in _COUNTERPARTIES if _is_indic(stem))
+
+    def analyze(self, message: str) -> RuleResult:
+        """Classify income/expense/inventory, clear commands and question markers in one pass"""
+        tokens = [(match.lastgroup, match.group()) for match in _TOKEN.finditer(normalize_text(message))]
+        texts = [text for _, text in tokens]
+
+        categories = set()
+        # ("amount", value) | ("keyword", categories) | ("filler", None) | ("purpose", None) | ("other", None)
+        items = []
+        i = 0
+        while i < len(tokens):
+            kind, text = tokens[i]
+            if kind == "qmark":
+                categories.add(QUESTION)
+                i += 1
+                continue
+            if kind == "amount":
+                try:
+                    items.append(("amount", float(text.replace(",", ""))))
+                except ValueError:
+                    items.append(("other", None))
+                i += 1
+                continue
+
+            for words, found in self._phrases.get(text, ()):
+                if tuple(texts[i:i + len(words)]) == words:
+                    categories |= found
+                    items.append(("keyword", found))
+                    i += len(words)
+                    break
+            else:
+                found = self._stem_lookup(text) if _is_indic(text) else None
+                if found:
+                    categories |= found
+                    items.append(("keyword", found))
+                else:
+                    items.append(("filler" if text in _FILLERS else "purpose" if text in _PURPOSES else "other", None))
+                i += 1
+
+        clear_command = next((command for command in CLEAR_COMMANDS if command in categories), None)
+        amounts = [value for kind, value in items if kind == "amount"]
+
+        transaction_type, amount = None, None
+        if clear_command is None and QUESTION not in categories and INVENTORY not in categories and len(amounts) == 1:
+            words = frozenset(text for kind, text in tokens if kind == "word")
+            transaction_type, amount = self._transaction(items, words)
+
+        return RuleResult(frozenset(categories), clear_command, amounts, transaction_type, amount)
+
+    def _transaction(self, items: List[tuple], words: FrozenSet[str]) -> Tuple[Optional[str], Optional[float]]:
+        """The single amount plus an income or expense word directly before or after it"""
+        index = next(i for i, (kind, _) in enumerate(items) if kind == "amount")
+        value = items[index][1]
+        if value <= 0:
+            return None, None
+
+        types = set()
+        for step in (-1, 1):
+            j, purpose = index + step, False
+            while 0 <= j < len(items) and items[j][0] in ("filler", "purpose"):
+                purpose = purpose or items[j][0] == "purpose"
+                j += step
+            if 0 <= j < len(items) and items[j][0] == "keyword":
+                # "300 rent diya" pays the rent; income across a purpose word is for the LLM
+                types |= items[j][1] & ({EXPENSE} if purpose else {INCOME, EXPENSE, ARRIVAL})
+
+        transaction_type = self.direction(frozenset(types), words)
+        if transaction_type is None:
+            return None, None
+        return transaction_type, value
+
+
+intent_rules = IntentRules()
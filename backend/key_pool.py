@@ -0,0 +1,207 @@
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from provider_health import provider_health
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+
+# Per-key request limits (requests per minute). Free-tier Gemini allows 15 RPM
+# per key and Groq 30 RPM, so each extra key adds that much headroom.
+GEMINI_KEY_RPM = float(os.getenv("GEMINI_KEY_RPM", "15"))
+GROQ_KEY_RPM = float(os.getenv("GROQ_KEY_RPM", "30"))
+
+
+class KeyPoolExhausted(Exception):
+    """Raised when every key of a provider is rate limited or has an open circuit"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def refund(self, amount: float = 1.0):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self, seconds: float = 0.0):
+        """Empty the bucket and keep it empty for `seconds` more (e.g. after a 429)"""
+        with self._lock:
+            self._refill()
+            self._tokens = -seconds * self.rate_per_second
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        with self._lock:
+            self._refill()
+            missing = min(amount, self.capacity) - self._tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate_per_second if self.rate_per_second > 0 else float("inf")
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class PooledKey:
+    def __init__(self, name: str, key: str, requests_per_minute: float):
+        self.name = name
+        self.key = key
+        self.bucket = TokenBucket(requests_per_minute)
+        self.in_flight = 0
+        self.calls = 0
+
+
+class Lease:
+    """A key checked out of the pool for one call; set ok = False to report a failed call"""
+
+    def __init__(self, pooled: PooledKey):
+        self._pooled = pooled
+        self.name = pooled.name
+        self.key = pooled.key
+        self.ok = True
+        self.throttled = False
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """The key got a 429: hold it back so calls move to the other keys"""
+        self.throttled = True
+        self._pooled.bucket.drain(retry_after or 0.0)
+        logging.warning(f"🚦 {self.name} rate limited, backing off for {retry_after or 0:.0f}s")
+
+
+class KeyPool:
+    """
+    All API keys of one provider, used concurrently. Each key has its own
+    requests-per-minute bucket and circuit breaker entry ("gemini:2"); a call
+    leases the least busy key that has quota left, so concurrent requests are
+    spread over every key instead of hammering one and rotating on failure.
+    """
+
+    def __init__(self, provider: str, keys: List[str], requests_per_minute: float):
+        self.provider = provider
+        self._keys = [PooledKey(f"{provider}:{i + 1}", key, requests_per_minute) for i, key in enumerate(keys)]
+        self._lock = threading.Lock()
+        self._next = 0
+        self._exhausted = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _acquire(self) -> Optional[PooledKey]:
+        with self._lock:
+            count = len(self._keys)
+            # Least in-flight first, round-robin among equals
+            candidates = sorted(
+                (self._keys[(self._next + i) % count] for i in range(count)),
+                key=lambda pooled: pooled.in_flight
+            )
+            for pooled in candidates:
+                if not pooled.bucket.try_acquire():
+                    continue
+                if not provider_health.allow(pooled.name):
+                    pooled.bucket.refund()
+                    continue
+                pooled.in_flight += 1
+                pooled.calls += 1
+                self._next = (self._keys.index(pooled) + 1) % count
+                return pooled
+            self._exhausted += 1
+            return None
+
+    def wait_time(self) -> float:
+        """Seconds until the first key gets request quota back"""
+        return min((pooled.bucket.wait_time() for pooled in self._keys), default=float("inf"))
+
+    @contextmanager
+    def lease(self) -> Iterator[Lease]:
+        """
+        Check out a key for one call. Raises KeyPoolExhausted when no key has
+        quota or a closed circuit. Latency and outcome go to the key's circuit;
+        a throttled key (429) is recorded as throttled, not as failed.
+        """
+        pooled = self._acquire() if self._keys else None
+        if pooled is None:
+            raise KeyPoolExhausted(f"No {self.provider} API key available")
+
+        lease = Lease(pooled)
+        started = time.perf_counter()
+        try:
+            yield lease
+        except Exception:
+            lease.ok = False
+            raise
+        finally:
+            with self._lock:
+                pooled.in_flight -= 1
+            latency = time.perf_counter() - started
+            if lease.throttled:
+                provider_health.record_throttled(pooled.name)
+            elif lease.ok:
+                provider_health.record_success(pooled.name, latency)
+            else:
+                provider_health.record_failure(pooled.name, latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "exhausted": self._exhausted,
+                "per_key": {
+                    pooled.name: {
+                        "in_flight": pooled.in_flight,
+                        "calls": pooled.calls,
+                        "tokens_available": round(pooled.bucket.available, 2)
+                    }
+                    for pooled in self._keys
+                }
+            }
+
+
+def _load_keys(*names: str) -> List[str]:
+    """Read keys from the given env vars (comma-separated lists allowed), skipping placeholders and duplicates"""
+    keys = []
+    for name in names:
+        for key in (os.getenv(name) or "").split(","):
+            key = key.strip()
+            if key and "your-" not in key and "your_" not in key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+# Shared pools so every component (intent parsing, OCR, loan RAG) draws from the same per-key quota
+gemini_pool = KeyPool(
+    "gemini",
+    _load_keys("GEMINI_API_KEY_1", "GEMINI_API_KEY_2", "GEMINI_API_KEY_3", "GEMINI_API_KEYS"),
+    GEMINI_KEY_RPM
+)
+groq_pool = KeyPool("groq", _load_keys("GROQ_API_KEY", "GROQ_API_KEYS"), GROQ_KEY_RPM)
+
+if len(gemini_pool) or len(groq_pool):
+    logging.info(f"API key pools: {len(gemini_pool)} Gemini key(s), {len(groq_pool)} Groq key(s)")
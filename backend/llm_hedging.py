@@ -0,0 +1,217 @@
+import os
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from executors import Deadline
+
+# Hedged-request settings. When the primary provider has not answered within
+# its p50 latency (times the multiplier, clamped to min/max), the next
+# provider is fired in parallel and the first valid answer wins.
+AI_HEDGING_ENABLED = os.getenv("AI_HEDGING_ENABLED", "false").lower() == "true"
+AI_HEDGE_DEFAULT_DELAY = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "2.0"))
+AI_HEDGE_P50_MULTIPLIER = float(os.getenv("AI_HEDGE_P50_MULTIPLIER", "1.0"))
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "0.5"))
+AI_HEDGE_MAX_DELAY = float(os.getenv("AI_HEDGE_MAX_DELAY", "5.0"))
+AI_HEDGE_TIMEOUT = float(os.getenv("AI_HEDGE_TIMEOUT", "15"))
+
+# Approximate USD price per 1K tokens (input, output) used for the cost counters
+PROVIDER_PRICES_PER_1K = {
+    "groq": (0.00005, 0.00008),
+    "anthropic": (0.00025, 0.00125),
+    "gemini": (0.000075, 0.0003),
+}
+
+# A provider call takes the HTTP timeout it may use and returns the response text
+ProviderCall = Callable[[float], Optional[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text or "") // 4)
+
+
+class ProviderStats:
+    """Thread-safe per-provider win, latency and cost counters"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    def _counter(self, provider: str) -> Dict[str, float]:
+        if provider not in self._counters:
+            self._counters[provider] = {
+                "attempts": 0, "successes": 0, "errors": 0, "wins": 0,
+                "hedged": 0, "cancelled": 0,
+                "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0
+            }
+            self._latencies[provider] = deque(maxlen=self._window)
+        return self._counters[provider]
+
+    def record_attempt(self, provider: str, hedged: bool = False):
+        with self._lock:
+            counter = self._counter(provider)
+            counter["attempts"] += 1
+            if hedged:
+                counter["hedged"] += 1
+
+    def record_result(self, provider: str, latency: float, success: bool, prompt: str = "", response: str = ""):
+        with self._lock:
+            counter = self._counter(provider)
+            if success:
+                counter["successes"] += 1
+                self._latencies[provider].append(latency)
+            else:
+                counter["errors"] += 1
+            input_tokens = estimate_tokens(prompt)
+            output_tokens = estimate_tokens(response) if response else 0
+            counter["input_tokens"] += input_tokens
+            counter["output_tokens"] += output_tokens
+            input_price, output_price = PROVIDER_PRICES_PER_1K.get(provider, (0.0, 0.0))
+            counter["cost_usd"] += input_tokens / 1000 * input_price + output_tokens / 1000 * output_price
+
+    def record_win(self, provider: str):
+        with self._lock:
+            self._counter(provider)["wins"] += 1
+
+    def record_cancelled(self, provider: str):
+        with self._lock:
+            self._counter(provider)["cancelled"] += 1
+
+    def percentile(self, provider: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(provider, []))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for provider in list(self._counters.keys()):
+            with self._lock:
+                counter = dict(self._counters[provider])
+            counter["cost_usd"] = round(counter["cost_usd"], 6)
+            counter["p50_latency"] = self.percentile(provider, 50)
+            counter["p95_latency"] = self.percentile(provider, 95)
+            result[provider] = counter
+        return result
+
+
+provider_stats = ProviderStats()
+
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AI_HEDGE_WORKERS", "16")),
+    thread_name_prefix="bizsakhi-hedge"
+)
+
+
+def hedge_delay(provider: str) -> float:
+    """Delay before hedging the given primary provider, derived from its p50 latency"""
+    p50 = provider_stats.percentile(provider, 50)
+    if p50 is None:
+        return AI_HEDGE_DEFAULT_DELAY
+    return min(AI_HEDGE_MAX_DELAY, max(AI_HEDGE_MIN_DELAY, p50 * AI_HEDGE_P50_MULTIPLIER))
+
+
+def timed_call(name: str, prompt: str, call: Callable[[], Optional[str]]) -> Optional[str]:
+    """
+    Run one provider call of the sequential fallback chain and record it like a
+    hedged attempt, so the p50 hedge delays and cost counters have data before
+    hedging is switched on. A non-empty answer counts as a win.
+    """
+    provider_stats.record_attempt(name)
+    started = time.perf_counter()
+    text = None
+    try:
+        text = call()
+        return text
+    finally:
+        latency = time.perf_counter() - started
+        provider_stats.record_result(name, latency, bool(text), prompt, text or "")
+        if text:
+            provider_stats.record_win(name)
+
+
+def hedged_call(prompt: str, providers: List[Tuple[str, ProviderCall]],
+                validate: Callable[[str], bool], deadline: Optional[Deadline] = None) -> Optional[Tuple[str, str]]:
+    """
+    Race providers in order. The first provider starts immediately; the next one
+    starts when the running primary exceeds its hedge delay or fails. The first
+    response accepted by `validate` wins and the remaining calls are cancelled
+    (queued ones never start, running ones have their results discarded).
+
+    Returns (provider_name, response_text) or None if every provider failed.
+    """
+    if not providers:
+        return None
+
+    deadline = deadline or Deadline(AI_HEDGE_TIMEOUT)
+    pending = list(providers)
+    running: Dict[Any, Tuple[str, float]] = {}
+    lost = threading.Event()
+
+    def launch(hedged: bool):
+        name, call = pending.pop(0)
+        provider_stats.record_attempt(name, hedged=hedged)
+
+        def _run() -> Optional[str]:
+            if lost.is_set() or deadline.expired():
+                return None
+            return call(deadline.timeout(deadline.remaining()))
+
+        running[_hedge_executor.submit(_run)] = (name, time.perf_counter())
+        if hedged:
+            logging.info(f"⏱️ Hedging with {name}")
+
+    def finish():
+        lost.set()
+        for future, (name, _) in running.items():
+            future.cancel()
+            provider_stats.record_cancelled(name)
+
+    launch(hedged=False)
+
+    while running and not deadline.expired():
+        primary_name = next(iter(running.values()))[0]
+        wait_for = deadline.remaining()
+        if pending:
+            wait_for = min(wait_for, hedge_delay(primary_name))
+
+        done, _ = wait(list(running.keys()), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if pending:
+                launch(hedged=True)
+            continue
+
+        for future in done:
+            name, started = running.pop(future)
+            latency = time.perf_counter() - started
+            try:
+                text = future.result()
+            except Exception as e:
+                logging.warning(f"{name} failed in hedged call: {str(e)}")
+                text = None
+
+            if text and validate(text):
+                provider_stats.record_result(name, latency, True, prompt, text)
+                provider_stats.record_win(name)
+                finish()
+                logging.info(f"✅ {name} won hedged call in {latency:.2f}s")
+                return name, text
+
+            provider_stats.record_result(name, latency, False, prompt, text or "")
+
+        # A provider failed outright - fail over to the next one without waiting
+        if not running and pending:
+            launch(hedged=False)
+
+    finish()
+    logging.warning("Hedged call failed: no provider returned a valid response")
+    return None
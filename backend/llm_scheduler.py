@@ -0,0 +1,187 @@
+import os
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from executors import Deadline
+from key_pool import TokenBucket, GEMINI_KEY_RPM, gemini_pool
+from llm_hedging import estimate_tokens
+
+# Provider-wide quotas (requests and tokens per minute). Requests are admitted
+# against both buckets before they are sent, so bursts queue briefly or go to
+# another provider instead of turning into a storm of 429s and retries.
+PROVIDER_QUOTAS = {
+    "groq": (
+        float(os.getenv("GROQ_RPM", "30")),
+        float(os.getenv("GROQ_TPM", "6000"))
+    ),
+    "anthropic": (
+        float(os.getenv("ANTHROPIC_RPM", "50")),
+        float(os.getenv("ANTHROPIC_TPM", "50000"))
+    ),
+    "gemini": (
+        float(os.getenv("GEMINI_RPM", str(GEMINI_KEY_RPM * max(1, len(gemini_pool))))),
+        float(os.getenv("GEMINI_TPM", "1000000"))
+    ),
+}
+# Longest a request may queue for quota before it is rerouted or given up
+AI_SCHEDULER_MAX_WAIT = float(os.getenv("AI_SCHEDULER_MAX_WAIT", "2.0"))
+# Expected completion size, counted against TPM together with the prompt
+AI_SCHEDULER_OUTPUT_TOKENS = int(os.getenv("AI_SCHEDULER_OUTPUT_TOKENS", "300"))
+
+
+class QuotaExceeded(Exception):
+    """Raised when a provider has no request/token quota left for a call"""
+
+
+class QuotaScheduler:
+    """Per-provider RPM/TPM admission control with queue-wait and reroute counters"""
+
+    def __init__(self, quotas: Dict[str, tuple], max_wait: float = AI_SCHEDULER_MAX_WAIT):
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._buckets = {
+            provider: (TokenBucket(rpm), TokenBucket(tpm))
+            for provider, (rpm, tpm) in quotas.items()
+        }
+        self._waits: Dict[str, Deque[float]] = {provider: deque(maxlen=200) for provider in quotas}
+        self._counters = {
+            provider: {"admitted": 0, "queued": 0, "rerouted": 0, "throttled": 0}
+            for provider in quotas
+        }
+        self._waiting = 0
+
+    def cost(self, prompt: str) -> int:
+        """Estimated tokens a call will use: prompt plus expected completion"""
+        return estimate_tokens(prompt) + AI_SCHEDULER_OUTPUT_TOKENS
+
+    @staticmethod
+    def _charge(token_bucket: TokenBucket, tokens: int) -> float:
+        """Tokens actually taken for a call: a prompt larger than the bucket takes all of it"""
+        return min(tokens, token_bucket.capacity)
+
+    def _wait_time(self, provider: str, tokens: int) -> float:
+        if provider not in self._buckets:
+            return 0.0
+        requests, token_bucket = self._buckets[provider]
+        return max(requests.wait_time(1), token_bucket.wait_time(tokens))
+
+    def _take(self, provider: str, tokens: int) -> bool:
+        """Take one request and the token cost from both buckets, all or nothing"""
+        if provider not in self._buckets:
+            return True
+        with self._lock:
+            if self._wait_time(provider, tokens) > 0:
+                return False
+            requests, token_bucket = self._buckets[provider]
+            if not requests.try_acquire(1):
+                return False
+            # The buckets are also drained outside this lock (throttle), so the
+            # check above can be stale: give the request back if TPM refuses
+            if not token_bucket.try_acquire(self._charge(token_bucket, tokens)):
+                requests.refund(1)
+                return False
+            return True
+
+    def try_acquire(self, provider: str, prompt: str) -> bool:
+        """Admit a call only if the provider has quota right now"""
+        if self._take(provider, self.cost(prompt)):
+            self._record_admitted(provider, 0.0)
+            return True
+        return False
+
+    def acquire(self, providers: List[str], prompt: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        Pick the first provider (in the given order) with quota for this prompt.
+        If none has quota now, queue for the one that frees up first, up to
+        max_wait and the caller's deadline. Returns None if nothing is admitted.
+        """
+        tokens = self.cost(prompt)
+        for index, provider in enumerate(providers):
+            if self._take(provider, tokens):
+                self._record_admitted(provider, 0.0)
+                if index > 0:
+                    with self._lock:
+                        for skipped in providers[:index]:
+                            if skipped in self._counters:
+                                self._counters[skipped]["rerouted"] += 1
+                    logging.info(f"⏩ Rerouted AI call to {provider}: {', '.join(providers[:index])} out of quota")
+                return provider
+
+        if not providers:
+            return None
+
+        budget = self.max_wait
+        if deadline is not None:
+            budget = min(budget, deadline.remaining())
+
+        started = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                waits = {provider: self._wait_time(provider, tokens) for provider in providers}
+                provider = min(waits, key=waits.get)
+                elapsed = time.perf_counter() - started
+                if elapsed + waits[provider] > budget or (deadline is not None and deadline.expired()):
+                    logging.warning(f"⏳ AI providers out of quota, could not admit call within {budget:.1f}s")
+                    return None
+                time.sleep(max(0.01, waits[provider]))
+                if self._take(provider, tokens):
+                    waited = time.perf_counter() - started
+                    self._record_admitted(provider, waited, queued=True)
+                    logging.info(f"⏳ AI call to {provider} queued {waited:.2f}s for quota")
+                    return provider
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self, provider: str, prompt: str):
+        """Give back quota for a call that was admitted but not sent"""
+        if provider not in self._buckets:
+            return
+        requests, token_bucket = self._buckets[provider]
+        requests.refund(1)
+        # Exactly what _take charged, never more
+        token_bucket.refund(self._charge(token_bucket, self.cost(prompt)))
+
+    def throttle(self, provider: str, retry_after: Optional[float] = None):
+        """
+        Provider answered 429: drain its request bucket so new calls queue or
+        reroute until it recovers (Retry-After seconds, if given).
+        """
+        if provider not in self._buckets:
+            return
+        requests, _ = self._buckets[provider]
+        requests.drain(retry_after or 0.0)
+        with self._lock:
+            self._counters[provider]["throttled"] += 1
+        logging.warning(f"🚦 {provider} rate limited us, backing off for {retry_after or 0:.0f}s")
+
+    def _record_admitted(self, provider: str, waited: float, queued: bool = False):
+        with self._lock:
+            if provider not in self._counters:
+                return
+            self._counters[provider]["admitted"] += 1
+            if queued:
+                self._counters[provider]["queued"] += 1
+            self._waits[provider].append(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {"waiting": self._waiting, "providers": {}}
+            for provider, (requests, token_bucket) in self._buckets.items():
+                waits = sorted(self._waits[provider])
+                result["providers"][provider] = {
+                    **self._counters[provider],
+                    "avg_queue_wait": round(sum(waits) / len(waits), 4) if waits else None,
+                    "p95_queue_wait": round(waits[min(len(waits) - 1, int(0.95 * (len(waits) - 1) + 0.5))], 4) if waits else None,
+                    "requests_available": round(requests.available, 2),
+                    "tokens_available": round(token_bucket.available, 0)
+                }
+            return result
+
+
+quota_scheduler = QuotaScheduler(PROVIDER_QUOTAS)
@@ -1,7 +1,7 @@
 import os
 import json
 import logging
-import requests
+import http_client
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import re
@@ -11,7 +11,7 @@ from dotenv import load_dotenv
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import google.generativeai as genai
+import gemini_client
 
 # Load environment variables
 load_dotenv()
@@ -24,16 +24,10 @@ class LoanRAGProcessor:
         self.scheme_texts = []
         
         # Initialize Gemini for text generation
-        self.gemini_key = os.getenv("GEMINI_API_KEY_1")
-        if self.gemini_key and "your-" not in self.gemini_key and len(self.gemini_key) > 10:
-            try:
-                genai.configure(api_key=self.gemini_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                self.gemini_available = True
-                logging.info("✅ Gemini AI initialized successfully for loan RAG system")
-            except Exception as e:
-                logging.warning(f"Gemini initialization failed: {e}")
-                self.gemini_available = False
+        # Uses the shared Gemini key pool instead of configuring the global genai client
+        if gemini_client.is_available():
+            self.gemini_available = True
+            logging.info("✅ Gemini AI initialized successfully for loan RAG system")
         else:
             self.gemini_available = False
             logging.warning("⚠️ Gemini API key not found or invalid. Loan RAG system will use fallback responses.")
@@ -209,7 +203,7 @@ class LoanRAGProcessor:
         
         for source in official_sources:
             try:
-                response = requests.get(source, timeout=10, headers={
+                response = http_client.get(source, timeout=10, headers={
                     'User-Agent': 'Mozilla/5.0 (compatible; BizSakhiBot/1.0; +https://bizsakhi.com/bot)'
                 })
                 if response.status_code == 200:
@@ -501,8 +495,7 @@ class LoanRAGProcessor:
             Response:
             """
             
-            response = self.model.generate_content(prompt)
-            return response.text
+            return gemini_client.generate_content(prompt)
             
         except Exception as e:
             logging.error(f"Failed to generate AI response: {e}")
@@ -1,23 +1,33 @@
-from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, Request, Header
+from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 import os
 import tempfile
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
-from gtts import gTTS
 import io
-import uuid
+import asyncio
 
 # Import our modules
 from database import get_db, create_tables
-from ai_processor import AIProcessor
-from speech_processor import SpeechProcessor
-from business_logic import BusinessLogic
-from supabase_business_logic import SupabaseBusinessLogic
-from loan_rag_processor import LoanRAGProcessor
+from service_registry import ServiceRegistry, LazyService
+import http_client
+from llm_hedging import provider_stats
+from provider_health import provider_health
+from key_pool import gemini_pool, groq_pool
+from llm_scheduler import quota_scheduler
+from single_flight import intent_flight
+from response_cache import response_cache
+from transcript_cache import transcript_cache, audio_digest
+from idempotency import voice_idempotency
+from tts_cache import tts_cache, tts_prerender, clean_tts_text, tts_language, TTS_CACHE_MAX_AGE
+from intent_classifier import intent_classifier
+from category_learner import category_learner, CORRECTION_WEIGHT
+from intent_rules import intent_rules, RuleResult, CLEAR_EXPENSES, CLEAR_INCOME, CLEAR_CHAT, CLEAR_ALL
+from audio_decoder import decode_audio, AudioDecodeError, AudioTooLong, MAX_AUDIO_BYTES
+from executors import run_db, run_ai, run_ai_with_deadline, run_speech, run_io, shutdown_executors, Overloaded, AI_EXECUTOR
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,104 +49,132 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize processors
-ai_processor = AIProcessor()
-speech_processor = SpeechProcessor()
-supabase_business = SupabaseBusinessLogic()
-loan_rag_processor = LoanRAGProcessor()
+# Seconds an intent parse may take before the user gets the smart fallback response
+AI_INTENT_TIMEOUT = float(os.getenv("AI_INTENT_TIMEOUT", "15"))
+
+# Processor factories - heavy imports (faster_whisper, sklearn, google.generativeai, bs4)
+# happen here on first use rather than when the module is imported
+def _create_ai_processor():
+    from ai_processor import AIProcessor
+    return AIProcessor()
+
+def _create_speech_processor():
+    from speech_service import SpeechService, SPEECH_PROCESSES
+    if SPEECH_PROCESSES > 0:
+        return SpeechService()
+    from speech_processor import SpeechProcessor
+    return SpeechProcessor()
+
+def _create_supabase_business():
+    from supabase_business_logic import SupabaseBusinessLogic
+    return SupabaseBusinessLogic()
+
+def _create_loan_rag_processor():
+    from loan_rag_processor import LoanRAGProcessor
+    return LoanRAGProcessor()
+
+# Initialize processors lazily
+services = ServiceRegistry()
+ai_processor = services.register("ai", _create_ai_processor)
+speech_processor = services.register("speech", _create_speech_processor)
+supabase_business = services.register("supabase", _create_supabase_business)
+loan_rag_processor = services.register("loan_rag", _create_loan_rag_processor)
+
+# Optional background warm-up at startup, e.g. WARMUP_SERVICES=ai,speech,supabase,loan_rag
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+WARMUP_SERVICES = [name.strip() for name in os.getenv("WARMUP_SERVICES", "ai,speech,supabase,loan_rag").split(",") if name.strip()]
+
+async def _service(service: LazyService) -> Any:
+    """The built service; a cold one is built on the I/O pool so the event loop never loads a model"""
+    return service.get() if service.warm else await run_io(service.get)
 
 # Authentication helper
-def get_user_id_from_auth(authorization: Optional[str] = Header(None)) -> str:
+async def get_user_id_from_auth(authorization: Optional[str] = Header(None)) -> str:
     """Extract user ID from Authorization header or return default"""
     if authorization and authorization.startswith("Bearer "):
         token = authorization.split(" ")[1]
-        user_id = supabase_business.get_user_id_from_token(token)
+        business_logic = await _service(supabase_business)
+        user_id = await run_db(business_logic.get_user_id_from_token, token)
         if user_id:
             return user_id
 
     # Fallback to default user for backward compatibility
     return "default_user"
 
-def _ultra_fast_transaction_detection(message: str, language: str, user_id: str, business_logic) -> Optional[Dict[str, Any]]:
+def _personalize_clarification_items(user_id: str, items: List[Dict[str, Any]]):
+    """Replace the AI's suggested_category with the user's learned choice for similar items"""
+    for item in items:
+        learned = category_learner.suggest(user_id, "item", item.get("name", ""))
+        if learned:
+            item["suggested_category"] = learned
+
+def _ultra_fast_transaction_detection(message: str, language: str, user_id: str, business_logic,
+                                     analysis: Optional[RuleResult] = None) -> Optional[Dict[str, Any]]:
     """
-    Ultra-fast regex-based transaction detection - processes immediately without AI
+    Ultra-fast rule-based transaction detection - processes immediately without AI
     """
-    import re
+    analysis = analysis or intent_rules.analyze(message)
+    transaction_type, amount = analysis.transaction_type, analysis.amount
+    if transaction_type is None:
+        return None
 
-    message_lower = message.lower().strip()
+    try:
+        # Process immediately
+        if transaction_type == 'income':
+            result = business_logic.add_income(
+                user_id=user_id,
+                amount=amount,
+                description=f"Income - ₹{amount}",
+                category="General",
+                source="fast_detection",
+                language=language,
+                category_text=message
+            )
+        else:
+            result = business_logic.add_expense(
+                user_id=user_id,
+                amount=amount,
+                description=f"Expense - ₹{amount}",
+                category="General",
+                source="fast_detection",
+                category_text=message
+            )
 
-    # Super simple patterns for immediate detection
-    patterns = [
-        # Income patterns
-        (r'income\s+(?:is\s+)?(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'income'),
-        (r'earned\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'income'),
-        (r'received\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'income'),
-        (r'आय\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'income'),
-        (r'कमाई\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'income'),
-
-        # Expense patterns
-        (r'expense\s+(?:is\s+)?(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'expense'),
-        (r'spent\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'expense'),
-        (r'paid\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'expense'),
-        (r'खर्च\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'expense'),
-        (r'खर्चा\s+(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)', 'expense'),
-
-        # Simple amount patterns
-        (r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:income|आय)', 'income'),
-        (r'(?:rs\.?\s*|₹\s*)?(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(?:expense|खर्च)', 'expense'),
-    ]
-
-    for pattern, transaction_type in patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            try:
-                amount_str = match.group(1).replace(',', '')
-                amount = float(amount_str)
-
-                if amount > 0:
-                    # Process immediately
-                    if transaction_type == 'income':
-                        result = business_logic.add_income(
-                            user_id=user_id,
-                            amount=amount,
-                            description=f"Income - ₹{amount}",
-                            category="General",
-                            source="fast_detection",
-                            language=language
-                        )
-                    else:
-                        result = business_logic.add_expense(
-                            user_id=user_id,
-                            amount=amount,
-                            description=f"Expense - ₹{amount}",
-                            category="General",
-                            source="fast_detection"
-                        )
-
-                    if result.get("success"):
-                        # Save to chat history
-                        business_logic.save_chat_history(
-                            user_id=user_id,
-                            message=message,
-                            response=result["message"],
-                            message_type="text",
-                            intent=transaction_type
-                        )
-
-                        return {
-                            "success": True,
-                            "message": result["message"],
-                            "intent": transaction_type,
-                            "confidence": 0.98,
-                            "business_results": [result],
-                            "transactions_processed": 1,
-                            "fast_detection": True
-                        }
-            except (ValueError, KeyError):
-                continue
+        if result.get("success"):
+            # Save to chat history
+            business_logic.save_chat_history(
+                user_id=user_id,
+                message=message,
+                response=result["message"],
+                message_type="text",
+                # Not a training label: the rule engine's own guess
+                intent=None
+            )
+
+            return {
+                "success": True,
+                "message": result["message"],
+                "intent": transaction_type,
+                "confidence": 0.98,
+                "business_results": [result],
+                "transactions_processed": 1,
+                "fast_detection": True
+            }
+    except (ValueError, KeyError):
+        pass
 
     return None
 
+def _logged_intent(intent_result: Dict[str, Any], default: str = "general") -> Optional[str]:
+    """
+    Intent label stored with the chat message. The labels train the local intent
+    classifier, so answers from the rule engine, the classifier itself or a
+    fallback are stored without one: only LLM-labelled messages teach it.
+    """
+    if any(intent_result.get(flag) for flag in ("fast_detection", "local_classifier", "fallback_used")):
+        return None
+    return intent_result.get("primary_intent", intent_result.get("intent", default))
+
 def _get_smart_fallback_response(message: str, language: str) -> Dict[str, Any]:
     """
     Smart fallback responses when AI is unavailable
@@ -208,6 +246,19 @@ def _get_smart_fallback_response(message: str, language: str) -> Dict[str, Any]:
 async def startup_event():
     create_tables()
     logger.info("Database tables created successfully")
+    await run_io(tts_cache.remove_legacy_files)
+
+    if WARMUP_ON_STARTUP:
+        services.warm_up_in_background(WARMUP_SERVICES)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_executors()
+    http_client.close_all()
+    response_cache.save()
+    category_learner.flush()
+    if speech_processor.warm and hasattr(speech_processor.get(), "shutdown"):
+        speech_processor.shutdown()
 
 @app.get("/")
 async def root():
@@ -215,80 +266,137 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "BizSakhi API is running"}
+    return {"status": "healthy", "message": "BizSakhi API is running", "ai_pool": AI_EXECUTOR.stats()}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe - reports whether the services are built, separate from /health
+    liveness. Without startup warm-up the first probe starts building them in the
+    background, so the instance turns ready without a user request paying for it.
+    """
+    ready = services.is_ready(WARMUP_SERVICES)
+    if not ready and not WARMUP_ON_STARTUP:
+        services.warm_up_in_background(WARMUP_SERVICES)
+    return JSONResponse({
+        "ready": ready,
+        "services": services.status()
+    }, status_code=200 if ready else 503)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime counters for the AI pipeline"""
+    return {
+        "ai_pool": AI_EXECUTOR.stats(),
+        "providers": provider_stats.snapshot(),
+        "provider_health": provider_health.snapshot(),
+        "key_pools": {"gemini": gemini_pool.stats(), "groq": groq_pool.stats()},
+        "quota_scheduler": quota_scheduler.snapshot(),
+        "intent_coalescing": intent_flight.stats(),
+        "response_cache": response_cache.stats(),
+        "intent_classifier": intent_classifier.stats(),
+        "category_learner": category_learner.stats(),
+        "speech": speech_processor.stats() if speech_processor.warm else {"warm": False},
+        "speech_cache": transcript_cache.stats(),
+        "voice_idempotency": voice_idempotency.stats(),
+        "tts_cache": tts_cache.stats(),
+        "tts_prerender": tts_prerender.stats()
+    }
+
+def _audio_response(request: Request, key: str, audio: bytes, etag: str) -> Response:
+    """mp3 response with a strong ETag so clients can revalidate or reuse it"""
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"private, max-age={TTS_CACHE_MAX_AGE}" if tts_cache.enabled else "no-cache",
+        "Content-Disposition": f'inline; filename="tts_{key[:16]}.mp3"'
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if f'"{etag}"' in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=audio, media_type="audio/mpeg", headers=headers)
+
+async def _tts_response(request: Request, text: str, language: str, audio_token: Optional[str] = None):
+    """Pre-rendered audio for a chat reply's audio_token, else cached/synthesized audio for the text"""
+    if audio_token:
+        rendered = await tts_prerender.wait(audio_token)
+        if rendered is not None:
+            return _audio_response(request, *rendered)
+        if not text:
+            return JSONResponse({
+                "success": False,
+                "message": "Audio token expired or unknown"
+            }, status_code=404)
+
+    clean_text = clean_tts_text(text)
+    if not clean_text:
+        return JSONResponse({
+            "success": False,
+            "message": "No valid text to convert"
+        }, status_code=400)
+
+    # Cache lookup, or network synthesis on a miss; keep both off the event loop
+    key, audio, etag = await run_io(tts_cache.render, clean_text, tts_language(language))
+    return _audio_response(request, key, audio, etag)
+
+def _with_audio_token(result: Any, language: str, speak: bool) -> JSONResponse:
+    """
+    For speak=true, start rendering the reply's speech now and add its audio_token
+    to the response body, so the client's /api/tts call does not start from scratch
+    """
+    if not speak:
+        return result if isinstance(result, JSONResponse) else JSONResponse(result)
+    if isinstance(result, JSONResponse):
+        if result.status_code != 200:
+            return result
+        body = json.loads(result.body)
+    else:
+        body = dict(result)
+    token = tts_prerender.start(body.get("message", ""), language)
+    if token:
+        body["audio_token"] = token
+    return JSONResponse(body)
 
 @app.post("/api/tts")
 async def text_to_speech(
     request: Request,
 ):
-    """Convert text to speech using Google TTS"""
+    """
+    Convert text to speech using Google TTS.
+    Body: {"text", "language"} and/or {"audio_token"} from a chat response sent with speak=true.
+    """
     try:
         data = await request.json()
         text = data.get("text", "")
         language = data.get("language", "en")
+        audio_token = data.get("audio_token")
 
-        if not text:
+        if not text and not audio_token:
             return JSONResponse({
                 "success": False,
                 "message": "Text is required"
             }, status_code=400)
 
-        # Clean text for better speech (remove emojis and symbols)
-        import re
-        clean_text = text
-
-        # Simple approach: remove common emojis and symbols
-        symbols_to_remove = ['✅', '❌', '🔊', '💰', '📊', '📦', '🎤', '🎯', '🌟', '🎉', '⚡', '🚀', '🎨', '🔧', '🌐', '📱', '🎭', '🧹', '⚙️', '🎛️']
-        for symbol in symbols_to_remove:
-            clean_text = clean_text.replace(symbol, '')
-
-        # Remove other common emojis using character ranges
-        clean_text = ''.join(char for char in clean_text if ord(char) < 0x1F600 or ord(char) > 0x1F64F)
-        clean_text = ''.join(char for char in clean_text if ord(char) < 0x1F300 or ord(char) > 0x1F5FF)
-
-        # Clean up multiple spaces
-        clean_text = re.sub(r'\s+', ' ', clean_text)
-        clean_text = clean_text.strip()
-
-        if not clean_text:
-            return JSONResponse({
-                "success": False,
-                "message": "No valid text to convert"
-            }, status_code=400)
-
-        # Language mapping for Google TTS
-        tts_lang_map = {
-            'en': 'en',
-            'hi': 'hi',
-            'ta': 'ta',
-            'ml': 'ml',
-            'te': 'te',
-            'kn': 'kn',
-            'gu': 'gu',
-            'bn': 'bn',
-            'mr': 'mr'
-        }
-
-        tts_lang = tts_lang_map.get(language, 'en')
-
-        # Create TTS object
-        tts = gTTS(text=clean_text, lang=tts_lang, slow=False)
+        return await _tts_response(request, text, language, audio_token)
 
-        # Generate unique filename
-        audio_filename = f"tts_{uuid.uuid4().hex}.mp3"
-        audio_path = os.path.join(tempfile.gettempdir(), audio_filename)
-
-        # Save audio file
-        tts.save(audio_path)
-
-        # Return audio file
-        return FileResponse(
-            audio_path,
-            media_type="audio/mpeg",
-            filename=audio_filename,
-            headers={"Cache-Control": "no-cache"}
-        )
+    except Exception as e:
+        logger.error(f"Error in text-to-speech: {str(e)}")
+        return JSONResponse({
+            "success": False,
+            "message": "Error generating speech",
+            "error": str(e)
+        }, status_code=500)
 
+@app.get("/api/tts")
+async def text_to_speech_get(request: Request, text: str = "", language: str = "en",
+                             audio_token: Optional[str] = None):
+    """Same as POST /api/tts, but as a plain URL that browsers and <audio> elements can cache"""
+    if not text and not audio_token:
+        return JSONResponse({
+            "success": False,
+            "message": "Text is required"
+        }, status_code=400)
+    try:
+        return await _tts_response(request, text, language, audio_token)
     except Exception as e:
         logger.error(f"Error in text-to-speech: {str(e)}")
         return JSONResponse({
@@ -302,23 +410,34 @@ async def process_text_message(
     message: str = Form(...),
     language: str = Form("en"),
     chat_mode: str = Form("general"),
+    speak: bool = Form(False),
     authorization: Optional[str] = Header(None)
 ):
     """
-    Process text message and extract business intent
+    Process text message and extract business intent.
+    With speak=true the reply's speech is rendered in the background and the
+    response carries an audio_token for /api/tts.
     """
+    result = await _process_text_message(message, language, chat_mode, authorization)
+    return _with_audio_token(result, language, speak)
+
+async def _process_text_message(message: str, language: str, chat_mode: str, authorization: Optional[str]):
+    """Intent pipeline for /api/chat/text; returns the response body or a JSONResponse"""
     try:
         # Get user ID from auth token
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
         logger.info(f"Processing text message for user {user_id}: {message[:50]}...")
 
         # Use Supabase business logic
-        business_logic = supabase_business
+        business_logic = await _service(supabase_business)
+
+        # One pass of the compiled rule engine: transaction, clear command and question markers
+        analysis = intent_rules.analyze(message)
 
         # ULTRA-FAST pattern detection for simple transactions (before any AI calls)
         # Only run in business mode
         if chat_mode == "business":
-            fast_result = _ultra_fast_transaction_detection(message, language, user_id, business_logic)
+            fast_result = await run_db(_ultra_fast_transaction_detection, message, language, user_id, business_logic, analysis)
             if fast_result:
                 logger.info("⚡ Ultra-fast transaction detection - immediate response!")
                 return fast_result
@@ -326,11 +445,9 @@ async def process_text_message(
             logger.info("💬 General mode - skipping transaction detection")
 
         # Check for clear commands first
-        message_lower = message.lower()
-
         # Clear expenses
-        if any(phrase in message_lower for phrase in ["clear expense", "delete expense", "remove expense", "reset expense", "make expense 0", "expense to 0", "खर्च साफ", "खर्च हटा", "खर्च शून्य"]):
-            result = business_logic.clear_expenses(user_id=user_id)
+        if analysis.clear_command == CLEAR_EXPENSES:
+            result = await run_db(business_logic.clear_expenses, user_id=user_id)
 
             # Override message with language-appropriate response
             if language == "en":
@@ -352,8 +469,8 @@ async def process_text_message(
             }
 
         # Clear income
-        elif any(phrase in message_lower for phrase in ["clear income", "delete income", "remove income", "reset income", "make income 0", "income to 0", "आय साफ", "आय हटा", "आय शून्य"]):
-            result = business_logic.clear_income(user_id=user_id)
+        elif analysis.clear_command == CLEAR_INCOME:
+            result = await run_db(business_logic.clear_income, user_id=user_id)
 
             # Override message with language-appropriate response
             if language == "en":
@@ -375,8 +492,8 @@ async def process_text_message(
             }
 
         # Clear chat
-        elif any(phrase in message_lower for phrase in ["clear chat", "delete chat", "remove chat", "reset chat", "clear history", "delete history", "चैट साफ", "चैट हटा", "इतिहास साफ"]):
-            result = business_logic.clear_chat_history(user_id=user_id)
+        elif analysis.clear_command == CLEAR_CHAT:
+            result = await run_db(business_logic.clear_chat_history, user_id=user_id)
 
             # Override message with language-appropriate response
             if language == "en":
@@ -398,8 +515,8 @@ async def process_text_message(
             }
 
         # Clear all data
-        elif any(phrase in message_lower for phrase in ["clear all", "delete all", "reset all", "clear everything", "reset everything", "सब साफ", "सब हटा", "सब कुछ साफ"]):
-            result = business_logic.clear_all_data(user_id=user_id)
+        elif analysis.clear_command == CLEAR_ALL:
+            result = await run_db(business_logic.clear_all_data, user_id=user_id)
 
             # Override message with language-appropriate response
             if language == "en":
@@ -422,37 +539,19 @@ async def process_text_message(
 
         # Parse intent using AI with timeout (now supports conversational responses)
         try:
-            import threading
-            import time
-
-            # Use threading-based timeout for Windows compatibility
-            result_container = {"result": None, "error": None}
-
-            def ai_processing_thread():
-                try:
-                    # Pass chat mode to AI processor
-                    result_container["result"] = ai_processor.parse_intent(message, language, chat_mode)
-                except Exception as e:
-                    result_container["error"] = e
-
-            # Start AI processing in separate thread
-            thread = threading.Thread(target=ai_processing_thread)
-            thread.daemon = True
-            thread.start()
-
-            # Wait for result with timeout
-            thread.join(timeout=15)  # 15 second timeout
-
-            if thread.is_alive():
-                # Thread is still running, timeout occurred
-                logger.warning("AI processing timed out, using smart fallback response")
-                intent_result = _get_smart_fallback_response(message, language)
-            elif result_container["error"]:
-                # Thread completed with error
-                raise result_container["error"]
-            else:
-                # Thread completed successfully
-                intent_result = result_container["result"]
+            # Run on the bounded AI pool; on timeout the deadline cancels remaining provider calls
+            ai = await _service(ai_processor)
+            intent_result = await run_ai_with_deadline(
+                ai.parse_intent, AI_INTENT_TIMEOUT, message, language, chat_mode
+            )
+
+        except asyncio.TimeoutError:
+            logger.warning("AI processing timed out, using smart fallback response")
+            intent_result = _get_smart_fallback_response(message, language)
+
+        except Overloaded as e:
+            logger.warning(f"AI pool saturated, shedding load: {str(e)}")
+            intent_result = _get_smart_fallback_response(message, language)
 
         except Exception as e:
             logger.warning(f"AI processing failed: {str(e)}, using smart fallback response")
@@ -465,12 +564,12 @@ async def process_text_message(
             logger.info(f"Processing conversational message - about to save chat history")
 
             # Save chat history for conversational messages
-            save_result = business_logic.save_chat_history(
+            save_result = await run_db(business_logic.save_chat_history,
                 user_id=user_id,
                 message=message,
                 response=response_message,
                 message_type="text",
-                intent=intent_result.get("intent", "conversational")
+                intent=_logged_intent(intent_result, "conversational")
             )
 
             logger.info(f"Chat history save result: {save_result}")
@@ -491,8 +590,11 @@ async def process_text_message(
 
             logger.info(f"Processing item clarification with {len(items)} items")
 
+            # Prefill each item with how this user categorized similar items before
+            await run_io(_personalize_clarification_items, user_id, items)
+
             # Save chat history for clarification messages
-            business_logic.save_chat_history(
+            await run_db(business_logic.save_chat_history,
                 user_id=user_id,
                 message=message,
                 response=response_message,
@@ -518,7 +620,7 @@ async def process_text_message(
         if "transactions" in intent_result and intent_result["transactions"]:
             for transaction in intent_result["transactions"]:
                 if transaction["intent"] == "income" and transaction.get("amount"):
-                    result = business_logic.add_income(
+                    result = await run_db(business_logic.add_income,
                         amount=transaction["amount"],
                         description=transaction.get("description", "Income"),
                         category=transaction.get("category", "General"),
@@ -529,7 +631,7 @@ async def process_text_message(
                     business_results.append(result)
 
                 elif transaction["intent"] == "expense" and transaction.get("amount"):
-                    result = business_logic.add_expense(
+                    result = await run_db(business_logic.add_expense,
                         amount=transaction["amount"],
                         description=transaction.get("description", "Expense"),
                         category=transaction.get("category", "General"),
@@ -539,7 +641,7 @@ async def process_text_message(
                     business_results.append(result)
 
                 elif transaction["intent"] == "inventory" and transaction.get("product_name") and transaction.get("quantity"):
-                    result = business_logic.add_inventory_item(
+                    result = await run_db(business_logic.add_inventory_item,
                         product_name=transaction["product_name"],
                         quantity=transaction["quantity"],
                         unit=transaction.get("unit", "pieces"),
@@ -558,11 +660,12 @@ async def process_text_message(
         elif intent_result.get("intent") == "income" and intent_result.get("action") == "add":
             data = intent_result.get("data", {})
             if data.get("amount"):
-                result = business_logic.add_income(
+                result = await run_db(business_logic.add_income,
                     amount=data["amount"],
                     description=data.get("description", "Income"),
                     category=data.get("category", "General"),
                     source="text",
+                    category_text=message,
                     user_id=user_id,
                     language=language
                 )
@@ -572,11 +675,12 @@ async def process_text_message(
         elif intent_result.get("intent") == "expense" and intent_result.get("action") == "add":
             data = intent_result.get("data", {})
             if data.get("amount"):
-                result = business_logic.add_expense(
+                result = await run_db(business_logic.add_expense,
                     amount=data["amount"],
                     description=data.get("description", "Expense"),
                     category=data.get("category", "General"),
                     source="text",
+                    category_text=message,
                     user_id=user_id
                 )
                 business_results.append(result)
@@ -597,7 +701,7 @@ async def process_text_message(
             ]):
                 logger.info("🎯 Direct profit/loss detection triggered!")
                 # Get profit and loss summary
-                profit_loss = business_logic.get_profit_loss_summary(user_id)
+                profit_loss = await run_db(business_logic.get_profit_loss_summary, user_id)
                 if profit_loss["success"]:
                     total_income = profit_loss["total_income"]
                     total_expenses = profit_loss["total_expenses"]
@@ -644,7 +748,7 @@ async def process_text_message(
             ]) and not ("today" in query_message or "आज" in query_message):
                 logger.info("🎯 Direct income detection triggered!")
                 # Get overall income summary
-                income_summary = business_logic.get_income_summary(user_id)
+                income_summary = await run_db(business_logic.get_income_summary, user_id)
                 if income_summary["success"] and income_summary["total_income"] > 0:
                     total_income = income_summary["total_income"]
                     count = income_summary["count"]
@@ -660,7 +764,7 @@ async def process_text_message(
             ]) and not ("today" in query_message or "आज" in query_message):
                 logger.info("🎯 Direct expense detection triggered!")
                 # Get overall expense summary
-                expense_summary = business_logic.get_expense_summary(user_id)
+                expense_summary = await run_db(business_logic.get_expense_summary, user_id)
                 if expense_summary["success"] and expense_summary["total_expenses"] > 0:
                     total_expenses = expense_summary["total_expenses"]
                     count = expense_summary["count"]
@@ -672,7 +776,7 @@ async def process_text_message(
                 query_message = message.lower()
                 if "expense" in query_message and ("today" in query_message or "आज" in query_message):
                     # Get today's expenses
-                    today_expenses = business_logic.get_today_expenses(user_id)
+                    today_expenses = await run_db(business_logic.get_today_expenses, user_id)
                     if today_expenses["success"] and today_expenses["count"] > 0:
                         response_message = f"आज का कुल खर्च ₹{today_expenses['total_expenses']} है। {today_expenses['count']} लेन-देन हुए हैं।" if language == "hi" else f"Today's total expense is ₹{today_expenses['total_expenses']}. You have {today_expenses['count']} transactions."
                     else:
@@ -682,7 +786,7 @@ async def process_text_message(
                     response_message = intent_result.get("response_message", "Income query functionality coming soon!")
                 elif any(keyword in query_message for keyword in ["profit", "loss", "लाभ", "हानि", "नुकसान", "फायदा"]):
                     # Get profit and loss summary
-                    profit_loss = business_logic.get_profit_loss_summary(user_id)
+                    profit_loss = await run_db(business_logic.get_profit_loss_summary, user_id)
                     if profit_loss["success"]:
                         total_income = profit_loss["total_income"]
                         total_expenses = profit_loss["total_expenses"]
@@ -708,7 +812,7 @@ async def process_text_message(
                         response_message = "मुझे आपके profit और loss की जानकारी पाने में समस्या हो रही है। कृपया कुछ income और expense डेटा जोड़ें।" if language == "hi" else "I'm having trouble getting your profit and loss information. Please add some income and expense data first."
                 elif any(keyword in query_message for keyword in ["income", "आय", "कमाई", "revenue"]) and not ("today" in query_message or "आज" in query_message):
                     # Get overall income summary
-                    income_summary = business_logic.get_income_summary(user_id)
+                    income_summary = await run_db(business_logic.get_income_summary, user_id)
                     if income_summary["success"] and income_summary["total_income"] > 0:
                         total_income = income_summary["total_income"]
                         count = income_summary["count"]
@@ -717,7 +821,7 @@ async def process_text_message(
                         response_message = "अभी तक कोई आय दर्ज नहीं की गई है। कृपया कुछ income entries जोड़ें।" if language == "hi" else "No income recorded yet. Please add some income entries."
                 elif any(keyword in query_message for keyword in ["expense", "खर्च", "खर्चा", "spending"]) and not ("today" in query_message or "आज" in query_message):
                     # Get overall expense summary
-                    expense_summary = business_logic.get_expense_summary(user_id)
+                    expense_summary = await run_db(business_logic.get_expense_summary, user_id)
                     if expense_summary["success"] and expense_summary["total_expenses"] > 0:
                         total_expenses = expense_summary["total_expenses"]
                         count = expense_summary["count"]
@@ -731,12 +835,12 @@ async def process_text_message(
                 response_message = intent_result.get("response_message", "I'm here to help with your business needs!")
         
         # Save chat history
-        business_logic.save_chat_history(
+        await run_db(business_logic.save_chat_history,
             user_id=user_id,
             message=message,
             response=response_message,
             message_type="text",
-            intent=intent_result.get("primary_intent", intent_result.get("intent", "general"))
+            intent=_logged_intent(intent_result)
         )
 
         return JSONResponse({
@@ -756,150 +860,186 @@ async def process_text_message(
             "error": str(e)
         }, status_code=500)
 
+async def _process_voice_transcript(user_id: str, transcribed_text: str, confidence: float,
+                                    detected_language: Optional[str], language: str) -> Dict[str, Any]:
+    """Run a voice transcript through the intent pipeline, store the results and build the response body"""
+    # Process transcribed text
+    try:
+        ai = await _service(ai_processor)
+        intent_result = await run_ai_with_deadline(
+            ai.parse_intent, AI_INTENT_TIMEOUT, transcribed_text, detected_language or language
+        )
+    except (asyncio.TimeoutError, Overloaded) as e:
+        logger.warning(f"AI processing unavailable for voice message ({type(e).__name__}), using smart fallback response")
+        intent_result = _get_smart_fallback_response(transcribed_text, detected_language or language)
+
+    # Use Supabase business logic
+    business_logic = await _service(supabase_business)
+    
+    # Process based on intent (same logic as text processing)
+    response_message = ""
+    business_results = []
+
+    # Handle multiple transactions if present
+    if "transactions" in intent_result and intent_result["transactions"]:
+        for transaction in intent_result["transactions"]:
+            if transaction["intent"] == "income" and transaction.get("amount"):
+                result = await run_db(business_logic.add_income,
+                    amount=transaction["amount"],
+                    description=transaction.get("description", "Income"),
+                    category=transaction.get("category", "General"),
+                    source="voice",
+                    user_id=user_id
+                )
+                business_results.append(result)
+
+            elif transaction["intent"] == "expense" and transaction.get("amount"):
+                result = await run_db(business_logic.add_expense,
+                    amount=transaction["amount"],
+                    description=transaction.get("description", "Expense"),
+                    category=transaction.get("category", "General"),
+                    source="voice",
+                    user_id=user_id
+                )
+                business_results.append(result)
+
+            elif transaction["intent"] == "inventory" and transaction.get("product_name") and transaction.get("quantity"):
+                result = await run_db(business_logic.add_inventory_item,
+                    product_name=transaction["product_name"],
+                    quantity=transaction["quantity"],
+                    unit=transaction.get("unit", "pieces"),
+                    cost_per_unit=transaction.get("cost_per_unit", 0.0),
+                    user_id=user_id
+                )
+                business_results.append(result)
+
+        # Use AI response message if transactions were processed
+        if business_results:
+            response_message = intent_result.get("response_message", "Transactions processed successfully!")
+        else:
+            response_message = intent_result.get("response_message", "No valid transactions found.")
+
+    # Fallback to old format for backward compatibility
+    elif intent_result.get("intent") == "income" and intent_result.get("action") == "add":
+        data = intent_result.get("data", {})
+        if data.get("amount"):
+            result = await run_db(business_logic.add_income,
+                amount=data["amount"],
+                description=data.get("description", "Income"),
+                category=data.get("category", "General"),
+                source="voice",
+                category_text=transcribed_text,
+                user_id=user_id
+            )
+            business_results.append(result)
+            response_message = result["message"]
+
+    elif intent_result.get("intent") == "expense" and intent_result.get("action") == "add":
+        data = intent_result.get("data", {})
+        if data.get("amount"):
+            result = await run_db(business_logic.add_expense,
+                amount=data["amount"],
+                description=data.get("description", "Expense"),
+                category=data.get("category", "General"),
+                source="voice",
+                category_text=transcribed_text,
+                user_id=user_id
+            )
+            business_results.append(result)
+            response_message = result["message"]
+
+    else:
+        # Handle queries
+        if intent_result.get("action") == "query":
+            query_message = transcribed_text.lower()
+            if "expense" in query_message and ("today" in query_message or "आज" in query_message):
+                today_expenses = await run_db(business_logic.get_today_expenses, user_id)
+                if today_expenses["success"] and today_expenses["count"] > 0:
+                    response_message = f"आज का कुल खर्च ₹{today_expenses['total_expenses']} है। {today_expenses['count']} लेन-देन हुए हैं।" if language == "hi" else f"Today's total expense is ₹{today_expenses['total_expenses']}. You have {today_expenses['count']} transactions."
+                else:
+                    response_message = "आज कोई खर्च नहीं हुआ है।" if language == "hi" else "No expenses recorded for today."
+            else:
+                response_message = intent_result.get("response_message", "I'm here to help with your business needs!")
+        else:
+            response_message = intent_result.get("response_message", "I'm here to help with your business needs!")
+    
+    # Save chat history
+    await run_db(business_logic.save_chat_history,
+        user_id=user_id,
+        message=transcribed_text,
+        response=response_message,
+        message_type="voice",
+        intent=_logged_intent(intent_result)
+    )
+
+    return {
+        "success": True,
+        "transcribed_text": transcribed_text,
+        "message": response_message,
+        "intent": intent_result.get("primary_intent", intent_result.get("intent", "general")),
+        "confidence": confidence,
+        "detected_language": detected_language,
+        "business_results": business_results,
+        "transactions_processed": len(business_results)
+    }
+
 @app.post("/api/chat/voice")
 async def process_voice_message(
     audio_file: UploadFile = File(...),
     language: str = Form("hi"),
-    authorization: Optional[str] = Header(None)
+    speech_language: Optional[str] = Form(None),
+    speak: bool = Form(False),
+    authorization: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
-    Process voice message and extract business intent
+    Process voice message and extract business intent.
+    speech_language is an optional spoken-language hint; when set, Whisper skips language detection.
+    The hint only comes from the request: profiles have no language column to fall back on.
+    A retried upload (same Idempotency-Key header, or the same recording from the same user)
+    replays the first response instead of adding the transactions again.
+    speak=true pre-renders the reply's speech and adds an audio_token, as for /api/chat/text.
     """
     try:
         # Get user ID from auth token
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
         logger.info(f"Processing voice message from user: {user_id}")
 
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
+        # Decode the upload in memory (capped by size and duration); nothing touches the disk
+        content = await audio_file.read(MAX_AUDIO_BYTES + 1)
         try:
-            # Transcribe audio
-            transcribed_text, confidence, detected_language = speech_processor.transcribe_with_language_detection(temp_file_path)
-
+            audio = await run_io(decode_audio, content)
+        except AudioDecodeError as e:
+            logger.warning(f"Rejected voice upload from {user_id}: {str(e)}")
+            return JSONResponse({
+                "success": False,
+                "message": "आवाज़ की फ़ाइल पढ़ी नहीं जा सकी। कृपया छोटा संदेश दोबारा रिकॉर्ड करें।" if language == "hi" else "Could not read the recording. Please record a shorter message again.",
+                "error": str(e)
+            }, status_code=413 if isinstance(e, AudioTooLong) else 400)
+
+        async def transcribe_and_process() -> Dict[str, Any]:
+            speech = await _service(speech_processor)
+            transcribed_text, confidence, detected_language = await run_speech(
+                speech.transcribe_with_language_detection, audio, speech_language, owner=user_id
+            )
             if not transcribed_text:
-                return JSONResponse({
+                return {
                     "success": False,
                     "message": "आवाज़ को समझ नहीं पाई। कृपया दोबारा बोलें।" if language == "hi" else "Could not understand voice. Please speak again."
-                })
-
-            # Process transcribed text
-            intent_result = ai_processor.parse_intent(transcribed_text, detected_language or language)
-
-            # Use Supabase business logic
-            business_logic = supabase_business
-            
-            # Process based on intent (same logic as text processing)
-            response_message = ""
-            business_results = []
-
-            # Handle multiple transactions if present
-            if "transactions" in intent_result and intent_result["transactions"]:
-                for transaction in intent_result["transactions"]:
-                    if transaction["intent"] == "income" and transaction.get("amount"):
-                        result = business_logic.add_income(
-                            amount=transaction["amount"],
-                            description=transaction.get("description", "Income"),
-                            category=transaction.get("category", "General"),
-                            source="voice",
-                            user_id=user_id
-                        )
-                        business_results.append(result)
-
-                    elif transaction["intent"] == "expense" and transaction.get("amount"):
-                        result = business_logic.add_expense(
-                            amount=transaction["amount"],
-                            description=transaction.get("description", "Expense"),
-                            category=transaction.get("category", "General"),
-                            source="voice",
-                            user_id=user_id
-                        )
-                        business_results.append(result)
-
-                    elif transaction["intent"] == "inventory" and transaction.get("product_name") and transaction.get("quantity"):
-                        result = business_logic.add_inventory_item(
-                            product_name=transaction["product_name"],
-                            quantity=transaction["quantity"],
-                            unit=transaction.get("unit", "pieces"),
-                            cost_per_unit=transaction.get("cost_per_unit", 0.0),
-                            user_id=user_id
-                        )
-                        business_results.append(result)
-
-                # Use AI response message if transactions were processed
-                if business_results:
-                    response_message = intent_result.get("response_message", "Transactions processed successfully!")
-                else:
-                    response_message = intent_result.get("response_message", "No valid transactions found.")
-
-            # Fallback to old format for backward compatibility
-            elif intent_result.get("intent") == "income" and intent_result.get("action") == "add":
-                data = intent_result.get("data", {})
-                if data.get("amount"):
-                    result = business_logic.add_income(
-                        amount=data["amount"],
-                        description=data.get("description", "Income"),
-                        category=data.get("category", "General"),
-                        source="voice",
-                        user_id=user_id
-                    )
-                    business_results.append(result)
-                    response_message = result["message"]
-
-            elif intent_result.get("intent") == "expense" and intent_result.get("action") == "add":
-                data = intent_result.get("data", {})
-                if data.get("amount"):
-                    result = business_logic.add_expense(
-                        amount=data["amount"],
-                        description=data.get("description", "Expense"),
-                        category=data.get("category", "General"),
-                        source="voice",
-                        user_id=user_id
-                    )
-                    business_results.append(result)
-                    response_message = result["message"]
-
-            else:
-                # Handle queries
-                if intent_result.get("action") == "query":
-                    query_message = transcribed_text.lower()
-                    if "expense" in query_message and ("today" in query_message or "आज" in query_message):
-                        today_expenses = business_logic.get_today_expenses(user_id)
-                        if today_expenses["success"] and today_expenses["count"] > 0:
-                            response_message = f"आज का कुल खर्च ₹{today_expenses['total_expenses']} है। {today_expenses['count']} लेन-देन हुए हैं।" if language == "hi" else f"Today's total expense is ₹{today_expenses['total_expenses']}. You have {today_expenses['count']} transactions."
-                        else:
-                            response_message = "आज कोई खर्च नहीं हुआ है।" if language == "hi" else "No expenses recorded for today."
-                    else:
-                        response_message = intent_result.get("response_message", "I'm here to help with your business needs!")
-                else:
-                    response_message = intent_result.get("response_message", "I'm here to help with your business needs!")
-            
-            # Save chat history
-            business_logic.save_chat_history(
-                user_id=user_id,
-                message=transcribed_text,
-                response=response_message,
-                message_type="voice",
-                intent=intent_result.get("primary_intent", intent_result.get("intent", "general"))
-            )
+                }
+            return await _process_voice_transcript(user_id, transcribed_text, confidence, detected_language, language)
 
+        request_key = idempotency_key or await run_io(audio_digest, audio)
+        try:
+            result = await voice_idempotency.run(f"{user_id}|{request_key}|{speech_language or ''}", transcribe_and_process)
+        except Overloaded as e:
+            logger.warning(f"Speech workers saturated, shedding voice request: {str(e)}")
             return JSONResponse({
-                "success": True,
-                "transcribed_text": transcribed_text,
-                "message": response_message,
-                "intent": intent_result.get("primary_intent", intent_result.get("intent", "general")),
-                "confidence": confidence,
-                "detected_language": detected_language,
-                "business_results": business_results,
-                "transactions_processed": len(business_results)
-            })
-            
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+                "success": False,
+                "message": "अभी बहुत सारे संदेश आ रहे हैं। कृपया थोड़ी देर में दोबारा बोलें।" if language == "hi" else "Voice service is busy. Please try again in a moment."
+            }, status_code=503)
+
+        return _with_audio_token(result, language, speak)
         
     except Exception as e:
         logger.error(f"Error processing voice message: {str(e)}")
@@ -909,6 +1049,121 @@ async def process_voice_message(
             "error": str(e)
         }, status_code=500)
 
+@app.websocket("/api/chat/voice/stream")
+async def stream_voice_message(websocket: WebSocket):
+    """
+    Streaming voice message. Query parameters: token (auth, browsers cannot
+    set headers on a WebSocket), language, speech_language (optional hint) and
+    format: "pcm16" (raw 16 kHz mono int16 frames) or "webm" / "ogg"
+    (MediaRecorder chunks). Binary frames carry audio; the text frame
+    {"type": "end"} finishes the message.
+
+    While audio arrives, server-side VAD cuts it into utterances at pauses and
+    each one is transcribed right away; the server sends
+    {"type": "partial", "text", "segment", "language"} after every utterance
+    and finally {"type": "final", ...} with the /api/chat/voice response body,
+    or {"type": "error", "message"}.
+    """
+    # Imported here: both pull in faster-whisper, which the lazy speech service loads on first use
+    from speech_processor import normalize_language_hint
+    from voice_stream import VoiceStream, SPEECH_STREAM_IDLE_SECONDS
+
+    await websocket.accept()
+    params = websocket.query_params
+    language = params.get("language", "hi")
+    token = params.get("token")
+    authorization = websocket.headers.get("authorization") or (f"Bearer {token}" if token else None)
+
+    transcripts: List[str] = []
+    confidences: List[float] = []
+    detected_language: Optional[str] = normalize_language_hint(params.get("speech_language"))
+    segments: asyncio.Queue = asyncio.Queue()
+
+    async def transcribe_segments():
+        nonlocal detected_language
+        while True:
+            segment = await segments.get()
+            if segment is None:
+                return
+            # Later utterances reuse the first one's language, so only one detection runs per message
+            speech = await _service(speech_processor)
+            text, confidence, segment_language = await run_speech(
+                speech.transcribe_with_language_detection, segment, detected_language, owner=user_id
+            )
+            if not text:
+                continue
+            transcripts.append(text)
+            confidences.append(confidence)
+            detected_language = detected_language or segment_language
+            await websocket.send_json({
+                "type": "partial",
+                "text": " ".join(transcripts),
+                "segment": text,
+                "language": detected_language
+            })
+
+    async def send_error(message_hi: str, message_en: str, error: str):
+        await websocket.send_json({
+            "type": "error",
+            "success": False,
+            "message": message_hi if language == "hi" else message_en,
+            "error": error
+        })
+
+    worker = asyncio.create_task(transcribe_segments())
+    try:
+        user_id = await get_user_id_from_auth(authorization)
+        logger.info(f"Streaming voice message from user: {user_id}")
+        stream = VoiceStream(params.get("format", "pcm16"))
+
+        while not worker.done():
+            message = await asyncio.wait_for(websocket.receive(), timeout=SPEECH_STREAM_IDLE_SECONDS)
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                for segment in await run_io(stream.push, message["bytes"]):
+                    segments.put_nowait(segment)
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        for segment in await run_io(stream.finish):
+            segments.put_nowait(segment)
+        segments.put_nowait(None)
+        await worker
+
+        transcribed_text = " ".join(transcripts)
+        if not transcribed_text:
+            await websocket.send_json({
+                "type": "final",
+                "success": False,
+                "message": "आवाज़ को समझ नहीं पाई। कृपया दोबारा बोलें।" if language == "hi" else "Could not understand voice. Please speak again."
+            })
+        else:
+            result = await _process_voice_transcript(
+                user_id, transcribed_text, sum(confidences) / len(confidences), detected_language, language
+            )
+            await websocket.send_json({"type": "final", **result})
+
+    except WebSocketDisconnect:
+        logger.info("Voice stream closed by the client")
+        return
+    except asyncio.TimeoutError:
+        await send_error("कोई आवाज़ नहीं मिली। कृपया दोबारा बोलें।", "No audio received. Please speak again.", "idle timeout")
+    except AudioDecodeError as e:
+        await send_error("आवाज़ पढ़ी नहीं जा सकी। कृपया छोटा संदेश दोबारा रिकॉर्ड करें।",
+                         "Could not read the recording. Please record a shorter message again.", str(e))
+    except Overloaded as e:
+        logger.warning(f"Speech workers saturated, shedding voice stream: {str(e)}")
+        await send_error("अभी बहुत सारे संदेश आ रहे हैं। कृपया थोड़ी देर में दोबारा बोलें।",
+                         "Voice service is busy. Please try again in a moment.", str(e))
+    except Exception as e:
+        logger.error(f"Error processing voice stream: {str(e)}")
+        await send_error("आवाज़ प्रोसेसिंग में त्रुटि हुई।", "Error processing voice message.", str(e))
+    finally:
+        worker.cancel()
+
+    await websocket.close()
+
 @app.post("/api/chat/image")
 async def process_image_message(
     image_file: UploadFile = File(...),
@@ -920,7 +1175,7 @@ async def process_image_message(
     """
     try:
         # Get user ID from auth token
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
         logger.info(f"Processing image from user: {user_id}, content_type: {image_file.content_type}")
 
         # Validate file type
@@ -957,8 +1212,8 @@ async def process_image_message(
             from simple_receipt_processor import SimpleReceiptProcessor
             processor = SimpleReceiptProcessor()
 
-            # Process receipt with your exact approach
-            receipt_data = processor.process_receipt(temp_file_path)
+            # Process receipt with your exact approach (upload + status polling run on the I/O pool)
+            receipt_data = await run_io(processor.process_receipt, temp_file_path)
             logger.info(f"Receipt processing result: success={receipt_data.get('success')}, items={receipt_data.get('item_count', 0)}")
 
             if receipt_data.get("success"):
@@ -1014,7 +1269,7 @@ async def process_image_message(
                 }
 
             # Use Supabase business logic
-            business_logic = supabase_business
+            business_logic = await _service(supabase_business)
 
             # Process business results based on Document Intelligence output
             business_results = []
@@ -1026,7 +1281,7 @@ async def process_image_message(
             response_message = business_data.get("response_message", "Receipt processed successfully")
 
             # Save chat history
-            business_logic.save_chat_history(
+            await run_db(business_logic.save_chat_history,
                 user_id=user_id,
                 message=f"Receipt uploaded: {receipt_data.get('merchant', {}).get('name', 'Unknown store')}",
                 response=response_message,
@@ -1087,16 +1342,18 @@ async def get_income_summary(
     authorization: Optional[str] = Header(None)
 ):
     """Get income summary"""
-    user_id = get_user_id_from_auth(authorization)
-    return supabase_business.get_income_summary(user_id)
+    user_id = await get_user_id_from_auth(authorization)
+    business_logic = await _service(supabase_business)
+    return await run_db(business_logic.get_income_summary, user_id)
 
 @app.get("/api/summary/expense")
 async def get_expense_summary(
     authorization: Optional[str] = Header(None)
 ):
     """Get expense summary"""
-    user_id = get_user_id_from_auth(authorization)
-    return supabase_business.get_expense_summary(user_id)
+    user_id = await get_user_id_from_auth(authorization)
+    business_logic = await _service(supabase_business)
+    return await run_db(business_logic.get_expense_summary, user_id)
 
 @app.post("/api/expenses")
 async def add_expense(
@@ -1106,9 +1363,10 @@ async def add_expense(
     """Add a new expense"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.add_expense(
+        result = await run_db(business_logic.add_expense,
             user_id=user_id,
             amount=data.get("amount"),
             description=data.get("description"),
@@ -1133,9 +1391,10 @@ async def add_inventory_item(
     """Add a new inventory item"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.add_inventory_item(
+        result = await run_db(business_logic.add_inventory_item,
             user_id=user_id,
             product_name=data.get("product_name"),
             quantity=data.get("quantity"),
@@ -1160,9 +1419,10 @@ async def add_income(
     """Add a new income entry"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.add_income(
+        result = await run_db(business_logic.add_income,
             user_id=user_id,
             amount=data.get("amount"),
             description=data.get("description"),
@@ -1185,8 +1445,9 @@ async def get_inventory_summary(
     authorization: Optional[str] = Header(None)
 ):
     """Get inventory summary"""
-    user_id = get_user_id_from_auth(authorization)
-    return supabase_business.get_inventory_summary(user_id)
+    user_id = await get_user_id_from_auth(authorization)
+    business_logic = await _service(supabase_business)
+    return await run_db(business_logic.get_inventory_summary, user_id)
 
 @app.put("/api/inventory/{item_id}")
 async def update_inventory_item(
@@ -1197,9 +1458,10 @@ async def update_inventory_item(
     """Update an existing inventory item"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.update_inventory_item(
+        result = await run_db(business_logic.update_inventory_item,
             item_id=item_id,
             user_id=user_id,
             product_name=data.get("product_name"),
@@ -1224,8 +1486,9 @@ async def delete_inventory_item(
 ):
     """Delete an inventory item"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.delete_inventory_item(item_id, user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.delete_inventory_item, item_id, user_id)
         return result
     except Exception as e:
         logger.error(f"Error deleting inventory item: {str(e)}")
@@ -1245,9 +1508,10 @@ async def update_income_item(
     """Update an existing income item"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.update_income_item(
+        result = await run_db(business_logic.update_income_item,
             income_id=income_id,
             user_id=user_id,
             amount=data.get("amount"),
@@ -1271,8 +1535,9 @@ async def delete_income_item(
 ):
     """Delete an income item"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.delete_income_item(income_id, user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.delete_income_item, income_id, user_id)
         return result
     except Exception as e:
         logger.error(f"Error deleting income item: {str(e)}")
@@ -1291,9 +1556,10 @@ async def update_expense_item(
     """Update an existing expense item"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
-        result = supabase_business.update_expense_item(
+        result = await run_db(business_logic.update_expense_item,
             expense_id=expense_id,
             user_id=user_id,
             amount=data.get("amount"),
@@ -1317,8 +1583,9 @@ async def delete_expense_item(
 ):
     """Delete an expense item"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.delete_expense_item(expense_id, user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.delete_expense_item, expense_id, user_id)
         return result
     except Exception as e:
         logger.error(f"Error deleting expense item: {str(e)}")
@@ -1333,8 +1600,9 @@ async def delete_expense_item(
 async def get_user_profile(authorization: Optional[str] = Header(None)):
     """Get user profile"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.get_user_profile(user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.get_user_profile, user_id)
         return result
     except Exception as e:
         logger.error(f"Error getting user profile: {str(e)}")
@@ -1352,9 +1620,10 @@ async def update_user_profile(
     """Update user profile"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
         
-        result = supabase_business.update_user_profile(user_id, data)
+        result = await run_db(business_logic.update_user_profile, user_id, data)
         return result
     except Exception as e:
         logger.error(f"Error updating user profile: {str(e)}")
@@ -1372,9 +1641,10 @@ async def save_user_settings(
     """Save user settings"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
         
-        result = supabase_business.save_user_settings(user_id, data)
+        result = await run_db(business_logic.save_user_settings, user_id, data)
         return result
     except Exception as e:
         logger.error(f"Error saving user settings: {str(e)}")
@@ -1391,8 +1661,9 @@ async def clear_expenses(
 ):
     """Clear all expenses for a user"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.clear_expenses(user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.clear_expenses, user_id)
         return {"success": True, "message": result["message"]}
     except Exception as e:
         logger.error(f"Error clearing expenses: {str(e)}")
@@ -1404,8 +1675,9 @@ async def clear_income(
 ):
     """Clear all income for a user"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.clear_income(user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.clear_income, user_id)
         return {"success": True, "message": result["message"]}
     except Exception as e:
         logger.error(f"Error clearing income: {str(e)}")
@@ -1417,8 +1689,9 @@ async def clear_chat_history(
 ):
     """Clear all chat history for a user"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.clear_chat_history(user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.clear_chat_history, user_id)
         return {"success": True, "message": result["message"]}
     except Exception as e:
         logger.error(f"Error clearing chat history: {str(e)}")
@@ -1430,8 +1703,9 @@ async def clear_all_data(
 ):
     """Clear all data for a user (expenses, income, inventory, chat)"""
     try:
-        user_id = get_user_id_from_auth(authorization)
-        result = supabase_business.clear_all_data(user_id)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
+        result = await run_db(business_logic.clear_all_data, user_id)
         return {"success": True, "message": result["message"]}
     except Exception as e:
         logger.error(f"Error clearing all data: {str(e)}")
@@ -1443,8 +1717,9 @@ async def get_chat_history(
     authorization: Optional[str] = Header(None)
 ):
     """Get chat history for a user"""
-    user_id = get_user_id_from_auth(authorization)
-    return supabase_business.get_chat_history(user_id, limit)
+    user_id = await get_user_id_from_auth(authorization)
+    business_logic = await _service(supabase_business)
+    return await run_db(business_logic.get_chat_history, user_id, limit)
 
 @app.post("/api/chat/confirm-items")
 async def confirm_items(
@@ -1454,7 +1729,8 @@ async def confirm_items(
     """Process user-confirmed items from clarification table"""
     try:
         data = await request.json()
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
         confirmed_items = data.get("items", [])
 
         logger.info(f"Processing {len(confirmed_items)} confirmed items for user {user_id}")
@@ -1464,13 +1740,18 @@ async def confirm_items(
         for item in confirmed_items:
             category = item.get("category", "expense")
             name = item.get("name", "Unknown Item")
+
+            # The user's choice trains their item categorizer; overriding the suggestion counts more
+            suggested = item.get("suggested_category")
+            await run_io(category_learner.learn, user_id, "item", name, category,
+                         CORRECTION_WEIGHT if suggested and suggested != category else 1)
             quantity = float(item.get("quantity", 1))
             amount = float(item.get("amount", 0))
             cost_per_unit = float(item.get("cost_per_unit", 0))
             unit = item.get("unit", "pieces")
 
             if category == "income":
-                result = supabase_business.add_income(
+                result = await run_db(business_logic.add_income,
                     user_id=user_id,
                     amount=amount,
                     description=f"{quantity}x {name}" if quantity > 1 else name,
@@ -1480,7 +1761,7 @@ async def confirm_items(
                 business_results.append(result)
 
             elif category == "expense":
-                result = supabase_business.add_expense(
+                result = await run_db(business_logic.add_expense,
                     user_id=user_id,
                     amount=amount,
                     description=f"{quantity}x {name}" if quantity > 1 else name,
@@ -1491,7 +1772,7 @@ async def confirm_items(
 
             elif category == "inventory":
                 logger.info(f"Adding inventory item: name={name}, quantity={quantity}, cost_per_unit={cost_per_unit}, user_id={user_id}")
-                result = supabase_business.add_inventory_item(
+                result = await run_db(business_logic.add_inventory_item,
                     user_id=user_id,
                     product_name=name,
                     quantity=quantity,
@@ -1506,7 +1787,7 @@ async def confirm_items(
         summary_message = f"✅ Successfully processed {success_count} items!"
 
         # Save confirmation to chat history
-        supabase_business.save_chat_history(
+        await run_db(business_logic.save_chat_history,
             user_id=user_id,
             message=f"Confirmed {len(confirmed_items)} items",
             response=summary_message,
@@ -1540,7 +1821,8 @@ async def process_loan_query(
         data = await request.json()
         query = data.get("query", "")
         language = data.get("language", "en")
-        user_id = get_user_id_from_auth(authorization)
+        user_id = await get_user_id_from_auth(authorization)
+        business_logic = await _service(supabase_business)
 
         if not query.strip():
             return JSONResponse(
@@ -1551,11 +1833,12 @@ async def process_loan_query(
         logger.info(f"Processing loan query: '{query}' for user {user_id} in {language}")
 
         # Process the loan query using RAG
-        result = loan_rag_processor.process_loan_query(query, language)
+        loan_rag = await _service(loan_rag_processor)
+        result = await run_ai(loan_rag.process_loan_query, query, language)
 
         # Save to chat history
         if result.get("success", False):
-            supabase_business.save_chat_history(
+            await run_db(business_logic.save_chat_history,
                 user_id=user_id,
                 message=query,
                 response=result["response"],
@@ -1580,8 +1863,9 @@ async def get_loan_schemes(
     Get all available loan schemes
     """
     try:
-        user_id = get_user_id_from_auth(authorization)
-        schemes = loan_rag_processor.load_schemes_data()
+        user_id = await get_user_id_from_auth(authorization)
+        loan_rag = await _service(loan_rag_processor)
+        schemes = await run_io(loan_rag.load_schemes_data)
         
         return {
             "success": True,
@@ -0,0 +1,306 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# Turns spoken / native-script numbers into ASCII digits before intent
+# detection, so "पांच सौ", "ढाई हज़ार", "1.5 लाख" or "௫௦௦" reach the fast
+# path as 500, 2500, 150000 and 500.
+
+# Plain values. Hindi has a distinct word for every number up to 99.
+_HINDI_1_99 = (
+    "एक दो तीन चार पांच छह सात आठ नौ दस "
+    "ग्यारह बारह तेरह चौदह पंद्रह सोलह सत्रह अठारह उन्नीस बीस "
+    "इक्कीस बाईस तेईस चौबीस पच्चीस छब्बीस सत्ताईस अट्ठाईस उनतीस तीस "
+    "इकतीस बत्तीस तैंतीस चौंतीस पैंतीस छत्तीस सैंतीस अड़तीस उनतालीस चालीस "
+    "इकतालीस बयालीस तैंतालीस चौवालीस पैंतालीस छियालीस सैंतालीस अड़तालीस उनचास पचास "
+    "इक्यावन बावन तिरेपन चौवन पचपन छप्पन सत्तावन अट्ठावन उनसठ साठ "
+    "इकसठ बासठ तिरसठ चौंसठ पैंसठ छियासठ सड़सठ अड़सठ उनहत्तर सत्तर "
+    "इकहत्तर बहत्तर तिहत्तर चौहत्तर पचहत्तर छिहत्तर सतहत्तर अठहत्तर उन्यासी अस्सी "
+    "इक्यासी बयासी तिरासी चौरासी पचासी छियासी सत्तासी अट्ठासी नवासी नब्बे "
+    "इक्यानवे बानवे तिरानवे चौरानवे पचानवे छियानवे सत्तानवे अट्ठानवे निन्यानवे"
+).split()
+
+NUMBER_WORDS: Dict[str, float] = {word: float(i + 1) for i, word in enumerate(_HINDI_1_99)}
+NUMBER_WORDS.update({
+    # Hindi spelling variants
+    "पाँच": 5, "छः": 6, "छै": 6, "पन्द्रह": 15, "उनासी": 79,
+    # English
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+    # Marathi
+    "दोन": 2, "पाच": 5, "सहा": 6, "नऊ": 9, "दहा": 10, "अकरा": 11, "बारा": 12, "पंधरा": 15,
+    "वीस": 20, "पंचवीस": 25, "चाळीस": 40, "पन्नास": 50, "ऐंशी": 80, "नव्वद": 90,
+    "दोनशे": 200, "तीनशे": 300, "चारशे": 400, "पाचशे": 500, "सहाशे": 600, "सातशे": 700, "आठशे": 800,
+    "नऊशे": 900,
+    # Gujarati
+    "એક": 1, "બે": 2, "ત્રણ": 3, "ચાર": 4, "પાંચ": 5, "છ": 6, "સાત": 7, "આઠ": 8, "નવ": 9,
+    "દસ": 10, "વીસ": 20, "પચીસ": 25, "ત્રીસ": 30, "ચાલીસ": 40, "પચાસ": 50, "સાઠ": 60,
+    "સિત્તેર": 70, "એંસી": 80, "નેવું": 90,
+    "બસો": 200, "ત્રણસો": 300, "ચારસો": 400, "પાંચસો": 500, "છસો": 600, "સાતસો": 700, "આઠસો": 800,
+    "નવસો": 900,
+    # Bengali
+    "এক": 1, "দুই": 2, "তিন": 3, "চার": 4, "পাঁচ": 5, "ছয়": 6, "সাত": 7, "আট": 8, "নয়": 9,
+    "দশ": 10, "বিশ": 20, "কুড়ি": 20, "পঁচিশ": 25, "ত্রিশ": 30, "চল্লিশ": 40, "পঞ্চাশ": 50,
+    "ষাট": 60, "সত্তর": 70, "আশি": 80, "নব্বই": 90, "একশ": 100, "একশো": 100,
+    "দুশো": 200, "দুশ": 200, "তিনশো": 300, "তিনশ": 300, "চারশো": 400, "চারশ": 400, "পাঁচশো": 500,
+    "পাঁচশ": 500, "ছয়শো": 600, "সাতশো": 700, "আটশো": 800, "নয়শো": 900,
+    # Tamil
+    "ஒன்று": 1, "ஒரு": 1, "இரண்டு": 2, "மூன்று": 3, "நான்கு": 4, "ஐந்து": 5, "ஆறு": 6,
+    "ஏழு": 7, "எட்டு": 8, "ஒன்பது": 9, "பத்து": 10, "இருபது": 20, "முப்பது": 30,
+    "நாற்பது": 40, "ஐம்பது": 50, "அறுபது": 60, "எழுபது": 70, "எண்பது": 80, "தொண்ணூறு": 90,
+    "இருநூறு": 200, "முந்நூறு": 300, "நானூறு": 400, "ஐநூறு": 500, "ஐந்நூறு": 500, "அறுநூறு": 600,
+    "எழுநூறு": 700, "எண்ணூறு": 800, "தொள்ளாயிரம்": 900,
+    # Oblique hundreds before the rest of the number: ஐநூற்று ஐம்பது = 550
+    "இருநூற்று": 200, "முந்நூற்று": 300, "நானூற்று": 400, "ஐநூற்று": 500, "ஐந்நூற்று": 500,
+    "அறுநூற்று": 600, "எழுநூற்று": 700, "எண்ணூற்று": 800, "தொள்ளாயிரத்து": 900,
+    "இரண்டாயிரம்": 2000, "மூவாயிரம்": 3000, "நாலாயிரம்": 4000, "ஐயாயிரம்": 5000, "ஆறாயிரம்": 6000,
+    "ஏழாயிரம்": 7000, "எட்டாயிரம்": 8000, "ஒன்பதாயிரம்": 9000,
+    "இரண்டாயிரத்து": 2000, "மூவாயிரத்து": 3000, "நாலாயிரத்து": 4000, "ஐயாயிரத்து": 5000,
+    # Malayalam
+    "ഒന്ന്": 1, "ഒരു": 1, "രണ്ട്": 2, "മൂന്ന്": 3, "നാല്": 4, "അഞ്ച്": 5, "ആറ്": 6,
+    "ഏഴ്": 7, "എട്ട്": 8, "ഒമ്പത്": 9, "പത്ത്": 10, "ഇരുപത്": 20, "മുപ്പത്": 30,
+    "നാല്പത്": 40, "അമ്പത്": 50, "അറുപത്": 60, "എഴുപത്": 70, "എൺപത്": 80, "തൊണ്ണൂറ്": 90,
+    "ഇരുനൂറ്": 200, "മുന്നൂറ്": 300, "നാനൂറ്": 400, "അഞ്ഞൂറ്": 500, "അറുനൂറ്": 600,
+    "എഴുനൂറ്": 700, "എണ്ണൂറ്": 800, "തൊള്ളായിരം": 900,
+    # Oblique forms before the rest of the number: അഞ്ഞൂറ്റി അമ്പത് = 550, രണ്ടായിരത്തി അഞ്ഞൂറ് = 2500
+    "ഇരുനൂറ്റി": 200, "മുന്നൂറ്റി": 300, "നാനൂറ്റി": 400, "അഞ്ഞൂറ്റി": 500, "അറുനൂറ്റി": 600,
+    "എഴുനൂറ്റി": 700, "എണ്ണൂറ്റി": 800, "തൊള്ളായിരത്തി": 900,
+    "രണ്ടായിരം": 2000, "മൂവായിരം": 3000, "നാലായിരം": 4000, "അയ്യായിരം": 5000, "ആറായിരം": 6000,
+    "ഏഴായിരം": 7000, "എണ്ണായിരം": 8000, "ഒമ്പതിനായിരം": 9000,
+    "രണ്ടായിരത്തി": 2000, "മൂവായിരത്തി": 3000, "നാലായിരത്തി": 4000, "അയ്യായിരത്തി": 5000,
+    # Telugu
+    "ఒకటి": 1, "ఒక": 1, "రెండు": 2, "మూడు": 3, "నాలుగు": 4, "ఐదు": 5, "ఆరు": 6, "ఏడు": 7,
+    "ఎనిమిది": 8, "తొమ్మిది": 9, "పది": 10, "ఇరవై": 20, "ముప్పై": 30, "నలభై": 40,
+    "యాభై": 50, "అరవై": 60, "డెబ్బై": 70, "ఎనభై": 80, "తొంభై": 90,
+    # Kannada
+    "ಒಂದು": 1, "ಎರಡು": 2, "ಮೂರು": 3, "ನಾಲ್ಕು": 4, "ಐದು": 5, "ಆರು": 6, "ಏಳು": 7, "ಎಂಟು": 8,
+    "ಒಂಬತ್ತು": 9, "ಹತ್ತು": 10, "ಇಪ್ಪತ್ತು": 20, "ಮೂವತ್ತು": 30, "ನಲವತ್ತು": 40, "ಐವತ್ತು": 50,
+    "ಅರವತ್ತು": 60, "ಎಪ್ಪತ್ತು": 70, "ಎಂಬತ್ತು": 80, "ತೊಂಬತ್ತು": 90,
+    "ಇನ್ನೂರು": 200, "ಮುನ್ನೂರು": 300, "ನಾನೂರು": 400, "ಐನೂರು": 500, "ಆರುನೂರು": 600, "ಏಳುನೂರು": 700,
+    "ಎಂಟುನೂರು": 800, "ಒಂಬೈನೂರು": 900,
+    # Tamil numeral signs
+    "௰": 10,
+    # Romanized Hindi
+    "ek": 1, "do": 2, "teen": 3, "tin": 3, "chaar": 4, "char": 4, "paanch": 5, "panch": 5, "chhe": 6,
+    "saat": 7, "aath": 8, "nau": 9, "das": 10, "bees": 20, "bis": 20, "pachees": 25,
+    "pachis": 25, "tees": 30, "chaalees": 40, "chalis": 40, "pachaas": 50, "pachas": 50,
+})
+
+# Scale words: hundred, thousand, lakh, crore
+MULTIPLIERS: Dict[str, float] = {
+    "hundred": 100, "thousand": 1000, "k": 1000, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5,
+    "million": 1e6, "crore": 1e7, "crores": 1e7,
+    "सौ": 100, "हज़ार": 1000, "हजार": 1000, "लाख": 1e5, "करोड़": 1e7, "करोड": 1e7,
+    "शंभर": 100, "कोटी": 1e7,
+    "સો": 100, "હજાર": 1000, "લાખ": 1e5, "કરોડ": 1e7,
+    "শ": 100, "শো": 100, "হাজার": 1000, "লাখ": 1e5, "লক্ষ": 1e5, "কোটি": 1e7,
+    # Plural and oblique forms ("ఐదు వందలు", "ఐదు వందల రూపాయలు", "ஆயிரத்து ஐநூறு") count the same
+    "நூறு": 100, "நூற்று": 100, "ஆயிரம்": 1000, "ஆயிரத்து": 1000,
+    "லட்சம்": 1e5, "லட்சத்து": 1e5, "கோடி": 1e7, "கோடியே": 1e7,
+    "നൂറ്": 100, "നൂറു": 100, "നൂറ്റി": 100, "ആയിരം": 1000, "ആയിരത്തി": 1000,
+    "ലക്ഷം": 1e5, "ലക്ഷത്തി": 1e5, "കോടി": 1e7,
+    "వంద": 100, "వందలు": 100, "వందల": 100, "నూరు": 100, "నూట": 100, "వెయ్యి": 1000, "వేలు": 1000,
+    "వేల": 1000, "లక్ష": 1e5, "లక్షలు": 1e5, "లక్షల": 1e5, "కోటి": 1e7, "కోట్లు": 1e7, "కోట్ల": 1e7,
+    "ನೂರು": 100, "ನೂರ": 100, "ಸಾವಿರ": 1000, "ಸಾವಿರದ": 1000, "ಲಕ್ಷ": 1e5,
+    "ಲಕ್ಷದ": 1e5, "ಕೋಟಿ": 1e7,
+    "হাজারের": 1000, "লাখের": 1e5,
+    "௱": 100, "௲": 1000,
+    "sau": 100, "hazaar": 1000, "hazar": 1000, "hajar": 1000, "karod": 1e7, "karor": 1e7,
+    "nooru": 100, "aayiram": 1000, "ayiram": 1000, "vanda": 100, "vandalu": 100, "vandala": 100,
+    "veyyi": 1000, "velu": 1000,
+}
+
+# Fractions that are a number on their own: डेढ़ = 1.5, ढाई = 2.5
+FRACTION_WORDS: Dict[str, float] = {
+    "half": 0.5,
+    "आधा": 0.5, "डेढ़": 1.5, "ढाई": 2.5,
+    "अर्धा": 0.5, "दीड": 1.5, "अडीच": 2.5,
+    "અડધો": 0.5, "દોઢ": 1.5, "અઢી": 2.5,
+    "আধা": 0.5, "দেড়": 1.5, "আড়াই": 2.5,
+    "aadha": 0.5, "adha": 0.5, "dedh": 1.5, "dhai": 2.5, "dhaai": 2.5,
+    "அரை": 0.5, "അര": 0.5, "అర": 0.5, "ಅರ್ಧ": 0.5,
+}
+
+# Modifiers applied to the following number: साढ़े तीन = 3.5, सवा लाख = 1.25 lakh, पौने दो = 1.75
+FRACTION_MODIFIERS: Dict[str, float] = {
+    "साढ़े": 0.5, "सवा": 0.25, "पौने": -0.25,
+    "साडे": 0.5, "सव्वा": 0.25, "पावणे": -0.25,
+    "સાડા": 0.5, "સવા": 0.25, "પોણા": -0.25,
+    "সাড়ে": 0.5, "সোয়া": 0.25, "পৌনে": -0.25,
+    "sadhe": 0.5, "saadhe": 0.5, "sava": 0.25, "sawa": 0.25, "paune": -0.25,
+}
+
+# Words that also mean something else ("दो" = give, "एक" = a, "k" = okay); left alone
+# unless part of a larger number
+AMBIGUOUS_WORDS = {"दो", "एक", "दोन", "ஒரு", "ഒരു", "ఒక", "k", "শ", "ek", "do", "char", "tin", "das",
+                   # Telugu plurals alone mean "hundreds" / "thousands", not one of them
+                   "వందలు", "వేలు", "లక్షలు", "కోట్లు", "vandalu", "velu"}
+
+_CONNECTORS = {"and"}
+
+_TOKEN = re.compile(r"\d+(?:,\d{2,3})*(?:\.\d+)?|(?:(?![\d_])[\wऀ-෿])+|\s+|.", re.DOTALL)
+_NUMERIC = re.compile(r"\d+(?:,\d{2,3})*(?:\.\d+)?$")
+
+# Native-script digits (Devanagari, Bengali, Gujarati, Tamil, Telugu, Kannada, Malayalam, ...) -> ASCII
+_DIGITS = {}
+for _start in range(0x0966, 0x0D70, 0x80):
+    for _offset in range(10):
+        _char = chr(_start + _offset)
+        if unicodedata.category(_char) == "Nd":
+            _DIGITS[ord(_char)] = str(unicodedata.digit(_char))
+
+
+def _nfc(text: str) -> str:
+    return unicodedata.normalize("NFC", text)
+
+
+NUMBER_WORDS = {_nfc(word): float(value) for word, value in NUMBER_WORDS.items()}
+MULTIPLIERS = {_nfc(word): float(value) for word, value in MULTIPLIERS.items()}
+FRACTION_WORDS = {_nfc(word): value for word, value in FRACTION_WORDS.items()}
+FRACTION_MODIFIERS = {_nfc(word): value for word, value in FRACTION_MODIFIERS.items()}
+AMBIGUOUS_WORDS = {_nfc(word) for word in AMBIGUOUS_WORDS}
+
+
+def _format(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.4f}".rstrip("0").rstrip(".")
+
+
+def _place(value: float) -> float:
+    """10 ** trailing zeros of a round number: 20 -> 10, 500 -> 100, 2000 -> 1000"""
+    place = 1.0
+    while value and value % (place * 10) == 0:
+        place *= 10
+    return place
+
+
+class _Phrase:
+    """Accumulates one spoken number, e.g. [साढ़े, तीन, हज़ार] -> 3500"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.current = 0.0
+        self.offset = 0.0
+        self.words: List[str] = []
+        self.last_kind: Optional[str] = None
+        self.last_value = 0.0
+
+    def accepts(self, kind: str, word: str, value: float) -> bool:
+        if self.last_kind is None:
+            return kind != "connector"
+        if kind == "connector":
+            return self.last_kind in ("multiplier", "value")
+        if kind == "multiplier":
+            return self.last_kind != "connector" or self.current > 0
+        if kind == "modifier":
+            return self.last_kind in ("multiplier", "connector")
+        if kind in ("value", "numeric", "fraction"):
+            if self.last_kind in ("multiplier", "modifier", "connector"):
+                return True
+            # "twenty five", "ninety nine", "ஐநூற்று ஐம்பது", "രണ്ടായിരത്തി അഞ്ഞൂറ്": a round spoken
+            # number followed by a smaller one that fills its zeros
+            return (kind == "value" and self.last_kind == "value" and self.last_value >= 20
+                    and 0 < value < _place(self.last_value))
+        return False
+
+    def add(self, kind: str, word: str, value: float):
+        self.words.append(word)
+        if kind in ("value", "numeric", "fraction"):
+            self.current += value + self.offset
+            self.offset = 0.0
+        elif kind == "modifier":
+            self.offset = value
+        elif kind == "multiplier":
+            base = self.current if self.current else 1.0 + self.offset
+            self.offset = 0.0
+            if value >= 1000:
+                self.total += base * value
+                self.current = 0.0
+            else:
+                self.current = base * value
+        self.last_kind = kind
+        self.last_value = value
+
+    def value(self) -> Optional[float]:
+        if self.last_kind in ("modifier", "connector"):
+            return None
+        if len(self.words) == 1 and self.words[0] in AMBIGUOUS_WORDS:
+            return None
+        return self.total + self.current
+
+
+def _classify(token: str) -> Tuple[Optional[str], float]:
+    if _NUMERIC.match(token):
+        return "numeric", float(token.replace(",", ""))
+    word = token.lower()
+    if word in NUMBER_WORDS:
+        return "value", NUMBER_WORDS[word]
+    if word in MULTIPLIERS:
+        return "multiplier", MULTIPLIERS[word]
+    if word in FRACTION_WORDS:
+        return "fraction", FRACTION_WORDS[word]
+    if word in FRACTION_MODIFIERS:
+        return "modifier", FRACTION_MODIFIERS[word]
+    if word in _CONNECTORS:
+        return "connector", 0.0
+    return None, 0.0
+
+
+def normalize_numbers(text: str) -> str:
+    """
+    Replace native-script digits, number words (incl. lakh/crore) and spoken
+    fractions with canonical ASCII numbers; everything else is left unchanged.
+    "ढाई हज़ार का खर्चा" -> "2500 का खर्चा", "1.5 लाख" -> "150000".
+    """
+    if not text:
+        return text
+    text = _nfc(text).translate(_DIGITS)
+
+    output: List[str] = []
+    phrase: Optional[_Phrase] = None
+    phrase_tokens: List[str] = []
+    pending_space = ""
+
+    def flush():
+        nonlocal phrase, phrase_tokens
+        if phrase is not None:
+            value = phrase.value()
+            # A trailing "and" is not part of the number
+            if value is None:
+                output.append("".join(phrase_tokens))
+            else:
+                output.append(_format(value))
+        phrase, phrase_tokens = None, []
+
+    for token in _TOKEN.findall(text):
+        if token.isspace():
+            if phrase is not None:
+                pending_space += token
+            else:
+                output.append(token)
+            continue
+
+        kind, value = _classify(token)
+        if kind is not None and phrase is not None and phrase.accepts(kind, token.lower(), value):
+            phrase_tokens.append(pending_space)
+            phrase_tokens.append(token)
+            phrase.add(kind, token.lower(), value)
+            pending_space = ""
+            continue
+
+        flush()
+        output.append(pending_space)
+        pending_space = ""
+        if kind is not None and kind != "connector":
+            phrase = _Phrase()
+            phrase.add(kind, token.lower(), value)
+            phrase_tokens = [token]
+        else:
+            output.append(token)
+
+    flush()
+    output.append(pending_space)
+    return "".join(output)
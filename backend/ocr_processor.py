@@ -7,6 +7,7 @@ import re
 import platform
 import requests
 import base64
+import http_client
 from dotenv import load_dotenv
 
 # Load environment variables from the correct path
@@ -200,7 +201,7 @@ class OCRProcessor:
             }
 
             # Make API request
-            response = requests.post(self.ocr_space_url, data=payload, timeout=30)
+            response = http_client.post(self.ocr_space_url, data=payload, timeout=30)
             response.raise_for_status()
 
             result = response.json()
@@ -379,7 +380,7 @@ class OCRProcessor:
                 'language': 'en'
             }
 
-            response = requests.post(analyze_url, headers=headers, params=params, data=image_data, timeout=30)
+            response = http_client.post(analyze_url, headers=headers, params=params, data=image_data, timeout=30)
 
             if response.status_code == 200:
                 analysis_result = response.json()
@@ -467,7 +468,7 @@ class OCRProcessor:
             }
 
             logging.info("Submitting image to Azure Read API...")
-            response = requests.post(read_url, headers=headers, data=image_data, timeout=30)
+            response = http_client.post(read_url, headers=headers, data=image_data, timeout=30)
 
             if response.status_code != 202:
                 logging.error(f"Read API submit failed: {response.status_code} - {response.text}")
@@ -486,7 +487,7 @@ class OCRProcessor:
             for attempt in range(max_attempts):
                 time.sleep(1)  # Wait 1 second between polls
 
-                result_response = requests.get(operation_location, headers={'Ocp-Apim-Subscription-Key': azure_key}, timeout=10)
+                result_response = http_client.get(operation_location, headers={'Ocp-Apim-Subscription-Key': azure_key}, timeout=10)
 
                 if result_response.status_code != 200:
                     logging.error(f"Read API result failed: {result_response.status_code}")
@@ -542,7 +543,7 @@ class OCRProcessor:
             }
 
             logging.info("Making Azure OCR API request (fallback)...")
-            response = requests.post(ocr_url, headers=headers, params=params, data=image_data, timeout=30)
+            response = http_client.post(ocr_url, headers=headers, params=params, data=image_data, timeout=30)
 
             if response.status_code != 200:
                 logging.error(f"OCR API error: {response.status_code} - {response.text}")
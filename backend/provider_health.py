@@ -0,0 +1,236 @@
+import os
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows: the file-backed store is disabled and health stays per-process
+    FCNTL_AVAILABLE = False
+
+# Circuit breaker settings
+PROVIDER_EWMA_ALPHA = float(os.getenv("PROVIDER_EWMA_ALPHA", "0.3"))
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3"))
+PROVIDER_OPEN_SECONDS = float(os.getenv("PROVIDER_OPEN_SECONDS", "30"))
+# Optional JSON file shared by all uvicorn workers on the box
+PROVIDER_HEALTH_STORE = os.getenv("PROVIDER_HEALTH_STORE", "")
+
+
+class RateLimited(Exception):
+    """Raised by a provider call that got HTTP 429; recorded as throttled, not as a failure"""
+
+
+class CircuitOpen(Exception):
+    """Raised when a provider call is about to launch but its circuit refuses it"""
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {
+        "state": CLOSED,
+        "ewma_latency": None,
+        "ewma_error_rate": 0.0,
+        "consecutive_failures": 0,
+        "opened_at": 0.0,
+        "probe_started_at": 0.0,
+        "successes": 0,
+        "failures": 0,
+        "throttled": 0
+    }
+
+
+class ProviderHealthRegistry:
+    """
+    Latency-aware circuit breaker for LLM providers and individual API keys
+    (names like "groq", "anthropic", "gemini", "gemini:2").
+
+    Keeps an EWMA of latency and error rate per name, opens the circuit after
+    repeated failures, lets a single probe through once the open period has
+    passed (half-open) and orders the fallback chain by health. State is guarded
+    by a lock and can be shared across worker processes through a small JSON
+    file protected by an advisory file lock.
+    """
+
+    def __init__(self, alpha: float = PROVIDER_EWMA_ALPHA, failure_threshold: int = PROVIDER_FAILURE_THRESHOLD,
+                 open_seconds: float = PROVIDER_OPEN_SECONDS, store_path: str = PROVIDER_HEALTH_STORE):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.store_path = store_path if store_path and FCNTL_AVAILABLE else ""
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._store_mtime = 0.0
+
+        if store_path and not FCNTL_AVAILABLE:
+            logging.warning("PROVIDER_HEALTH_STORE needs fcntl; provider health is per-process on this platform")
+
+    # Shared store helpers
+    @contextmanager
+    def _store(self):
+        """Lock the shared store, load it into memory and write it back on exit"""
+        if not self.store_path:
+            yield
+            return
+
+        with open(self.store_path, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                content = handle.read()
+                if content:
+                    try:
+                        self._entries = json.loads(content)
+                    except ValueError:
+                        logging.warning("Provider health store is corrupt, resetting it")
+                yield
+                handle.seek(0)
+                handle.truncate()
+                json.dump(self._entries, handle)
+                handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+        self._store_mtime = os.path.getmtime(self.store_path)
+
+    def _refresh(self):
+        """Pick up changes written by other workers (cheap mtime check)"""
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        mtime = os.path.getmtime(self.store_path)
+        if mtime == self._store_mtime:
+            return
+        try:
+            with open(self.store_path) as handle:
+                fcntl.flock(handle, fcntl.LOCK_SH)
+                try:
+                    content = handle.read()
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+            if content:
+                self._entries = json.loads(content)
+            self._store_mtime = mtime
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read provider health store: {str(e)}")
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        if name not in self._entries:
+            self._entries[name] = _new_entry()
+        return self._entries[name]
+
+    # Circuit breaker
+    def peek(self, name: str) -> bool:
+        """
+        Whether allow() would let a call through now, without changing state:
+        use it to build a candidate list and call allow() only when launching.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(name)
+            if entry is None or entry["state"] == CLOSED:
+                return True
+            now = time.time()
+            if entry["state"] == OPEN:
+                return now - entry["opened_at"] >= self.open_seconds
+            return now - entry["probe_started_at"] >= self.open_seconds
+
+    def allow(self, name: str) -> bool:
+        """Whether a call to this provider/key may be attempted now"""
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(name)
+            if entry is None or entry["state"] == CLOSED:
+                return True
+
+            now = time.time()
+            if entry["state"] == OPEN and now - entry["opened_at"] < self.open_seconds:
+                return False
+
+            # Half-open: allow one probe at a time; a stuck probe expires after open_seconds
+            if entry["state"] == HALF_OPEN and now - entry["probe_started_at"] < self.open_seconds:
+                return False
+
+            with self._store():
+                entry = self._entry(name)
+                entry["state"] = HALF_OPEN
+                entry["probe_started_at"] = now
+            logging.info(f"Circuit for {name} half-open, sending probe")
+            return True
+
+    def record_success(self, name: str, latency: float):
+        with self._lock, self._store():
+            entry = self._entry(name)
+            previous = entry["ewma_latency"]
+            entry["ewma_latency"] = latency if previous is None else self.alpha * latency + (1 - self.alpha) * previous
+            entry["ewma_error_rate"] = (1 - self.alpha) * entry["ewma_error_rate"]
+            entry["consecutive_failures"] = 0
+            entry["successes"] += 1
+            if entry["state"] != CLOSED:
+                logging.info(f"Circuit for {name} closed after successful probe")
+            entry["state"] = CLOSED
+
+    def record_failure(self, name: str, latency: Optional[float] = None):
+        with self._lock, self._store():
+            entry = self._entry(name)
+            if latency is not None:
+                previous = entry["ewma_latency"]
+                entry["ewma_latency"] = latency if previous is None else self.alpha * latency + (1 - self.alpha) * previous
+            entry["ewma_error_rate"] = self.alpha + (1 - self.alpha) * entry["ewma_error_rate"]
+            entry["consecutive_failures"] += 1
+            entry["failures"] += 1
+
+            if entry["state"] == HALF_OPEN or entry["consecutive_failures"] >= self.failure_threshold:
+                if entry["state"] != OPEN:
+                    logging.warning(f"Circuit for {name} opened after {entry['consecutive_failures']} failures")
+                entry["state"] = OPEN
+                entry["opened_at"] = time.time()
+
+    def record_throttled(self, name: str):
+        """
+        The provider answered 429: it is up but rate limiting us, which the quota
+        buckets back off from. No failure is counted; a half-open probe slot is
+        freed so the next call can probe once quota is back.
+        """
+        with self._lock, self._store():
+            entry = self._entry(name)
+            entry["throttled"] = entry.get("throttled", 0) + 1
+            if entry["state"] == HALF_OPEN:
+                entry["probe_started_at"] = 0.0
+
+    def order(self, names: Iterable[str]) -> List[str]:
+        """
+        Order a fallback chain by health: closed circuits first, ranked by EWMA
+        latency inflated by error rate; untried names come first (in their given
+        order) so they get measured; open circuits go last.
+        """
+        names = list(names)
+        with self._lock:
+            self._refresh()
+            snapshot = {name: dict(self._entries[name]) for name in names if name in self._entries}
+
+        def score(item):
+            position, name = item
+            entry = snapshot.get(name)
+            if entry is None:
+                return (0, 0.0, position)
+            if entry["state"] == OPEN:
+                return (2, 0.0, position)
+            latency = entry["ewma_latency"] or 0.0
+            return (1 if entry["state"] == HALF_OPEN else 0, latency * (1 + 4 * entry["ewma_error_rate"]), position)
+
+        return [name for _, name in sorted(enumerate(names), key=score)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return {name: dict(entry) for name, entry in self._entries.items()}
+
+
+provider_health = ProviderHealthRegistry()
@@ -0,0 +1,131 @@
+import os
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from single_flight import normalize_message
+
+# Cache for FAQ-style conversational answers ("what is GST", greetings, how-to
+# questions). Transaction and query intents are never cached: they depend on
+# the user's data or write to it.
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+# Optional JSON file so cached answers survive restarts (empty = memory only)
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "")
+AI_CACHE_SAVE_INTERVAL = float(os.getenv("AI_CACHE_SAVE_INTERVAL", "60"))
+
+# Per-intent time to live in seconds
+CACHEABLE_INTENTS = {
+    "conversational": float(os.getenv("AI_CACHE_TTL_CONVERSATIONAL", "21600")),
+    "off_topic": float(os.getenv("AI_CACHE_TTL_OFF_TOPIC", "86400")),
+}
+
+# Trailing/inline punctuation that does not change what is being asked
+_PUNCTUATION = re.compile(r"[?!.,;:।॥\"'`]+")
+
+
+def cache_key(message: str, language: str, chat_mode: str) -> str:
+    """Normalized message (whitespace, case and punctuation folded) plus language and mode"""
+    text = _PUNCTUATION.sub(" ", message or "")
+    return f"{language}|{chat_mode}|{normalize_message(text, casefold=True, collapse_whitespace=True)}"
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry TTL and optional JSON persistence"""
+
+    def __init__(self, max_entries: int = AI_CACHE_MAX_ENTRIES, path: str = AI_CACHE_PATH,
+                 save_interval: float = AI_CACHE_SAVE_INTERVAL):
+        self.max_entries = max_entries
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        # key -> (expires_at as wall-clock time, response dict)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._dirty = False
+        self._last_save = time.time()
+        if self.path:
+            self._load()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                self._dirty = True
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._dirty = True
+            save_due = self.path and time.time() - self._last_save >= self.save_interval
+        if save_due:
+            self.save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                stored = json.load(handle)
+            now = time.time()
+            for key, (expires_at, value) in stored.items():
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logging.info(f"Loaded {len(self._entries)} cached AI responses from {self.path}")
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Could not load AI response cache: {str(e)}")
+
+    def save(self):
+        """Write live entries to disk (atomic replace); no-op without a path or changes"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            snapshot = {key: list(entry) for key, entry in self._entries.items() if entry[0] > now}
+            self._dirty = False
+            self._last_save = now
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(snapshot, handle, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save AI response cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class LazyService:
+    """
+    Proxy that builds a heavy service (Whisper model, LLM clients, TF-IDF index)
+    on first use instead of at import time. Attribute access is forwarded to the
+    real instance once it is built, so call sites keep using it like the object
+    itself after resolving it with get() (off the event loop in async code).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self._load_seconds: Optional[float] = None
+        self._error: Optional[str] = None
+
+    def get(self) -> Any:
+        """Return the service instance, creating it on first call"""
+        if self._instance is not None:
+            return self._instance
+
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                    logging.error(f"Failed to initialize service '{self._name}': {str(e)}")
+                    raise
+                finally:
+                    self._load_seconds = time.perf_counter() - started
+                logging.info(f"Service '{self._name}' initialized in {self._load_seconds:.2f}s")
+        return self._instance
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def warm(self) -> bool:
+        return self._instance is not None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "warm": self.warm,
+            "load_seconds": round(self._load_seconds, 3) if self._load_seconds is not None else None,
+            "error": self._error
+        }
+
+    def __getattr__(self, item: str) -> Any:
+        if item.startswith("__"):
+            raise AttributeError(item)
+        instance = self._instance
+        if instance is None:
+            # Building here would run a model load on whatever thread touched the attribute,
+            # e.g. the event loop; callers resolve the service with get() off-loop first
+            raise RuntimeError(f"Service '{self._name}' is not initialized yet; call get() first")
+        return getattr(instance, item)
+
+
+class ServiceRegistry:
+    """Registry of lazily-created services with optional parallel background warm-up"""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+        self._warmup_targets: Iterable[str] = []
+        self._loading = set()
+        self._loading_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyService:
+        service = LazyService(name, factory)
+        self._services[name] = service
+        return service
+
+    def warm_up_in_background(self, names: Optional[Iterable[str]] = None):
+        """
+        Start building the given services (all by default) in parallel daemon
+        threads. Returns immediately so the server can accept liveness probes
+        while models load.
+        """
+        targets = [name for name in (names or self._services.keys()) if name in self._services]
+        self._warmup_targets = targets
+
+        def _load(name: str):
+            try:
+                self._services[name].get()
+            except Exception:
+                # Already logged; the service is retried on first real use or the next warm-up
+                pass
+            finally:
+                with self._loading_lock:
+                    self._loading.discard(name)
+
+        started = []
+        with self._loading_lock:
+            for name in targets:
+                if self._services[name].warm or name in self._loading:
+                    continue
+                self._loading.add(name)
+                started.append(name)
+        for name in started:
+            threading.Thread(target=_load, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+        if started:
+            logging.info(f"Warming up services in background: {', '.join(started)}")
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Ready once the given services (default: those scheduled for warm-up, else all) are built"""
+        names = [name for name in (names or self._warmup_targets or self._services.keys()) if name in self._services]
+        return all(self._services[name].warm for name in names)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: service.status() for name, service in self._services.items()}
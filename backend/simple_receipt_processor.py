@@ -1,4 +1,4 @@
-import requests
+import http_client
 import time
 import logging
 from typing import Dict, List, Any
@@ -45,7 +45,7 @@ class SimpleReceiptProcessor:
                 data = f.read()
 
             # Step 1: Send image to the model
-            response = requests.post(url, headers=headers, data=data)
+            response = http_client.post(url, headers=headers, data=data)
             if response.status_code != 202:
                 logging.error(f"Azure Document Intelligence error: {response.status_code} - {response.text}")
                 return {"success": False, "error": f"API error: {response.status_code}"}
@@ -54,7 +54,7 @@ class SimpleReceiptProcessor:
             result_url = response.headers["operation-location"]
             max_attempts = 30
             for attempt in range(max_attempts):
-                result_response = requests.get(result_url, headers={"Ocp-Apim-Subscription-Key": self.api_key})
+                result_response = http_client.get(result_url, headers={"Ocp-Apim-Subscription-Key": self.api_key})
                 result = result_response.json()
                 
                 status = result.get("status")
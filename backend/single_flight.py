@@ -0,0 +1,84 @@
+import os
+import copy
+import logging
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Key normalization for coalescing identical prompts (double taps, client retries)
+AI_COALESCE_ENABLED = os.getenv("AI_COALESCE_ENABLED", "true").lower() == "true"
+AI_COALESCE_CASEFOLD = os.getenv("AI_COALESCE_CASEFOLD", "true").lower() == "true"
+AI_COALESCE_COLLAPSE_WHITESPACE = os.getenv("AI_COALESCE_COLLAPSE_WHITESPACE", "true").lower() == "true"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str, casefold: bool = AI_COALESCE_CASEFOLD,
+                      collapse_whitespace: bool = AI_COALESCE_COLLAPSE_WHITESPACE) -> str:
+    """Normalize a chat message for use in a coalescing/cache key"""
+    text = message or ""
+    if collapse_whitespace:
+        text = _WHITESPACE.sub(" ", text).strip()
+    if casefold:
+        text = text.casefold()
+    return text
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call for
+    the same key is in flight wait for it and get a copy of its result (or its
+    exception) instead of starting their own provider call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Return func() for this key, sharing a concurrent in-flight call if there is one.
+        Followers wait at most `timeout` seconds (concurrent.futures.TimeoutError).
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            logging.info(f"🔗 Coalesced identical {self.name} request with the one in flight")
+            # Each caller gets its own copy; handlers mutate the result dicts
+            return copy.deepcopy(future.result(timeout=timeout))
+
+        try:
+            result = func()
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                **self._stats,
+                "in_flight": len(self._in_flight),
+                "coalescing_rate": round(self._stats["coalesced"] / calls, 4) if calls else 0.0
+            }
+
+
+# Shared by all AIProcessor instances so /api/metrics can report it without loading the AI service
+intent_flight = SingleFlight("intent")
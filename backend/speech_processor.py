@@ -1,22 +1,290 @@
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps, collect_chunks
 import os
+import math
+import bisect
 import tempfile
-from typing import Optional, Tuple
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
 import logging
 
+import numpy as np
+
+from transcript_cache import transcript_cache
+
+SPEECH_MODEL = os.getenv("SPEECH_MODEL", "small")
+SPEECH_COMPUTE_TYPE = os.getenv("SPEECH_COMPUTE_TYPE", "int8")
+# CTranslate2 threads per model replica (0 = library default of 4)
+SPEECH_CPU_THREADS = int(os.getenv("SPEECH_CPU_THREADS", "2"))
+SPEECH_BEAM_SIZE = int(os.getenv("SPEECH_BEAM_SIZE", "5"))
+# Legacy mode: detect the language in one transcribe call, then transcribe again with it
+SPEECH_TWO_PASS_DETECTION = os.getenv("SPEECH_TWO_PASS_DETECTION", "false").lower() == "true"
+
+# Languages the app supports; hints outside this set fall back to auto-detection
+SUPPORTED_SPEECH_LANGUAGES = {"en", "hi", "ta", "ml", "te", "kn", "gu", "bn", "mr"}
+
+# Duration / VAD routing: short, clearly spoken clips (most voice commands) use a
+# smaller model with greedy decoding; long, noisy or low-confidence clips use SPEECH_MODEL.
+# Off by default until benchmarks/bench_speech_routing.py has been run on real
+# recordings and shows the WER cost is acceptable for the latency saved.
+SPEECH_ROUTING_ENABLED = os.getenv("SPEECH_ROUTING_ENABLED", "false").lower() == "true"
+SPEECH_FAST_MODEL = os.getenv("SPEECH_FAST_MODEL", "base")
+# Route to the fast model when VAD finds at most this much speech...
+SPEECH_FAST_MAX_SECONDS = float(os.getenv("SPEECH_FAST_MAX_SECONDS", "6"))
+# ...and speech makes up at least this share of the clip (lower usually means background noise)
+SPEECH_FAST_MIN_SPEECH_RATIO = float(os.getenv("SPEECH_FAST_MIN_SPEECH_RATIO", "0.2"))
+# Re-run with the full model below this average log-probability or language probability
+SPEECH_ESCALATE_LOGPROB = float(os.getenv("SPEECH_ESCALATE_LOGPROB", "-0.7"))
+SPEECH_ESCALATE_LANGUAGE_PROB = float(os.getenv("SPEECH_ESCALATE_LANGUAGE_PROB", "0.5"))
+
+SAMPLE_RATE = 16000
+# Silence inserted between clips packed into one Whisper window
+PACK_GAP_SECONDS = 1.0
+
+
+def normalize_language_hint(language: Optional[str]) -> Optional[str]:
+    """'hi-IN' / 'HI' -> 'hi'; None for missing or unsupported hints"""
+    if not language:
+        return None
+    code = language.strip().lower().replace("_", "-").split("-")[0]
+    return code if code in SUPPORTED_SPEECH_LANGUAGES else None
+
+
+def transcription_settings(model_size: str = SPEECH_MODEL, routing: bool = SPEECH_ROUTING_ENABLED,
+                           compute_type: str = SPEECH_COMPUTE_TYPE, beam_size: int = SPEECH_BEAM_SIZE) -> str:
+    """Everything besides the audio that changes a transcript; part of the transcript cache key"""
+    fast = f"{SPEECH_FAST_MODEL}@{SPEECH_FAST_MAX_SECONDS}/{SPEECH_ESCALATE_LOGPROB}" if routing else "-"
+    return f"{model_size}|{compute_type}|beam{beam_size}|{fast}|{'2pass' if SPEECH_TWO_PASS_DETECTION else '1pass'}"
+
+
 class SpeechProcessor:
-    def __init__(self):
+    def __init__(self, model_size: str = SPEECH_MODEL, cpu_threads: int = SPEECH_CPU_THREADS,
+                 compute_type: str = SPEECH_COMPUTE_TYPE, routing: bool = SPEECH_ROUTING_ENABLED,
+                 beam_size: int = SPEECH_BEAM_SIZE):
         # Initialize Whisper model (small model for faster processing)
-        self.model = WhisperModel("small", device="cpu", compute_type="int8")
-        
+        self.model_size = model_size
+        self.cpu_threads = cpu_threads
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+        # Routing thresholds (instance attributes so benchmarks can sweep them)
+        self.routing = routing and SPEECH_FAST_MODEL != model_size
+        self.fast_max_seconds = SPEECH_FAST_MAX_SECONDS
+        self.fast_min_speech_ratio = SPEECH_FAST_MIN_SPEECH_RATIO
+        self.escalate_logprob = SPEECH_ESCALATE_LOGPROB
+        self.escalate_language_prob = SPEECH_ESCALATE_LANGUAGE_PROB
+        self._fast_model = None
+        self._fast_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._routes = {"fast": 0, "escalated": 0, "full": 0, "silent": 0}
+
+    @property
+    def fast_model(self) -> WhisperModel:
+        """Smaller model for short command clips, loaded on first use"""
+        if self._fast_model is None:
+            with self._fast_lock:
+                if self._fast_model is None:
+                    self._fast_model = WhisperModel(SPEECH_FAST_MODEL, device="cpu", compute_type=self.compute_type,
+                                                    cpu_threads=self.cpu_threads)
+        return self._fast_model
+
+    def _count(self, route: str):
+        with self._lock:
+            self._routes[route] += 1
+
+    def _collect(self, segments: Iterable[Any]) -> Tuple[str, float]:
+        """Join segment texts and average their log-probabilities"""
+        transcribed_text = ""
+        total_confidence = 0.0
+        segment_count = 0
+
+        for segment in segments:
+            transcribed_text += segment.text + " "
+            total_confidence += segment.avg_logprob
+            segment_count += 1
+
+        avg_confidence = total_confidence / segment_count if segment_count > 0 else 0.0
+        return transcribed_text.strip(), avg_confidence
+
+    def transcribe(self, audio: Any, language: Optional[str] = None) -> Tuple[str, float, str]:
+        """
+        Single-pass transcription. With a language hint detection is skipped;
+        without one Whisper detects the language from the first 30 seconds and
+        decodes the segments with it in the same call. With routing enabled the
+        model is chosen per clip (see _transcribe_routed).
+
+        Args:
+            audio: Path to an audio file or a 16 kHz mono float32 array
+            language: Optional language hint (hi, en, ...)
+
+        Returns:
+            Tuple of (transcribed_text, confidence_score, language)
+        """
+        hint = normalize_language_hint(language)
+        try:
+            if not self.routing:
+                transcribed_text, confidence, detected_language, _ = self._run(
+                    self.model, audio, hint, self.beam_size, vad_filter=True
+                )
+            else:
+                transcribed_text, confidence, detected_language = self._transcribe_routed(audio, hint)
+
+            logging.info(f"Transcription completed ({detected_language}{', hinted' if hint else ''}): {transcribed_text[:50]}...")
+            return transcribed_text, confidence, detected_language
+
+        except Exception as e:
+            logging.error(f"Error in transcription: {str(e)}")
+            return "", 0.0, hint or "hi"
+
+    def _run(self, model: WhisperModel, audio: Any, hint: Optional[str], beam_size: int,
+             vad_filter: bool = False) -> Tuple[str, float, str, float]:
+        """One transcribe call: (text, avg_logprob, language, language probability)"""
+        segments, info = model.transcribe(audio, language=hint, beam_size=beam_size, vad_filter=vad_filter)
+        transcribed_text, confidence = self._collect(segments)
+        return transcribed_text, confidence, hint or info.language, 1.0 if hint else info.language_probability
+
+    def _transcribe_routed(self, audio: Any, hint: Optional[str]) -> Tuple[str, float, str]:
+        """
+        Run VAD once, then pick the model: silent clips skip Whisper, short
+        clips with enough speech go to the fast model with greedy decoding and
+        are re-run on the full model when its confidence is low, everything
+        else goes straight to the full model.
+        """
+        if isinstance(audio, str):
+            audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        chunks = get_speech_timestamps(audio, VadOptions())
+        if not chunks:
+            self._count("silent")
+            return "", 0.0, hint or "hi"
+
+        speech = collect_chunks(audio, chunks)
+        speech_seconds = len(speech) / SAMPLE_RATE
+        speech_ratio = len(speech) / max(1, len(audio))
+
+        if speech_seconds <= self.fast_max_seconds and speech_ratio >= self.fast_min_speech_ratio:
+            text, confidence, detected_language, language_probability = self._run(self.fast_model, speech, hint, 1)
+            if (text and confidence >= self.escalate_logprob
+                    and language_probability >= self.escalate_language_prob):
+                self._count("fast")
+                return text, confidence, detected_language
+            self._count("escalated")
+            logging.info(f"Escalating {speech_seconds:.1f}s clip to {self.model_size} "
+                         f"(logprob {confidence:.2f}, language {detected_language} p={language_probability:.2f})")
+        else:
+            self._count("full")
+
+        text, confidence, detected_language, _ = self._run(self.model, speech, hint, self.beam_size)
+        return text, confidence, detected_language
+
+    def transcribe_batch(self, clips: List[np.ndarray], language: Optional[str]) -> List[Tuple[str, float, str]]:
+        """
+        Transcribe several short clips that share a language hint, packing them
+        into one Whisper window (it always encodes a padded 30 seconds). With
+        routing, silent clips are skipped, short clean ones are packed for the
+        fast model, and the rest plus low-confidence fast results are packed for
+        the full model, as _transcribe_routed does per clip. Confidence is on
+        the avg_logprob scale of transcribe(). Without a hint each clip is
+        transcribed on its own.
+        """
+        hint = normalize_language_hint(language)
+        if hint is None or len(clips) == 1:
+            return [self.transcribe(clip, language) for clip in clips]
+
+        try:
+            results: List[Optional[Tuple[str, float, str]]] = [None] * len(clips)
+            if not self.routing:
+                for index, (text, confidence) in enumerate(self._run_packed(self.model, clips, hint, self.beam_size)):
+                    results[index] = (text, confidence, hint)
+                logging.info(f"Packed transcription of {len(clips)} clips completed ({hint})")
+                return results
+
+            speech, fast, full = [None] * len(clips), [], []
+            for index, clip in enumerate(clips):
+                chunks = get_speech_timestamps(clip, VadOptions())
+                if not chunks:
+                    self._count("silent")
+                    results[index] = ("", 0.0, hint)
+                    continue
+                speech[index] = collect_chunks(clip, chunks)
+                short = len(speech[index]) / SAMPLE_RATE <= self.fast_max_seconds
+                clean = len(speech[index]) / max(1, len(clip)) >= self.fast_min_speech_ratio
+                if short and clean:
+                    fast.append(index)
+                else:
+                    self._count("full")
+                    full.append(index)
+
+            if fast:
+                packed = self._run_packed(self.fast_model, [speech[index] for index in fast], hint, 1)
+                for index, (text, confidence) in zip(fast, packed):
+                    if text and confidence >= self.escalate_logprob:
+                        self._count("fast")
+                        results[index] = (text, confidence, hint)
+                    else:
+                        self._count("escalated")
+                        full.append(index)
+            if full:
+                packed = self._run_packed(self.model, [speech[index] for index in full], hint, self.beam_size)
+                for index, (text, confidence) in zip(full, packed):
+                    results[index] = (text, confidence, hint)
+            logging.info(f"Packed transcription of {len(clips)} clips completed ({hint}, {len(full)} on {self.model_size})")
+            return results
+
+        except Exception as e:
+            logging.error(f"Error in packed transcription, transcribing clips one by one: {str(e)}")
+            return [self.transcribe(clip, hint) for clip in clips]
+
+    def _run_packed(self, model: WhisperModel, clips: List[np.ndarray], hint: str,
+                    beam_size: int) -> List[Tuple[str, float]]:
+        """
+        One transcribe call over the clips separated by silence; words go back
+        to their clip by timestamp. A clip's confidence is the mean avg_logprob
+        of the segments its words came from, so it compares with the
+        escalation threshold like a single-clip result does.
+        """
+        if len(clips) == 1:
+            text, confidence, _, _ = self._run(model, clips[0], hint, beam_size)
+            return [(text, confidence)]
+
+        gap = np.zeros(int(PACK_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        parts, offsets, position = [], [], 0
+        for clip in clips:
+            offsets.append(position / SAMPLE_RATE)
+            parts.extend([clip, gap])
+            position += len(clip) + len(gap)
+
+        segments, _ = model.transcribe(
+            np.concatenate(parts),
+            language=hint,
+            beam_size=beam_size,
+            vad_filter=True,
+            word_timestamps=True,
+            condition_on_previous_text=False
+        )
+        words: List[List[Any]] = [[] for _ in clips]
+        for segment in segments:
+            for word in segment.words or []:
+                index = bisect.bisect_right(offsets, (word.start + word.end) / 2) - 1
+                words[max(0, index)].append((word.word, segment.avg_logprob))
+
+        return [("".join(word for word, _ in clip_words).strip(),
+                 sum(logprob for _, logprob in clip_words) / len(clip_words) if clip_words else 0.0)
+                for clip_words in words]
+
+    def stats(self):
+        with self._lock:
+            return {"mode": "in_process", "model": self.model_size, "cpu_threads": self.cpu_threads,
+                    "fast_model": SPEECH_FAST_MODEL if self.routing else None, "routes": dict(self._routes)}
+
     def transcribe_audio(self, audio_file_path: str, language: str = "hi") -> Tuple[str, float]:
         """
         Transcribe audio file to text using Faster-Whisper
-        
+
         Args:
             audio_file_path: Path to the audio file
             language: Language code (hi, en, etc.)
-            
+
         Returns:
             Tuple of (transcribed_text, confidence_score)
         """
@@ -25,41 +293,27 @@ class SpeechProcessor:
             segments, info = self.model.transcribe(
                 audio_file_path,
                 language=language,
-                beam_size=5,
+                beam_size=self.beam_size,
                 vad_filter=True
             )
-            
-            # Combine all segments
-            transcribed_text = ""
-            total_confidence = 0.0
-            segment_count = 0
-            
-            for segment in segments:
-                transcribed_text += segment.text + " "
-                total_confidence += segment.avg_logprob
-                segment_count += 1
-            
-            # Calculate average confidence
-            avg_confidence = total_confidence / segment_count if segment_count > 0 else 0.0
-            
-            # Clean up text
-            transcribed_text = transcribed_text.strip()
-            
+
+            transcribed_text, avg_confidence = self._collect(segments)
+
             logging.info(f"Transcription completed: {transcribed_text[:50]}...")
-            
+
             return transcribed_text, avg_confidence
-            
+
         except Exception as e:
             logging.error(f"Error in transcription: {str(e)}")
             return "", 0.0
-    
+
     def detect_language(self, audio_file_path: str) -> str:
         """
         Detect the language of the audio file
-        
+
         Args:
             audio_file_path: Path to the audio file
-            
+
         Returns:
             Language code (hi, en, etc.)
         """
@@ -68,37 +322,49 @@ class SpeechProcessor:
             segments, info = self.model.transcribe(
                 audio_file_path,
                 language=None,  # Auto-detect
-                beam_size=5
+                beam_size=self.beam_size
             )
-            
+
             detected_language = info.language
             logging.info(f"Detected language: {detected_language}")
-            
+
             return detected_language
-            
+
         except Exception as e:
             logging.error(f"Error in language detection: {str(e)}")
             return "hi"  # Default to Hindi
-    
-    def transcribe_with_language_detection(self, audio_file_path: str) -> Tuple[str, float, str]:
+
+    def transcribe_with_language_detection(self, audio_file_path: str, language_hint: Optional[str] = None,
+                                           owner: Optional[str] = None) -> Tuple[str, float, str]:
         """
         Transcribe audio with automatic language detection
-        
+
         Args:
-            audio_file_path: Path to the audio file
-            
+            audio_file_path: Path to the audio file or a decoded 16 kHz mono float32 array
+            language_hint: Optional spoken language from the request; skips detection
+            owner: User the clip belongs to; unused in-process (SpeechService batches by it)
+
         Returns:
             Tuple of (transcribed_text, confidence_score, detected_language)
         """
+        hint = normalize_language_hint(language_hint)
+        settings = transcription_settings(self.model_size, self.routing, self.compute_type, self.beam_size)
+        key = transcript_cache.key(audio_file_path, settings, hint)
+        return transcript_cache.transcribe(key, lambda: self._transcribe_with_language_detection(audio_file_path, hint))
+
+    def _transcribe_with_language_detection(self, audio_file_path: Any, language_hint: Optional[str]) -> Tuple[str, float, str]:
+        if not SPEECH_TWO_PASS_DETECTION or language_hint:
+            return self.transcribe(audio_file_path, language_hint)
+
         try:
             # First detect language
             detected_language = self.detect_language(audio_file_path)
-            
+
             # Then transcribe with detected language
             transcribed_text, confidence = self.transcribe_audio(audio_file_path, detected_language)
-            
+
             return transcribed_text, confidence, detected_language
-            
+
         except Exception as e:
             logging.error(f"Error in transcription with language detection: {str(e)}")
-            return "", 0.0, "hi" 
\ No newline at end of file
+            return "", 0.0, "hi"
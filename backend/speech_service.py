@@ -0,0 +1,249 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from executors import Overloaded
+from speech_processor import (SpeechProcessor, normalize_language_hint, transcription_settings, SPEECH_CPU_THREADS,
+                              SAMPLE_RATE, PACK_GAP_SECONDS)
+from transcript_cache import transcript_cache
+
+# Whisper inference in worker processes: each process holds its own model
+# replica with SPEECH_CPU_THREADS CTranslate2 threads, so voice capacity grows
+# with cores instead of being serialized on one model. Every replica costs
+# about 500 MB per uvicorn worker, so the default is one; "auto" uses
+# cores // SPEECH_CPU_THREADS processes; 0 keeps the model in the API process.
+_processes = os.getenv("SPEECH_PROCESSES", "1").strip().lower()
+SPEECH_PROCESSES = (max(1, (os.cpu_count() or 1) // max(1, SPEECH_CPU_THREADS)) if _processes == "auto"
+                    else int(_processes))
+# Clips waiting for a free replica; beyond this new requests are shed with Overloaded
+SPEECH_QUEUE_DEPTH = int(os.getenv("SPEECH_QUEUE_DEPTH", str(4 * max(1, SPEECH_PROCESSES))))
+# Micro-batching: short clips of one user with the same speech_language hint are packed
+# into one Whisper window. Clips without a hint are never packed, so without hints
+# (or with one voice message per user at a time) every clip runs on its own.
+SPEECH_BATCH_MAX_CLIPS = int(os.getenv("SPEECH_BATCH_MAX_CLIPS", "4"))
+SPEECH_BATCH_MAX_SECONDS = float(os.getenv("SPEECH_BATCH_MAX_SECONDS", "8"))
+SPEECH_BATCH_WAIT_MS = float(os.getenv("SPEECH_BATCH_WAIT_MS", "10"))
+# Clips are packed only with clips of the same user unless this is enabled
+SPEECH_BATCH_CROSS_USER = os.getenv("SPEECH_BATCH_CROSS_USER", "false").lower() == "true"
+
+# One encoder window; a packed batch never exceeds it
+_WINDOW_SECONDS = 30.0
+
+_worker_processor: Optional[SpeechProcessor] = None
+
+
+def _init_worker(cpu_threads: int):
+    global _worker_processor
+    _worker_processor = SpeechProcessor(cpu_threads=cpu_threads)
+    if _worker_processor.routing:
+        _worker_processor.fast_model  # load now so the first short clip does not pay for it
+    logging.info(f"🎙️ Speech worker {os.getpid()} loaded Whisper ({cpu_threads} threads)")
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _worker_transcribe(audio: Any, language: Optional[str]) -> Tuple[str, float, str]:
+    return _worker_processor.transcribe(audio, language)
+
+
+def _worker_transcribe_batch(clips: List[Any], language: Optional[str]) -> List[Tuple[str, float, str]]:
+    return _worker_processor.transcribe_batch(clips, language)
+
+
+class _Request:
+    __slots__ = ("audio", "language", "owner", "seconds", "future", "enqueued")
+
+    def __init__(self, audio: Any, language: Optional[str], owner: Optional[str] = None):
+        self.audio = audio
+        self.language = language
+        self.owner = owner
+        # File paths have unknown length and are never batched
+        self.seconds = len(audio) / SAMPLE_RATE if hasattr(audio, "__len__") and not isinstance(audio, str) else None
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class SpeechService:
+    """
+    Pool of Whisper worker processes behind a bounded queue. A dispatcher
+    thread hands each free replica the oldest clip, together with other short
+    queued clips of the same user in the same language when they fit in one
+    Whisper window (clips of different users only with SPEECH_BATCH_CROSS_USER).
+    Drop-in for SpeechProcessor.transcribe_with_language_detection.
+    """
+
+    def __init__(self, processes: int = SPEECH_PROCESSES, cpu_threads: int = SPEECH_CPU_THREADS,
+                 max_queue: int = SPEECH_QUEUE_DEPTH, batch_clips: int = SPEECH_BATCH_MAX_CLIPS,
+                 batch_seconds: float = SPEECH_BATCH_MAX_SECONDS, batch_wait_ms: float = SPEECH_BATCH_WAIT_MS,
+                 cross_user: bool = SPEECH_BATCH_CROSS_USER):
+        self.processes = processes
+        self.cpu_threads = cpu_threads
+        self.max_queue = max_queue
+        self.batch_clips = batch_clips
+        self.batch_seconds = batch_seconds
+        self.batch_wait = batch_wait_ms / 1000
+        self.cross_user = cross_user
+        self._pending: Deque[_Request] = deque()
+        self._condition = threading.Condition()
+        self._slots = threading.Semaphore(processes)
+        self._closed = False
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "batches": 0,
+                       "batched_clips": 0, "restarts": 0, "queue_ms_total": 0.0}
+
+        self._pool = self._start_pool()
+        # Load a model in every replica before taking traffic
+        for future in [self._pool.submit(_worker_ready) for _ in range(processes)]:
+            future.result()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="bizsakhi-speech-dispatch", daemon=True)
+        self._dispatcher.start()
+        logging.info(f"🎙️ Speech service ready: {processes} processes x {cpu_threads} threads, queue {max_queue}")
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        # spawn: CTranslate2 / OpenMP state must not be inherited through fork
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.cpu_threads,))
+
+    def submit(self, audio: Any, language_hint: Optional[str] = None, owner: Optional[str] = None) -> Future:
+        """Queue a user's clip (path or 16 kHz float32 array); raises Overloaded when the queue is full"""
+        request = _Request(audio, normalize_language_hint(language_hint), owner)
+        with self._condition:
+            if self._closed:
+                raise Overloaded("speech service is shut down")
+            if len(self._pending) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise Overloaded(f"speech queue is full ({len(self._pending)} clips waiting)")
+            self._pending.append(request)
+            self._stats["submitted"] += 1
+            self._condition.notify()
+        return request.future
+
+    def transcribe_with_language_detection(self, audio: Any, language_hint: Optional[str] = None,
+                                           owner: Optional[str] = None) -> Tuple[str, float, str]:
+        """Blocking call with the SpeechProcessor signature; repeated recordings are served from the transcript cache"""
+        hint = normalize_language_hint(language_hint)
+        key = transcript_cache.key(audio, transcription_settings(), hint)
+        return transcript_cache.transcribe(key, lambda: self.submit(audio, hint, owner).result())
+
+    def _batchable(self, request: _Request) -> bool:
+        return (self.batch_clips > 1 and request.language is not None and request.seconds is not None
+                and request.seconds <= self.batch_seconds)
+
+    def _same_owner(self, request: _Request, first: _Request) -> bool:
+        return self.cross_user or (request.owner is not None and request.owner == first.owner)
+
+    def _take_compatible(self, batch: List[_Request]):
+        """Move queued clips that can share the batch's window into it; caller holds the condition"""
+        window = sum(request.seconds + PACK_GAP_SECONDS for request in batch)
+        for request in list(self._pending):
+            if len(batch) >= self.batch_clips:
+                return
+            if (self._batchable(request) and request.language == batch[0].language
+                    and self._same_owner(request, batch[0])
+                    and window + request.seconds + PACK_GAP_SECONDS <= _WINDOW_SECONDS):
+                self._pending.remove(request)
+                if request.future.set_running_or_notify_cancel():
+                    batch.append(request)
+                    window += request.seconds + PACK_GAP_SECONDS
+
+    def _next_batch(self) -> Optional[List[_Request]]:
+        with self._condition:
+            while True:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return None
+                first = self._pending.popleft()
+                # Skip requests whose caller already gave up
+                if first.future.set_running_or_notify_cancel():
+                    break
+
+            batch = [first]
+            if self._batchable(first):
+                deadline = time.monotonic() + self.batch_wait
+                while True:
+                    self._take_compatible(batch)
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= self.batch_clips or remaining <= 0 or self._closed:
+                        break
+                    self._condition.wait(remaining)
+            now = time.monotonic()
+            self._stats["queue_ms_total"] += sum((now - request.enqueued) * 1000 for request in batch)
+            return batch
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                return
+            pool = self._pool
+            try:
+                if len(batch) == 1:
+                    future = pool.submit(_worker_transcribe, batch[0].audio, batch[0].language)
+                else:
+                    future = pool.submit(_worker_transcribe_batch, [request.audio for request in batch],
+                                         batch[0].language)
+            except Exception as e:
+                self._slots.release()
+                self._fail(batch, e, pool)
+                continue
+            future.add_done_callback(lambda done, batch=batch, pool=pool: self._complete(batch, done, pool))
+
+    def _complete(self, batch: List[_Request], done: Future, pool: ProcessPoolExecutor):
+        self._slots.release()
+        error = done.exception()
+        if error is not None:
+            self._fail(batch, error, pool)
+            return
+        results = done.result() if len(batch) > 1 else [done.result()]
+        with self._condition:
+            self._stats["completed"] += len(batch)
+            if len(batch) > 1:
+                self._stats["batches"] += 1
+                self._stats["batched_clips"] += len(batch)
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def _fail(self, batch: List[_Request], error: BaseException, pool: ProcessPoolExecutor):
+        logging.error(f"Speech worker failed on {len(batch)} clip(s): {str(error)}")
+        with self._condition:
+            self._stats["failed"] += len(batch)
+            # A crashed replica (e.g. out of memory) breaks the whole pool; replace it once
+            if isinstance(error, BrokenProcessPool) and pool is self._pool and not self._closed:
+                self._stats["restarts"] += 1
+                self._pool = self._start_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+        for request in batch:
+            request.future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            completed = self._stats["completed"]
+            return {
+                "mode": "process_pool",
+                "processes": self.processes,
+                "cpu_threads": self.cpu_threads,
+                "queued": len(self._pending),
+                "max_queue": self.max_queue,
+                **{key: value for key, value in self._stats.items() if key != "queue_ms_total"},
+                "avg_queue_ms": round(self._stats["queue_ms_total"] / completed, 1) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._condition:
+            self._closed = True
+            pending, self._pending = list(self._pending), deque()
+            self._condition.notify_all()
+        for request in pending:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(Overloaded("speech service is shut down"))
+        self._slots.release()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,5 @@
 from supabase_service import SupabaseService
+from category_learner import category_learner, CORRECTION_WEIGHT, GENERIC_CATEGORIES
 from typing import Dict, Any, Optional
 import logging
 from datetime import datetime, date
@@ -14,15 +15,28 @@ class SupabaseBusinessLogic:
     def get_user_id_from_token(self, auth_token: str) -> Optional[str]:
         """Extract user ID from JWT token"""
         return self.supabase.get_user_id_from_token(auth_token)
+
+    def suggest_category(self, user_id: str, kind: str, text: str) -> Optional[str]:
+        """User's own likely category for an income/expense description (trained from their history)"""
+        category_learner.ensure_history(user_id, lambda: self.supabase.get_categorized_entries(user_id))
+        return category_learner.suggest(user_id, kind, text)
+
+    def _resolve_category(self, user_id: str, kind: str, description: str, category: str) -> str:
+        """Learn from explicit categories; replace generic ones with the learned suggestion"""
+        if (category or "").strip().lower() not in GENERIC_CATEGORIES:
+            category_learner.learn(user_id, kind, description, category)
+            return category
+        return self.suggest_category(user_id, kind, description or "") or category
     
     def add_income(self, user_id: str, amount: float, description: str, category: str, 
-                   source: str = "text", language: str = "hi") -> Dict[str, Any]:
-        """Add income entry"""
+                   source: str = "text", language: str = "hi", category_text: Optional[str] = None) -> Dict[str, Any]:
+        """Add income entry; category_text (default: description) is used to pick a category for "General" entries"""
         try:
             # Provide default description if None
             if description is None:
                 description = f"{category} - ₹{amount}"
 
+            category = self._resolve_category(user_id, "income", category_text or description, category)
             result = self.supabase.add_income(user_id, amount, description, category)
             
             if result["success"]:
@@ -56,13 +70,14 @@ class SupabaseBusinessLogic:
             }
     
     def add_expense(self, user_id: str, amount: float, description: str, category: str, 
-                    source: str = "text") -> Dict[str, Any]:
-        """Add expense entry"""
+                    source: str = "text", category_text: Optional[str] = None) -> Dict[str, Any]:
+        """Add expense entry; category_text (default: description) is used to pick a category for "General" entries"""
         try:
             # Provide default description if None
             if description is None:
                 description = f"{category} - ₹{amount}"
 
+            category = self._resolve_category(user_id, "expense", category_text or description, category)
             result = self.supabase.add_expense(user_id, amount, description, category)
             return result
             
@@ -123,6 +138,9 @@ class SupabaseBusinessLogic:
         """Update income item"""
         try:
             result = self.supabase.update_income_item(income_id, user_id, amount, description, category)
+            if result.get("success"):
+                # An edited category is a correction of what was stored
+                category_learner.learn(user_id, "income", description, category, CORRECTION_WEIGHT)
             return result
             
         except Exception as e:
@@ -152,6 +170,9 @@ class SupabaseBusinessLogic:
         """Update expense item"""
         try:
             result = self.supabase.update_expense_item(expense_id, user_id, amount, description, category)
+            if result.get("success"):
+                # An edited category is a correction of what was stored
+                category_learner.learn(user_id, "expense", description, category, CORRECTION_WEIGHT)
             return result
             
         except Exception as e:
@@ -197,7 +218,7 @@ class SupabaseBusinessLogic:
         return self.supabase.get_today_expenses(user_id)
     
     def save_chat_history(self, user_id: str, message: str, response: str, 
-                         message_type: str = "text", intent: str = "general") -> Dict[str, Any]:
+                         message_type: str = "text", intent: Optional[str] = "general") -> Dict[str, Any]:
         """Save chat history"""
         return self.supabase.save_chat_history(user_id, message, response, message_type, intent)
     
@@ -16,6 +16,7 @@ class SupabaseService:
         self.url = os.getenv("SUPABASE_URL")
         self.service_key = os.getenv("SUPABASE_SERVICE_KEY")
         self.anon_key = os.getenv("SUPABASE_ANON_KEY")
+        self._chat_intent_column = True
 
         if not self.url:
             raise ValueError("Supabase URL must be provided")
@@ -226,6 +227,21 @@ class SupabaseService:
             logging.error(f"Error getting today's expenses: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def get_categorized_entries(self, user_id: str, limit: int = 500) -> Optional[Dict[str, Any]]:
+        """
+        Recent (description, category) pairs per table, used to train the category learner.
+        None if a table could not be read, so the learner does not mistake an error for no history.
+        """
+        entries = {}
+        for kind, table in (("expense", "expenses"), ("income", "income")):
+            try:
+                result = self.client.table(table).select("description,category").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+                entries[kind] = [(row.get("description") or "", row.get("category") or "") for row in result.data or []]
+            except Exception as e:
+                logging.error(f"Error getting categorized {table}: {str(e)}")
+                return None
+        return entries
+
     # INVENTORY OPERATIONS
     def add_inventory_item(self, user_id: str, product_name: str, quantity: float,
                           unit: str = "pieces", cost_per_unit: float = 0.0) -> Dict[str, Any]:
@@ -414,7 +430,7 @@ class SupabaseService:
 
     # CHAT HISTORY OPERATIONS
     def save_chat_history(self, user_id: str, message: str, response: str,
-                         message_type: str = "text", intent: str = "general",
+                         message_type: str = "text", intent: Optional[str] = "general",
                          language: str = "hi") -> Dict[str, Any]:
         """Save chat history to Supabase"""
         try:
@@ -425,8 +441,19 @@ class SupabaseService:
                 "language": language,
                 "created_at": datetime.now().isoformat()
             }
-
-            result = self.client.table("chat_history").insert(data).execute()
+            # Intent labels train the local intent classifier; older tables lack the column
+            if self._chat_intent_column:
+                data["intent"] = intent
+
+            try:
+                result = self.client.table("chat_history").insert(data).execute()
+            except Exception as e:
+                if "intent" not in data or "intent" not in str(e):
+                    raise
+                logging.warning("chat_history has no intent column; run the supabase-setup.sql migration")
+                self._chat_intent_column = False
+                data.pop("intent")
+                result = self.client.table("chat_history").insert(data).execute()
 
             if result.data:
                 logging.info(f"Chat history saved for user: {user_id}")
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module-level caches create their directories on import; keep them out of the source tree
+os.environ.setdefault("TTS_CACHE_DIR", tempfile.mkdtemp(prefix="bizsakhi-test-tts-"))
+os.environ.setdefault("CATEGORY_MODEL_DIR", tempfile.mkdtemp(prefix="bizsakhi-test-categories-"))
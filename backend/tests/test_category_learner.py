@@ -0,0 +1,45 @@
+import os
+import time
+
+import pytest
+
+from category_learner import CategoryLearner, features
+
+
+@pytest.mark.parametrize("text", ["किराया", "बिजली", "दूध", "चाय", "சாப்பாடு", "பால்", "tea"])
+def test_native_script_words_have_features(text):
+    assert features(text)
+
+
+def test_native_script_history_is_learned(tmp_path):
+    learner = CategoryLearner(model_dir=str(tmp_path))
+    for _ in range(3):
+        learner.learn("u1", "expense", "दूध", "Dairy")
+        learner.learn("u1", "expense", "चाय", "Tea stall")
+    assert learner.suggest("u1", "expense", "दूध") == "Dairy"
+
+
+def test_idle_users_are_saved_and_reloaded(tmp_path):
+    learner = CategoryLearner(model_dir=str(tmp_path), idle_seconds=0, save_seconds=0)
+    for _ in range(3):
+        learner.learn("u1", "expense", "பால்", "Milk")
+    # Any later operation sweeps the idle user out and writes it without the learner lock
+    learner.predict("u2", "expense", "tea")
+    assert "u1" not in learner._users
+    assert not learner._pending
+    assert os.listdir(tmp_path)
+
+    reloaded = CategoryLearner(model_dir=str(tmp_path))
+    assert reloaded.suggest("u1", "expense", "பால்") == "Milk"
+
+
+def test_expired_model_files_are_pruned_during_the_sweep(tmp_path):
+    learner = CategoryLearner(model_dir=str(tmp_path), ttl_days=1, save_seconds=0)
+    stale = tmp_path / "stale.json"
+    stale.write_text("{}")
+    old = time.time() - 2 * 86400
+    os.utime(stale, (old, old))
+
+    learner.predict("u1", "expense", "tea")
+    assert not stale.exists()
+    assert learner.stats()["expired"] == 1
@@ -0,0 +1,73 @@
+"""Blocking stages run on the executors, so one slow request does not hold up the others"""
+import asyncio
+import time
+
+import httpx
+
+import main
+import simple_receipt_processor
+
+MESSAGES = 6
+PARSE_SECONDS = 0.5
+POLL_SECONDS = 0.1
+POLLS = 15
+
+
+class FakeBusiness:
+    """Supabase stand-in: every method blocks briefly and succeeds"""
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            time.sleep(0.02)
+            return {"success": True}
+        return call
+
+
+class FakeAI:
+    """LLM stand-in whose intent parse blocks like a provider call"""
+
+    def parse_intent(self, message, language="en", chat_mode="general", deadline=None):
+        time.sleep(PARSE_SECONDS)
+        return {"intent": "conversational", "action": "respond", "confidence": 0.9,
+                "response_message": f"reply to {message}"}
+
+
+def fake_process_receipt(self, image_path):
+    # Azure Document Intelligence status polling
+    for _ in range(POLLS):
+        time.sleep(POLL_SECONDS)
+    return {"success": False, "error": "analysis still running"}
+
+
+async def _run():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        image = asyncio.create_task(client.post(
+            "/api/chat/image", data={"language": "en"},
+            files={"image_file": ("bill.jpg", b"\xff\xd8\xff", "image/jpeg")}
+        ))
+        await asyncio.sleep(POLL_SECONDS)
+
+        started = time.perf_counter()
+        replies = await asyncio.gather(*(
+            client.post("/api/chat/text", data={"message": f"tell me about GST rule {i}", "chat_mode": "general"})
+            for i in range(MESSAGES)
+        ))
+        elapsed = time.perf_counter() - started
+        image_still_polling = not image.done()
+        return replies, elapsed, image_still_polling, await image
+
+
+def test_text_messages_run_concurrently_while_an_image_polls(monkeypatch):
+    monkeypatch.setattr(main.supabase_business, "_instance", FakeBusiness())
+    monkeypatch.setattr(main.ai_processor, "_instance", FakeAI())
+    monkeypatch.setattr(simple_receipt_processor.SimpleReceiptProcessor, "process_receipt", fake_process_receipt)
+
+    replies, elapsed, image_still_polling, image_reply = asyncio.run(_run())
+
+    assert [reply.status_code for reply in replies] == [200] * MESSAGES
+    assert all(reply.json()["message"].startswith("reply to") for reply in replies)
+    # Serialized on the event loop this would take MESSAGES * PARSE_SECONDS
+    assert elapsed < 2 * PARSE_SECONDS
+    assert image_still_polling
+    assert image_reply.status_code == 200
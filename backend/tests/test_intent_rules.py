@@ -0,0 +1,56 @@
+import pytest
+
+from intent_rules import intent_rules, CLEAR_EXPENSES
+
+
+@pytest.mark.parametrize("message, transaction_type, amount", [
+    ("आज 500 रुपये खर्च किए", "expense", 500),
+    ("sale 1200", "income", 1200),
+    ("maine 500 diya", "expense", 500),
+    ("payment 500 aaya", "income", 500),
+    ("customer se 800 aaye", "income", 800),
+    ("ग्राहक से 600 आए", "income", 600),
+    ("पांच सौ का खर्चा", "expense", 500),
+    ("got 500 from customer", "income", 500),
+])
+def test_transactions(message, transaction_type, amount):
+    result = intent_rules.analyze(message)
+    assert (result.transaction_type, result.amount) == (transaction_type, amount)
+
+
+@pytest.mark.parametrize("message", [
+    # A bill arriving is money going out, not income
+    "500 ka bill aaya",
+    "bijli ka bill 500 aaya",
+    "बिजली का बिल 500 आया",
+    "kiraya 3000 aaya",
+    # "aaya" alone does not say which way the money went
+    "aaj 500 aaye",
+    # The customer is the one who gave: income, left to the LLM
+    "customer ne 500 diya",
+    "ग्राहक ने 500 दिया",
+    "customer paid 500",
+    "kitna kharcha hua 500 ka?",
+    # A bill, rent or fine that was "received" is still money going out
+    "received electricity bill of 2000",
+    "bijli ka bill 500 mila",
+    "बिजली का बिल 500 मिला",
+    "received rent bill 1200",
+    "got bill of 500",
+    "got 500 fine",
+    # "got" / "made" alone do not say the money was earned
+    "got 500",
+    "made 200 loss",
+])
+def test_ambiguous_messages_are_left_to_the_llm(message):
+    assert intent_rules.analyze(message).transaction_type is None
+
+
+def test_question_is_not_a_transaction():
+    result = intent_rules.analyze("kitna kharcha hua 500 ka?")
+    assert result.is_question
+    assert result.amounts == [500]
+
+
+def test_clear_command():
+    assert intent_rules.analyze("clear expenses").clear_command == CLEAR_EXPENSES
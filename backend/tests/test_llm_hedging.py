@@ -0,0 +1,31 @@
+import pytest
+
+import llm_hedging
+from llm_hedging import ProviderStats, timed_call
+
+
+def test_sequential_calls_feed_the_hedge_delay(monkeypatch):
+    stats = ProviderStats()
+    monkeypatch.setattr(llm_hedging, "provider_stats", stats)
+    assert llm_hedging.hedge_delay("groq") == llm_hedging.AI_HEDGE_DEFAULT_DELAY
+
+    prompt = "word " * 2000
+    assert timed_call("groq", prompt, lambda: "answer") == "answer"
+    assert timed_call("groq", prompt, lambda: None) is None
+
+    counters = stats.snapshot()["groq"]
+    assert (counters["attempts"], counters["successes"], counters["errors"], counters["wins"]) == (2, 1, 1, 1)
+    assert counters["cost_usd"] > 0
+    assert llm_hedging.hedge_delay("groq") == llm_hedging.AI_HEDGE_MIN_DELAY
+
+
+def test_failed_call_is_recorded_and_reraised(monkeypatch):
+    stats = ProviderStats()
+    monkeypatch.setattr(llm_hedging, "provider_stats", stats)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        timed_call("gemini", "prompt", fail)
+    assert stats.snapshot()["gemini"]["errors"] == 1
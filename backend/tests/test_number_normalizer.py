@@ -0,0 +1,38 @@
+import pytest
+
+from number_normalizer import normalize_numbers
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("पांच सौ का खर्चा", "500 का खर्चा"),
+    ("ढाई हज़ार मिले", "2500 मिले"),
+    ("सवा लाख खर्च", "125000 खर्च"),
+    ("१२०० रुपये", "1200 रुपये"),
+    ("one hundred and fifty rupees", "150 rupees"),
+    ("spent 5k", "spent 5000"),
+    ("income 1.5 lakh", "income 150000"),
+    ("पाचशे खर्च", "500 खर्च"),
+    ("દોઢ હજાર ખર્ચ", "1500 ખર્ચ"),
+    ("પાંચસો ખર્ચ", "500 ખર્ચ"),
+    ("পাঁচশো টাকা", "500 টাকা"),
+    ("ஐந்நூறு செலவு", "500 செலவு"),
+    ("ஐநூற்று ஐம்பது செலவு", "550 செலவு"),
+    ("இரண்டாயிரத்து ஐநூறு", "2500"),
+    ("രണ്ടായിരത്തി അഞ്ഞൂറ്", "2500"),
+    ("ఖర్చు ఐదు వందలు", "ఖర్చు 500"),
+    ("ఐదు వందల రూపాయలు", "500 రూపాయలు"),
+    ("నూట యాభై", "150"),
+    ("ಐನೂರು ಖರ್ಚು", "500 ಖರ್ಚು"),
+])
+def test_spelled_out_numbers(text, expected):
+    assert normalize_numbers(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    # Indefinite plurals and single ambiguous words are not amounts
+    "हज़ारों रुपये खर्च",
+    "వందలు రూపాయలు",
+    "पैसे दो",
+])
+def test_ambiguous_words_are_left_alone(text):
+    assert normalize_numbers(text) == text
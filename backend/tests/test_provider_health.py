@@ -0,0 +1,69 @@
+import time
+
+from provider_health import ProviderHealthRegistry, CLOSED, OPEN, HALF_OPEN
+
+
+def registry(**kwargs):
+    return ProviderHealthRegistry(**{"failure_threshold": 2, "open_seconds": 0.05, "store_path": "", **kwargs})
+
+
+def test_circuit_opens_after_repeated_failures():
+    health = registry()
+    health.record_failure("groq", 1.0)
+    assert health.allow("groq")
+    health.record_failure("groq", 1.0)
+    assert health.snapshot()["groq"]["state"] == OPEN
+    assert not health.allow("groq")
+
+
+def test_peek_does_not_take_the_probe_slot():
+    health = registry()
+    health.record_failure("groq")
+    health.record_failure("groq")
+    time.sleep(0.06)
+    assert health.peek("groq") and health.peek("groq")
+    assert health.snapshot()["groq"]["state"] == OPEN
+
+    assert health.allow("groq")
+    assert health.snapshot()["groq"]["state"] == HALF_OPEN
+    # Only one probe at a time
+    assert not health.peek("groq")
+    assert not health.allow("groq")
+
+
+def test_successful_probe_closes_the_circuit():
+    health = registry()
+    health.record_failure("groq")
+    health.record_failure("groq")
+    time.sleep(0.06)
+    assert health.allow("groq")
+    health.record_success("groq", 0.2)
+    assert health.snapshot()["groq"]["state"] == CLOSED
+
+
+def test_rate_limits_are_not_failures():
+    health = registry()
+    for _ in range(5):
+        health.record_throttled("gemini:1")
+    entry = health.snapshot()["gemini:1"]
+    assert entry["state"] == CLOSED
+    assert (entry["failures"], entry["throttled"], entry["consecutive_failures"]) == (0, 5, 0)
+
+
+def test_throttled_probe_frees_the_probe_slot():
+    health = registry()
+    health.record_failure("groq")
+    health.record_failure("groq")
+    time.sleep(0.06)
+    assert health.allow("groq")
+    health.record_throttled("groq")
+    assert health.peek("groq")
+
+
+def test_order_prefers_fast_healthy_providers():
+    health = registry()
+    health.record_success("groq", 2.0)
+    health.record_success("gemini", 0.5)
+    health.record_failure("anthropic")
+    health.record_failure("anthropic")
+    assert health.order(["groq", "anthropic", "gemini", "new"]) == ["new", "gemini", "groq", "anthropic"]
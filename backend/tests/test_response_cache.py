@@ -0,0 +1,45 @@
+import time
+
+from response_cache import ResponseCache, cache_key
+
+
+def test_put_and_get_return_copies():
+    cache = ResponseCache(max_entries=10, path="")
+    value = {"response_message": "GST is a tax"}
+    cache.put("key", value, ttl=60)
+    value["response_message"] = "changed"
+    stored = cache.get("key")
+    assert stored == {"response_message": "GST is a tax"}
+    stored["response_message"] = "changed again"
+    assert cache.get("key") == {"response_message": "GST is a tax"}
+
+
+def test_entries_expire():
+    cache = ResponseCache(max_entries=10, path="")
+    cache.put("key", {"a": 1}, ttl=0.05)
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, path="")
+    cache.put("a", {"v": 1}, ttl=60)
+    cache.put("b", {"v": 2}, ttl=60)
+    cache.get("a")
+    cache.put("c", {"v": 3}, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(max_entries=10, path=path, save_interval=3600)
+    cache.put("key", {"a": 1}, ttl=60)
+    cache.save()
+    assert ResponseCache(max_entries=10, path=path).get("key") == {"a": 1}
+
+
+def test_cache_key_ignores_case_whitespace_and_punctuation():
+    assert cache_key("What is GST?", "en", "general") == cache_key("  what is   gst ", "en", "general")
+    assert cache_key("What is GST?", "en", "general") != cache_key("What is GST?", "hi", "general")
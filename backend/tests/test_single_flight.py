@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, normalize_message
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"value": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 5
+    # Every caller gets its own copy
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats()["coalesced"] == 4
+
+
+def test_exception_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("provider down")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_normalize_message():
+    assert normalize_message("  What   is GST ") == "what is gst"
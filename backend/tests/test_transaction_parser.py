@@ -0,0 +1,35 @@
+import pytest
+
+from transaction_parser import parse_transactions
+
+
+def test_compound_message_is_split_into_clauses():
+    transactions = parse_transactions("spent 200 on tea and earned 500 from sales")
+    assert [(t["intent"], t["amount"]) for t in transactions] == [("expense", 200), ("income", 500)]
+    assert transactions[0]["description"] == "tea"
+
+
+def test_total_price_is_divided_over_the_quantity():
+    [transaction] = parse_transactions("bought 5 kg sugar for 200")
+    assert transaction["amount"] == 200
+    assert (transaction["quantity"], transaction["unit"], transaction["cost_per_unit"]) == (5, "kg", 40)
+
+
+@pytest.mark.parametrize("message, amount, cost_per_unit", [
+    ("sold 2 sarees for 1000 each", 2000, 1000),
+    ("bought 3 kg rice at 50", 150, 50),
+])
+def test_per_unit_price_is_multiplied_by_the_quantity(message, amount, cost_per_unit):
+    [transaction] = parse_transactions(message)
+    assert (transaction["amount"], transaction["cost_per_unit"]) == (amount, cost_per_unit)
+
+
+@pytest.mark.parametrize("message", [
+    "customer ne 500 diya",
+    "500 ka bill aaya",
+    "paid 300 rent and got bill of 500",
+    "what did I spend 500 on?",
+    "hello",
+])
+def test_ambiguous_messages_return_none(message):
+    assert parse_transactions(message) is None
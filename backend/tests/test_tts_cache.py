@@ -0,0 +1,57 @@
+import os
+import stat
+import threading
+import time
+
+import tts_cache
+from tts_cache import TTSCache, clean_tts_text, tts_language
+
+
+def fake_synthesize(calls):
+    def synthesize(text, language):
+        calls.append((text, language))
+        time.sleep(0.05)
+        return f"{language}:{text}".encode("utf-8")
+    return synthesize
+
+
+def test_render_synthesizes_once_and_then_serves_from_cache(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tts_cache, "synthesize", fake_synthesize(calls))
+    cache = TTSCache(directory=str(tmp_path / "tts"))
+
+    key, audio, etag = cache.render("namaste", "hi")
+    assert audio == b"hi:namaste"
+    assert cache.render("namaste", "hi") == (key, audio, etag)
+    assert calls == [("namaste", "hi")]
+
+
+def test_concurrent_renders_of_the_same_text_share_one_synthesis(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tts_cache, "synthesize", fake_synthesize(calls))
+    cache = TTSCache(directory=str(tmp_path / "tts"))
+
+    threads = [threading.Thread(target=cache.render, args=("hello", "en")) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+
+def test_disk_cache_is_private_and_survives_a_restart(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tts_cache, "synthesize", fake_synthesize(calls))
+    directory = str(tmp_path / "tts")
+    key, audio, _ = TTSCache(directory=directory).render("₹500 kharcha", "hi")
+
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(os.path.join(directory, f"{key}.mp3")).st_mode) == 0o600
+    assert TTSCache(directory=directory).get(key)[0] == audio
+    assert len(calls) == 1
+
+
+def test_clean_text_and_language():
+    assert clean_tts_text("✅  Expense   added 🎉") == "Expense added"
+    assert tts_language("hi-IN") == "hi"
+    assert tts_language("xx") == "en"
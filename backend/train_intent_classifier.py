@@ -0,0 +1,212 @@
+"""
+Train the local intent classifier from logged chat_history (message, intent) pairs.
+
+Usage:
+    python train_intent_classifier.py --source sqlite
+    python train_intent_classifier.py --source supabase
+    python train_intent_classifier.py --jsonl export.jsonl [--jsonl more.jsonl]
+    python train_intent_classifier.py --source supabase --compare-llm 50
+
+JSONL rows are {"message": "...", "intent": "..."}. Only LLM-labelled messages
+are logged with an intent; messages the rule engine resolves on its own are
+dropped too, since older rows of that kind were labelled by the fast path
+(including its mistakes) and the rules answer them before the classifier runs.
+The script holds out a
+stratified test split, reports accuracy, per-intent precision/recall, how many
+messages clear the bypass threshold and their accuracy, and model load and
+prediction latency. With --compare-llm N it also sends N held-out messages
+through the LLM path and reports its agreement with the labels and its latency.
+The final model is refit on all data and written to INTENT_CLASSIFIER_PATH.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import intent_classifier  # noqa: E402
+from intent_classifier import INTENT_CLASSIFIER_PATH, INTENT_CLASSIFIER_THRESHOLD, LOGGED_INTENT_LABELS  # noqa: E402
+from intent_rules import intent_rules  # noqa: E402
+from transaction_parser import parse_transactions  # noqa: E402
+
+
+def load_sqlite() -> List[Tuple[str, str]]:
+    from database import SessionLocal, ChatHistory
+    db = SessionLocal()
+    try:
+        rows = db.query(ChatHistory.message, ChatHistory.intent).filter(ChatHistory.intent.isnot(None)).all()
+        return [(message, intent) for message, intent in rows]
+    finally:
+        db.close()
+
+
+def load_supabase(page_size: int = 1000) -> List[Tuple[str, str]]:
+    from supabase_service import SupabaseService
+    client = SupabaseService().client
+    pairs, start = [], 0
+    while True:
+        result = (client.table("chat_history").select("message,intent")
+                  .not_.is_("intent", "null").range(start, start + page_size - 1).execute())
+        rows = result.data or []
+        pairs.extend((row["message"], row["intent"]) for row in rows)
+        if len(rows) < page_size:
+            return pairs
+        start += page_size
+
+
+def load_jsonl(path: str) -> List[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return [(row["message"], row["intent"]) for row in rows]
+
+
+def labelled_pairs(pairs: List[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+    """
+    Map logged intents to classifier labels, dropping unknown intents, duplicate
+    messages and messages the rule engine or transaction parser answer themselves
+    """
+    seen = set()
+    messages, labels = [], []
+    for message, intent in pairs:
+        label = LOGGED_INTENT_LABELS.get((intent or "").strip().lower())
+        key = intent_classifier.prepare_text(message or "")
+        if label is None or not key.strip() or key in seen:
+            continue
+        if intent_rules.analyze(message).transaction_type or parse_transactions(message):
+            continue
+        seen.add(key)
+        messages.append(message)
+        labels.append(label)
+    return messages, labels
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def compare_llm(messages: List[str], labels: List[str], limit: int) -> dict:
+    """Accuracy and latency of the existing LLM intent path on held-out messages"""
+    import response_cache
+    from ai_processor import AIProcessor
+
+    response_cache.AI_CACHE_ENABLED = False
+    processor = AIProcessor()
+    correct, latencies = 0, []
+    for message, label in list(zip(messages, labels))[:limit]:
+        start = time.perf_counter()
+        result = processor._process_conversational_query(message, "en", "business")
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += LOGGED_INTENT_LABELS.get(result.get("intent", "")) == label
+    count = len(latencies)
+    return {
+        "samples": count,
+        "accuracy": round(correct / count, 4) if count else None,
+        "latency_ms_p50": round(percentile(latencies, 0.5), 1) if count else None,
+        "latency_ms_p95": round(percentile(latencies, 0.95), 1) if count else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("--source", choices=("sqlite", "supabase"), action="append", default=[])
+    parser.add_argument("--jsonl", action="append", default=[])
+    parser.add_argument("--output", default=INTENT_CLASSIFIER_PATH)
+    parser.add_argument("--report", default=None, help="JSON report path (default: next to the model)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--compare-llm", type=int, default=0, metavar="N",
+                        help="also run N held-out messages through the LLM path (costs provider calls)")
+    args = parser.parse_args()
+
+    if not intent_classifier.SKLEARN_AVAILABLE:
+        sys.exit("scikit-learn and joblib are required (pip install -r requirements.txt)")
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.model_selection import train_test_split
+
+    pairs = []
+    for source in args.source or ([] if args.jsonl else ["sqlite"]):
+        pairs.extend(load_supabase() if source == "supabase" else load_sqlite())
+    for path in args.jsonl:
+        pairs.extend(load_jsonl(path))
+
+    messages, labels = labelled_pairs(pairs)
+    logging.info(f"{len(messages)} labelled messages from {len(pairs)} chat_history rows")
+    if len(messages) < args.min_samples:
+        sys.exit(f"Only {len(messages)} labelled messages; need at least {args.min_samples}")
+
+    train_messages, test_messages, train_labels, test_labels = train_test_split(
+        messages, labels, test_size=args.test_size, random_state=42, stratify=labels
+    )
+    pipeline = intent_classifier.train(train_messages, train_labels)
+
+    predictions, confidences, latencies = [], [], []
+    for message in test_messages:
+        start = time.perf_counter()
+        probabilities = pipeline.predict_proba([intent_classifier.prepare_text(message)])[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        best = int(probabilities.argmax())
+        predictions.append(pipeline.classes_[best])
+        confidences.append(float(probabilities[best]))
+
+    confident = [i for i, confidence in enumerate(confidences) if confidence >= INTENT_CLASSIFIER_THRESHOLD]
+    confident_correct = sum(predictions[i] == test_labels[i] for i in confident)
+
+    # Final model on all data
+    pipeline = intent_classifier.train(messages, labels)
+    accuracy = accuracy_score(test_labels, predictions)
+    intent_classifier.save(pipeline, args.output, trained_at=datetime.now().isoformat(),
+                           samples=len(messages), accuracy=round(accuracy, 4))
+
+    start = time.perf_counter()
+    intent_classifier.IntentClassifier(args.output)._load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        "samples": len(messages),
+        "train": len(train_messages),
+        "test": len(test_messages),
+        "label_counts": {label: labels.count(label) for label in sorted(set(labels))},
+        "classifier": {
+            "accuracy": round(accuracy, 4),
+            "per_intent": classification_report(test_labels, predictions, output_dict=True, zero_division=0),
+            "threshold": INTENT_CLASSIFIER_THRESHOLD,
+            "bypass_rate": round(len(confident) / len(test_messages), 4),
+            "bypass_accuracy": round(confident_correct / len(confident), 4) if confident else None,
+            "latency_ms_mean": round(statistics.mean(latencies), 3),
+            "latency_ms_p95": round(percentile(latencies, 0.95), 3),
+            "load_ms": round(load_ms, 1),
+            "artifact_bytes": os.path.getsize(args.output),
+        },
+    }
+    if args.compare_llm:
+        report["llm"] = compare_llm(test_messages, test_labels, args.compare_llm)
+
+    report_path = args.report or os.path.splitext(args.output)[0] + "_report.json"
+    with open(report_path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, ensure_ascii=False)
+
+    summary = report["classifier"]
+    print(f"accuracy {summary['accuracy']:.1%} on {len(test_messages)} held-out messages")
+    print(f"bypass {summary['bypass_rate']:.1%} of messages at >= {INTENT_CLASSIFIER_THRESHOLD} "
+          f"(accuracy {summary['bypass_accuracy']})")
+    print(f"latency mean {summary['latency_ms_mean']} ms, p95 {summary['latency_ms_p95']} ms; "
+          f"load {summary['load_ms']} ms; artifact {summary['artifact_bytes']} bytes")
+    if "llm" in report:
+        llm = report["llm"]
+        print(f"LLM path: accuracy {llm['accuracy']}, p50 {llm['latency_ms_p50']} ms, p95 {llm['latency_ms_p95']} ms "
+              f"on {llm['samples']} messages")
+    print(f"model: {args.output}\nreport: {report_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
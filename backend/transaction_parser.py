@@ -0,0 +1,223 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from intent_rules import (intent_rules, normalize_text, fold_spelling, PURPOSE_WORDS, INCOME, EXPENSE, ARRIVAL,
+                          INVENTORY)
+
+# Deterministic parser for compound business messages such as
+# "sold 5 sarees for 2000, paid 300 rent and bought 10 kg rice for 450".
+# The message is split into clauses and each clause must resolve to exactly
+# one income, expense or inventory entry; otherwise the whole message is left
+# to the LLM.
+
+# Clause separators: punctuation plus "and" / "then" in every supported language
+_LATIN_SEPARATORS = ("and", "then", "also", "aur", "phir", "fir", "ani", "matte", "mattu", "mariyu",
+                     "ane", "ebong", "pinne", "piragu")
+_INDIC_SEPARATORS = ("और", "तथा", "फिर", "आणि", "மற்றும்", "பிறகு", "പിന്നെ", "మరియు", "తర్వాత",
+                     "ಮತ್ತು", "ನಂತರ", "અને", "પછી", "এবং", "আর", "তারপর")
+_SEPARATOR = re.compile(
+    r"[,;।\n]+|\b(?:" + "|".join(_LATIN_SEPARATORS) + r")\b"
+    r"|(?<!\S)(?:" + "|".join(_INDIC_SEPARATORS) + r")(?!\S)"
+)
+
+_TOKEN = re.compile(r"(?P<number>\d+(?:\.\d+)?)|(?P<word>(?:(?![\d_])[\wऀ-෿])+)|(?P<symbol>[₹@])")
+
+# Unit words -> unit stored with the inventory item
+UNITS = {
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "किलो": "kg", "കിലോ": "kg", "கிலோ": "kg",
+    "కిలో": "kg", "ಕೆಜಿ": "kg", "કિલો": "kg", "কেজি": "kg",
+    "g": "g", "gm": "g", "gms": "g", "gram": "g", "grams": "g", "ग्राम": "g",
+    "l": "litre", "ltr": "litre", "litre": "litre", "litres": "litre", "liter": "litre", "liters": "litre",
+    "लीटर": "litre", "ലിറ്റർ": "litre", "லிட்டர்": "litre", "లీటర్": "litre", "ಲೀಟರ್": "litre", "લિટર": "litre",
+    "লিটার": "litre",
+    "ml": "ml",
+    "pc": "pieces", "pcs": "pieces", "piece": "pieces", "pieces": "pieces", "पीस": "pieces", "नग": "pieces",
+    "dozen": "dozen", "दर्जन": "dozen",
+    "packet": "packets", "packets": "packets", "pack": "packets", "पैकेट": "packets",
+    "box": "boxes", "boxes": "boxes", "डिब्बा": "boxes", "डिब्बे": "boxes",
+    "bag": "bags", "bags": "bags", "बोरी": "bags",
+    "metre": "metre", "metres": "metre", "meter": "metre", "meters": "metre", "मीटर": "metre",
+}
+
+# Marks the number next to it as money: "for 2000", "₹450", "2000 में", "2000க்கு"
+PRICE_BEFORE = {"for", "at", "@", "₹", "rs", "inr", "worth", "price"}
+PRICE_AFTER = {
+    "rs", "rupee", "rupees", "rupaye", "rupay", "rupaiye", "रुपये", "रुपए", "रुपया", "ரூபாய்", "രൂപ",
+    "రూపాయలు", "ರೂಪಾಯಿ", "રૂપિયા", "টাকা", "में", "mein", "me", "ko", "ku", "க்கு", "ക്ക്", "కి", "ಗೆ",
+    "માં", "তে",
+}
+
+# The price next to a quantity is per unit: "2 sarees for 1000 each", "3 kg rice at 50", "50 प्रति किलो"
+PER_UNIT = {
+    "each", "per", "apiece", "har", "harek", "prati", "हर", "प्रति", "ప్రతి", "ಪ್ರತಿ", "પ્રતિ", "প্রতি",
+    "ஒவ்வொன்றும்", "ஒன்றுக்கு", "ഓരോന്നിനും", "ഒന്നിന്",
+}
+# Rate markers: per unit when the clause also has a quantity, otherwise just a price
+RATE_BEFORE = {"at", "@"}
+
+# Never part of a product name or description
+STOP_WORDS = PRICE_BEFORE | PRICE_AFTER | PER_UNIT | {
+    "i", "we", "my", "our", "the", "a", "an", "to", "on", "in", "of", "from", "today", "yesterday",
+    "aaj", "kal", "maine", "mene", "humne", "आज", "कल", "मैंने", "हमने", "ने", "को",
+}
+
+
+# Lexicons are matched against spelling-folded words ("rupees" -> "rupes")
+UNITS = {normalize_text(word): unit for word, unit in UNITS.items()}
+PRICE_BEFORE = {normalize_text(word) for word in PRICE_BEFORE}
+PRICE_AFTER = {normalize_text(word) for word in PRICE_AFTER}
+STOP_WORDS = {normalize_text(word) for word in STOP_WORDS}
+PER_UNIT = {normalize_text(word) for word in PER_UNIT}
+RATE_BEFORE = {normalize_text(word) for word in RATE_BEFORE}
+_PURPOSE = {normalize_text(word) for word in PURPOSE_WORDS}
+
+
+def _tokens(clause: str) -> List[Tuple[str, str, str]]:
+    """(kind, text as written, folded lookup key) for each number, word and currency symbol"""
+    return [(match.lastgroup, match.group(), fold_spelling(match.group())) for match in _TOKEN.finditer(clause)]
+
+
+def _is_price(tokens: List[Tuple[str, str, str]], index: int) -> bool:
+    before = tokens[index - 1][2] if index > 0 else None
+    after = tokens[index + 1][2] if index + 1 < len(tokens) else None
+    return before in PRICE_BEFORE or after in PRICE_AFTER
+
+
+def _unit(tokens: List[Tuple[str, str, str]], index: int) -> Optional[str]:
+    if index + 1 < len(tokens):
+        return UNITS.get(tokens[index + 1][2])
+    return None
+
+
+def _is_content(token: Tuple[str, str, str]) -> bool:
+    """A word that says what the money was for: not a keyword, unit, stop word or filler"""
+    kind, _, key = token
+    if kind != "word" or key in STOP_WORDS or key in UNITS or intent_rules.word_categories(key):
+        return False
+    return not intent_rules.is_filler(key)
+
+
+def _content_words(tokens: List[Tuple[str, str, str]], start: int = 0, stop_at_number: bool = False) -> List[str]:
+    """Content words from `start`; with stop_at_number, only the run right after a quantity"""
+    words = []
+    for token in tokens[start:]:
+        if _is_content(token):
+            words.append(token[1])
+        elif stop_at_number and words and (token[0] == "number" or token[2] in PRICE_BEFORE
+                                            or intent_rules.word_categories(token[2])):
+            break
+    return words
+
+
+def _format_amount(value: float) -> float:
+    return int(value) if value == int(value) else value
+
+
+def _parse_clause(clause: str) -> Optional[Dict[str, Any]]:
+    """One transaction from one clause, or None if the clause is ambiguous"""
+    tokens = _tokens(clause)
+    categories = set()
+    for kind, _, key in tokens:
+        if kind == "word":
+            categories |= intent_rules.word_categories(key)
+
+    money_types = categories & {INCOME, EXPENSE, ARRIVAL}
+    if money_types:
+        # Same direction rules as the single-amount fast path ("customer ne 500 diya" is not an expense)
+        transaction_type = intent_rules.direction(frozenset(money_types), frozenset(key for _, _, key in tokens))
+    else:
+        transaction_type = INVENTORY if INVENTORY in categories else None
+    if transaction_type is None:
+        return None
+
+    numbers = [i for i, token in enumerate(tokens) if token[0] == "number"]
+    per_unit = any(key in PER_UNIT for _, _, key in tokens)
+    amount, quantity, quantity_index = None, None, None
+    if len(numbers) == 1:
+        # "paid 50 per day", "1000 each": a rate without a count to multiply it by
+        if per_unit:
+            return None
+        index = numbers[0]
+        if _unit(tokens, index) or transaction_type == INVENTORY:
+            quantity, quantity_index = float(tokens[index][1]), index
+        elif (index + 1 < len(tokens) and _is_content(tokens[index + 1]) and tokens[index + 1][2] not in _PURPOSE
+              and not _is_price(tokens, index)):
+            # "sold 5 sarees": a count of items without a price
+            return None
+        else:
+            amount = float(tokens[index][1])
+    elif len(numbers) == 2:
+        prices = [i for i in numbers if _is_price(tokens, i) and not _unit(tokens, i)]
+        units = [i for i in numbers if _unit(tokens, i)]
+        if len(prices) == 1:
+            price_index = prices[0]
+        elif len(units) == 1:
+            price_index = next(i for i in numbers if i != units[0])
+        else:
+            return None
+        quantity_index = next(i for i in numbers if i != price_index)
+        amount, quantity = float(tokens[price_index][1]), float(tokens[quantity_index][1])
+        if per_unit or (price_index > 0 and tokens[price_index - 1][2] in RATE_BEFORE):
+            amount *= quantity
+    else:
+        return None
+
+    if transaction_type != INVENTORY and not amount:
+        return None
+    if quantity is not None and quantity <= 0:
+        return None
+
+    transaction: Dict[str, Any] = {"intent": transaction_type, "category": "General"}
+    if amount:
+        transaction["amount"] = _format_amount(amount)
+
+    if quantity is None:
+        words = _content_words(tokens)
+        label = "Income" if transaction_type == INCOME else "Expense"
+        transaction["description"] = " ".join(words) if words else label
+        return transaction
+
+    unit = _unit(tokens, quantity_index)
+    product_words = _content_words(tokens, quantity_index + 1, stop_at_number=True)
+    if not product_words:
+        return None
+    product_name = " ".join(product_words)
+    transaction.update({
+        "product_name": product_name,
+        "quantity": _format_amount(quantity),
+        "unit": unit or "pieces",
+        "cost_per_unit": round(amount / quantity, 2) if amount else 0.0,
+        "description": f"{_format_amount(quantity)} {unit + ' ' if unit else ''}{product_name}",
+    })
+    return transaction
+
+
+def parse_transactions(message: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Split a message into clauses and parse each into a transaction dict
+    (intent, amount, description, category and, for item clauses, product_name,
+    quantity, unit, cost_per_unit). Returns None when any clause is ambiguous,
+    or the message is a question or clear command, so the caller falls back to the LLM.
+    """
+    analysis = intent_rules.analyze(message)
+    if analysis.is_question or analysis.clear_command or not analysis.amounts:
+        return None
+
+    clauses: List[str] = []
+    for clause in _SEPARATOR.split(normalize_text(message, fold=False)):
+        clause = clause.strip()
+        if not clause:
+            continue
+        # Clauses without a number belong to their neighbour ("spent 200 on tea and snacks")
+        if clauses and (not re.search(r"\d", clause) or not re.search(r"\d", clauses[-1])):
+            clauses[-1] = f"{clauses[-1]} {clause}"
+        else:
+            clauses.append(clause)
+
+    transactions = []
+    for clause in clauses:
+        transaction = _parse_clause(clause)
+        if transaction is None:
+            return None
+        transactions.append(transaction)
+    return transactions or None
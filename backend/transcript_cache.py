@@ -0,0 +1,67 @@
+import os
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+
+# Content-addressed transcription cache: mobile clients on flaky links resend
+# the same recording, and a retry should not cost another Whisper decode. The
+# key is a hash of the decoded 16 kHz PCM (so a re-muxed or re-encoded copy
+# with identical samples also hits) plus the model settings and language hint.
+SPEECH_CACHE_ENABLED = os.getenv("SPEECH_CACHE_ENABLED", "true").lower() == "true"
+SPEECH_CACHE_MAX_ENTRIES = int(os.getenv("SPEECH_CACHE_MAX_ENTRIES", "500"))
+SPEECH_CACHE_TTL = float(os.getenv("SPEECH_CACHE_TTL", "3600"))
+
+Transcript = Tuple[str, float, str]
+
+
+def audio_digest(audio: Any) -> Optional[str]:
+    """SHA-256 of decoded PCM; None for file paths, which are not cached"""
+    if not isinstance(audio, np.ndarray):
+        return None
+    return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes()).hexdigest()
+
+
+class TranscriptCache:
+    """
+    LRU/TTL cache of (text, confidence, language) per audio digest. Identical
+    clips that arrive while the first is still being transcribed wait for it
+    instead of starting their own decode.
+    """
+
+    def __init__(self, max_entries: int = SPEECH_CACHE_MAX_ENTRIES, ttl: float = SPEECH_CACHE_TTL):
+        self.ttl = ttl
+        self._cache = ResponseCache(max_entries=max_entries, path="")
+        self._flight = SingleFlight("transcription")
+
+    def key(self, audio: Any, settings: str, language_hint: Optional[str]) -> Optional[str]:
+        digest = audio_digest(audio) if SPEECH_CACHE_ENABLED else None
+        return f"{digest}|{settings}|{language_hint or 'auto'}" if digest else None
+
+    def transcribe(self, key: Optional[str], func: Callable[[], Transcript]) -> Transcript:
+        """Cached result for key, or func() (shared with concurrent identical calls) stored under it"""
+        if key is None:
+            return func()
+        cached = self._cache.get(key)
+        if cached is not None:
+            logging.info("♻️ Transcription cache hit for a repeated recording")
+            return cached["text"], cached["confidence"], cached["language"]
+
+        def transcribe_and_store() -> Transcript:
+            text, confidence, language = func()
+            # Failed transcriptions come back empty and are not cached, so a retry gets a fresh attempt
+            if text:
+                self._cache.put(key, {"text": text, "confidence": confidence, "language": language}, self.ttl)
+            return text, confidence, language
+
+        return self._flight.do(key, transcribe_and_store)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "coalesced": self._flight.stats()["coalesced"]}
+
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,323 @@
+import os
+import io
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from gtts import gTTS
+
+from executors import run_io
+from single_flight import SingleFlight
+
+# Content-addressed cache for /api/tts. Most spoken text is templated ("✅ ₹500
+# की आय जोड़ी गई", scheme blurbs, clear confirmations), so the same mp3 is
+# requested over and over; each one used to be a new gTTS network synthesis and
+# a temp file that was never deleted. Audio is kept in a small in-memory LRU
+# and in an on-disk LRU directory, both capped by size.
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+# Replies carry users' figures, so the cache lives in an app-owned directory
+# readable by the service user only, not in the shared system temp directory
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "tts")
+TTS_CACHE_MAX_DISK_MB = float(os.getenv("TTS_CACHE_MAX_DISK_MB", "200"))
+TTS_CACHE_MAX_MEMORY_MB = float(os.getenv("TTS_CACHE_MAX_MEMORY_MB", "16"))
+# Cache-Control max-age for clients; the audio for a given text never changes
+TTS_CACHE_MAX_AGE = int(os.getenv("TTS_CACHE_MAX_AGE", "86400"))
+
+# Speculative rendering: chat endpoints called with speak=true start synthesizing
+# the reply right away and return an audio token for /api/tts
+TTS_PRERENDER_TOKEN_TTL = float(os.getenv("TTS_PRERENDER_TOKEN_TTL", "120"))
+# Jobs beyond this many live tokens are not started (the client falls back to text)
+TTS_PRERENDER_MAX_TOKENS = int(os.getenv("TTS_PRERENDER_MAX_TOKENS", "500"))
+
+TTS_LANGUAGES = {"en", "hi", "ta", "ml", "te", "kn", "gu", "bn", "mr"}
+
+# Emojis and symbols that gTTS would read out or choke on
+_SYMBOLS = ['✅', '❌', '🔊', '💰', '📊', '📦', '🎤', '🎯', '🌟', '🎉', '⚡', '🚀', '🎨', '🔧', '🌐', '📱', '🎭', '🧹', '⚙️', '🎛️']
+_EMOJI_RANGES = ((0x1F600, 0x1F64F), (0x1F300, 0x1F5FF))
+_WHITESPACE = re.compile(r"\s+")
+# Files written by the old uncached endpoint
+_LEGACY_FILE = re.compile(r"^tts_[0-9a-f]{32}\.mp3$")
+
+# (key, audio, etag)
+Rendered = Tuple[str, bytes, str]
+
+
+def clean_tts_text(text: str) -> str:
+    """Text as it will be spoken: emojis removed, Unicode NFC, whitespace collapsed"""
+    clean_text = unicodedata.normalize("NFC", text or "")
+    for symbol in _SYMBOLS:
+        clean_text = clean_text.replace(symbol, "")
+    clean_text = "".join(char for char in clean_text
+                         if not any(low <= ord(char) <= high for low, high in _EMOJI_RANGES))
+    return _WHITESPACE.sub(" ", clean_text).strip()
+
+
+def tts_language(language: Optional[str]) -> str:
+    code = (language or "en").strip().lower().replace("_", "-").split("-")[0]
+    return code if code in TTS_LANGUAGES else "en"
+
+
+def synthesize(text: str, language: str) -> bytes:
+    """gTTS network synthesis straight into memory"""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=language, slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+class TTSCache:
+    """
+    mp3 audio keyed by sha256(language|cleaned text). Lookups go memory, then
+    disk, then gTTS; concurrent requests for the same uncached text share one
+    synthesis. ETags are hashes of the audio bytes, so they are strong.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_disk_mb: float = TTS_CACHE_MAX_DISK_MB,
+                 max_memory_mb: float = TTS_CACHE_MAX_MEMORY_MB, enabled: bool = TTS_CACHE_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # key -> (audio, etag) and key -> file size, least recently used first
+        self._memory: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._flight = SingleFlight("tts")
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "renders": 0, "evictions": 0, "write_errors": 0}
+        if self.enabled:
+            self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _scan(self):
+        """Index files left by earlier runs, oldest first, and trim to the size cap"""
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            os.chmod(self.directory, 0o700)
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)  # interrupted write
+                elif name.endswith(".mp3"):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        except OSError as e:
+            logging.warning(f"TTS cache directory {self.directory} unavailable, caching in memory only: {str(e)}")
+            self.directory = ""
+            return
+        with self._lock:
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            evicted = self._evict_disk()
+        self._remove(evicted)
+        logging.info(f"🔊 TTS cache: {len(self._disk)} clips on disk ({self._disk_bytes / 1024 / 1024:.1f} MB)")
+
+    def key(self, text: str, language: str) -> str:
+        return hashlib.sha256(f"{language}|{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """(audio, etag) if the clip is cached in memory or on disk"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry
+            on_disk = key in self._disk
+            if on_disk:
+                self._disk.move_to_end(key)
+        if not on_disk:
+            return None
+
+        try:
+            with open(self._path(key), "rb") as handle:
+                audio = handle.read()
+            os.utime(self._path(key))  # keeps LRU order across restarts
+        except OSError:
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        entry = (audio, hashlib.sha256(audio).hexdigest()[:32])
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def render(self, text: str, language: str) -> Rendered:
+        """Cached audio for already cleaned text, synthesized (once, even when asked concurrently) on a miss"""
+        key = self.key(text, language)
+        if self.enabled:
+            entry = self.get(key)
+            if entry is not None:
+                return key, entry[0], entry[1]
+        audio, etag = self._flight.do(key, lambda: self._render_and_store(key, text, language))
+        return key, audio, etag
+
+    def _render_and_store(self, key: str, text: str, language: str) -> Tuple[bytes, str]:
+        audio = synthesize(text, language)
+        entry = (audio, hashlib.sha256(audio).hexdigest()[:32])
+        with self._lock:
+            self._stats["renders"] += 1
+            if self.enabled:
+                self._remember(key, entry)
+        if self.enabled and self.directory:
+            self._write(key, audio)
+        return entry
+
+    def _remember(self, key: str, entry: Tuple[bytes, str]):
+        """Add to the memory LRU; caller holds the lock"""
+        size = len(entry[0])
+        if size > self.max_memory_bytes or key in self._memory:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (audio, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(audio)
+
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as handle:
+                handle.write(audio)
+            os.replace(temp_path, path)  # readers never see a partial file
+        except OSError as e:
+            logging.warning(f"Could not write TTS cache file {path}: {str(e)}")
+            with self._lock:
+                self._stats["write_errors"] += 1
+            return
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(audio)
+                self._disk_bytes += len(audio)
+            evicted = self._evict_disk()
+        self._remove(evicted)
+
+    def _evict_disk(self) -> list:
+        """Drop least recently used files from the index until under the cap; caller holds the lock"""
+        evicted = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+            evicted.append(key)
+        return evicted
+
+    def _remove(self, keys: list):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def remove_legacy_files(self) -> int:
+        """Delete tts_<uuid>.mp3 files the uncached endpoint left in the temp directory"""
+        removed = 0
+        temp_dir = tempfile.gettempdir()
+        for name in os.listdir(temp_dir):
+            if _LEGACY_FILE.match(name):
+                try:
+                    os.remove(os.path.join(temp_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logging.info(f"🧹 Removed {removed} leftover TTS temp files")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["renders"]
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_bytes / 1024 / 1024, 2),
+                "disk_entries": len(self._disk),
+                "disk_mb": round(self._disk_bytes / 1024 / 1024, 2),
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self._flight.stats()["coalesced"],
+            }
+
+
+class SpeculativeTTS:
+    """
+    Short-lived audio tokens for replies whose speech is being rendered in the
+    background. Lives on the event loop: start() schedules the render on the
+    IO pool, wait() returns its result, waiting if it is still in flight.
+    """
+
+    def __init__(self, cache: TTSCache, ttl: float = TTS_PRERENDER_TOKEN_TTL,
+                 max_tokens: int = TTS_PRERENDER_MAX_TOKENS):
+        self.cache = cache
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        # token -> (expires_at, render task)
+        self._jobs: "OrderedDict[str, Tuple[float, asyncio.Task]]" = OrderedDict()
+        self._stats = {"started": 0, "skipped": 0, "served": 0, "waited": 0, "expired": 0, "failed": 0}
+
+    def _prune(self):
+        now = time.monotonic()
+        while self._jobs and next(iter(self._jobs.values()))[0] <= now:
+            self._jobs.popitem(last=False)
+            self._stats["expired"] += 1
+
+    def start(self, text: str, language: Optional[str]) -> Optional[str]:
+        """Begin rendering text; returns the token, or None when there is nothing to say or too many jobs"""
+        clean_text = clean_tts_text(text)
+        self._prune()
+        if not clean_text:
+            return None
+        if len(self._jobs) >= self.max_tokens:
+            self._stats["skipped"] += 1
+            return None
+        token = secrets.token_urlsafe(16)
+        task = asyncio.get_running_loop().create_task(run_io(self.cache.render, clean_text, tts_language(language)))
+        task.add_done_callback(self._done)
+        self._jobs[token] = (time.monotonic() + self.ttl, task)
+        self._stats["started"] += 1
+        return token
+
+    def _done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["failed"] += 1
+            logging.warning(f"Speculative TTS render failed: {str(task.exception())}")
+
+    async def wait(self, token: str) -> Optional[Rendered]:
+        """Rendered audio for a live token; None for unknown, expired or failed jobs"""
+        self._prune()
+        job = self._jobs.get(token)
+        if job is None:
+            return None
+        task = job[1]
+        if not task.done():
+            self._stats["waited"] += 1
+        try:
+            # shield: a client that disconnects must not cancel the job for a retry
+            rendered = await asyncio.shield(task)
+        except Exception:
+            return None
+        self._stats["served"] += 1
+        return rendered
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune()
+        return {**self._stats, "live_tokens": len(self._jobs)}
+
+
+tts_cache = TTSCache()
+tts_prerender = SpeculativeTTS(tts_cache)
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+from typing import List
+
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from audio_decoder import decode_audio, AudioDecodeError, AudioTooLong, SAMPLE_RATE, MAX_AUDIO_SECONDS
+
+# Streaming voice input: audio arrives in small chunks while the user is still
+# speaking, server-side VAD cuts it into utterance segments at pauses, and each
+# finished segment is transcribed while the rest is being recorded.
+
+# A pause this long closes the current segment
+SPEECH_STREAM_SILENCE_MS = int(os.getenv("SPEECH_STREAM_SILENCE_MS", "700"))
+# Segments are cut here even without a pause
+SPEECH_STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("SPEECH_STREAM_MAX_SEGMENT_SECONDS", "20"))
+# VAD (and container re-decoding) runs at most this often per stream
+SPEECH_STREAM_STEP_SECONDS = float(os.getenv("SPEECH_STREAM_STEP_SECONDS", "0.5"))
+# Connections that send nothing for this long are closed
+SPEECH_STREAM_IDLE_SECONDS = float(os.getenv("SPEECH_STREAM_IDLE_SECONDS", "30"))
+
+STREAM_FORMATS = ("pcm16", "webm", "ogg")
+
+_SPEECH_PAD_MS = 200
+# Audio kept before detected speech while nothing but silence has arrived
+_LEAD_IN_SAMPLES = SAMPLE_RATE // 2
+
+
+class VoiceStream:
+    """
+    Per-connection state: turns incoming chunks into 16 kHz samples and
+    returns utterance segments as soon as VAD sees them end.
+
+    "pcm16" chunks are raw 16 kHz mono little-endian int16 (AudioWorklet) and
+    are used as-is. "webm" / "ogg" chunks are consecutive MediaRecorder
+    blobs; the growing container is re-decoded every step and only the new
+    samples are used.
+    """
+
+    def __init__(self, audio_format: str = "pcm16", max_seconds: float = MAX_AUDIO_SECONDS):
+        if audio_format not in STREAM_FORMATS:
+            raise AudioDecodeError(f"Unsupported stream format '{audio_format}' (use one of {', '.join(STREAM_FORMATS)})")
+        self.audio_format = audio_format
+        self.max_seconds = max_seconds
+        self.received_samples = 0
+        self._container = bytearray()
+        self._carry = b""
+        self._last_step = 0.0
+        self._pending = np.zeros(0, dtype=np.float32)
+        # Unsegmented audio; everything before it has been emitted or discarded as silence
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._vad = VadOptions(min_silence_duration_ms=SPEECH_STREAM_SILENCE_MS, speech_pad_ms=_SPEECH_PAD_MS)
+
+    def _decode(self, data: bytes, final: bool) -> np.ndarray:
+        """New samples from an incoming chunk"""
+        if self.audio_format == "pcm16":
+            data = self._carry + data
+            usable = len(data) - len(data) % 2
+            self._carry = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+        else:
+            self._container.extend(data)
+            if not final and time.monotonic() - self._last_step < SPEECH_STREAM_STEP_SECONDS:
+                return np.zeros(0, dtype=np.float32)
+            self._last_step = time.monotonic()
+            try:
+                decoded = decode_audio(bytes(self._container), self.max_seconds, partial=not final)
+            except AudioTooLong:
+                raise
+            except AudioDecodeError:
+                if final:
+                    raise
+                return np.zeros(0, dtype=np.float32)  # header not complete yet
+            samples = decoded[self.received_samples:]
+
+        self.received_samples += len(samples)
+        if self.received_samples > self.max_seconds * SAMPLE_RATE:
+            raise AudioTooLong(f"Stream is longer than {self.max_seconds:.0f}s")
+        return samples
+
+    def push(self, data: bytes) -> List[np.ndarray]:
+        """Add a received chunk; returns the segments it completed (usually none)"""
+        self._pending = np.concatenate([self._pending, self._decode(data, final=False)])
+        if len(self._pending) < SPEECH_STREAM_STEP_SECONDS * SAMPLE_RATE:
+            return []
+        self._buffer = np.concatenate([self._buffer, self._pending])
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._cut(final=False)
+
+    def finish(self) -> List[np.ndarray]:
+        """End of the stream: the remaining speech, split at pauses"""
+        self._buffer = np.concatenate([self._buffer, self._pending, self._decode(b"", final=True)])
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._cut(final=True)
+
+    def _cut(self, final: bool) -> List[np.ndarray]:
+        chunks = get_speech_timestamps(self._buffer, self._vad)
+        if not chunks:
+            # Only silence so far; keep a short lead-in so the start of the next word is not clipped
+            self._buffer = self._buffer[-_LEAD_IN_SAMPLES:] if not final else np.zeros(0, dtype=np.float32)
+            return []
+
+        segments, cut = [], 0
+        max_samples = int(SPEECH_STREAM_MAX_SEGMENT_SECONDS * SAMPLE_RATE)
+        for chunk in chunks:
+            # VAD only ends a chunk before the end of the buffer after a full pause
+            if final or chunk["end"] < len(self._buffer):
+                segments.append(self._buffer[chunk["start"]:chunk["end"]])
+                cut = chunk["end"]
+                continue
+            # Still speaking: cut an overlong utterance anyway
+            if chunk["end"] - chunk["start"] >= max_samples:
+                segments.append(self._buffer[chunk["start"]:chunk["start"] + max_samples])
+                cut = chunk["start"] + max_samples
+            break
+        self._buffer = self._buffer[cut:]
+        if segments:
+            logging.debug(f"🎙️ Stream segments ready: {[round(len(s) / SAMPLE_RATE, 1) for s in segments]}s")
+        return segments
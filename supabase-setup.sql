@@ -52,9 +52,13 @@ CREATE TABLE IF NOT EXISTS public.chat_history (
     message TEXT NOT NULL,
     response TEXT,
     language TEXT DEFAULT 'en',
+    intent TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Existing deployments: intent labels are used to train the local intent classifier
+ALTER TABLE public.chat_history ADD COLUMN IF NOT EXISTS intent TEXT;
+
 -- Enable RLS
 ALTER TABLE public.profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.income ENABLE ROW LEVEL SECURITY;